@@ -1,11 +1,26 @@
 import os
-import json
+import sys
+import signal
+import glob
+import argparse
 from modules.classes import (
+    ArtifactRegistry,
     ImageProcessor,
-    ParticleCalculator,
     LatexManager,
     ExcelExporter,
+    ColumnarExporter,
+    ResultsStore,
+    BatchRunner,
+    DetectionCache,
+    SampleManifest,
+    ScaleRegistry,
+    HotFolder,
 )
+from modules.decorators import profiler
+from modules.plotting import use_headless
+
+# Figuras y exportaciones que se pueden omitir desde la línea de comandos
+SKIPPABLE = BatchRunner.ARTIFACT_KINDS + ("excel", "tables")
 
 
 def get_sample_paths(directory="data", prefix="sample"):
@@ -33,105 +48,546 @@ def get_sample_paths(directory="data", prefix="sample"):
     return sample_files
 
 
-def update_json_section(info_path, section, key, value):
+def resolve_inputs(inputs, prefix="sample"):
     """
-    Updates a specific section of the JSON file with a new piece of data.
+    Expands files, directories and glob patterns into a list of image paths.
 
     Args:
-        info_path (str): Path of the info folder.
-        section (str): Section to update (“reference” or “samples”).
-        key (str): Key to identify the data within the section.
-        value (any): Value to store associated to the key.
+        inputs (list): Files, directories or glob patterns. Directories are
+            searched for PNG files that begin with `prefix`.
+        prefix (str): Prefix of the file names to search for in directories.
+
+    Returns:
+        list: Sorted list of unique paths.
 
     Raises:
-        ValueError: If the section is not valid.
+        FileNotFoundError: If an input does not exist or matches nothing.
+        ValueError: If two images have the same sample name (file name without
+            extension), since the results of one would replace the other.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(get_sample_paths(item, prefix))
+        elif glob.has_magic(item):
+            matches = [path for path in glob.glob(item) if os.path.isfile(path)]
+            if not matches:
+                raise FileNotFoundError(f"[!] The pattern '{item}' matched no files.")
+            paths.extend(matches)
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            raise FileNotFoundError(f"[!] The input '{item}' does not exist.")
+
+    # Cada muestra se guarda con su nombre: dos imágenes no pueden compartirlo
+    paths = sorted({os.path.normpath(path) for path in paths})
+    names = {}
+    for path in paths:
+        name = SampleManifest.sample_name(path)
+        if name in names:
+            raise ValueError(
+                f"[!] '{names[name]}' and '{path}' have the same sample name "
+                f"'{name}'; rename one of them."
+            )
+        names[name] = path
+
+    return paths
+
+
+def remove_artifacts(figures_path, artifacts):
     """
-    json_path = os.path.join(info_path, "results.json")
+    Deletes the figures recorded for a sample in a previous run.
 
-    # Validar sección
-    if section not in ["reference", "samples"]:
-        raise ValueError(
-            f"Invalid section: {section}. Must be 'reference' or 'samples'."
+    Args:
+        figures_path (str): Figures folder of the run.
+        artifacts (dict): {base name: file name}, as stored with the sample.
+    """
+    ArtifactRegistry.for_directory(figures_path).remove(artifacts)
+
+
+def resolve_scale(args, figures_path, info_path, artifacts):
+    """
+    Obtains the scale of the run without processing the reference image when
+    it is already known: from --scale, or from the scale registry if the same
+    reference image and bar length were processed before.
+
+    Args:
+        args (argparse.Namespace): Options of the `analyze` command.
+        figures_path (str): Figures folder of the run.
+        info_path (str): Info folder of the run.
+        artifacts (set): Figures to produce (the reference ones included).
+
+    Returns:
+        tuple: (scale in um per pixel, source), the source being "option",
+        "registry" or "reference".
+    """
+    if args.scale is not None:
+        print(f"[*] Scale given as an option: {args.scale:.5f} um per pixel")
+        return args.scale, "option"
+
+    registry = ScaleRegistry(
+        args.scale_registry or os.path.join(args.output_dir, ScaleRegistry.FILENAME)
+    )
+    if not args.recompute_scale:
+        scale = registry.lookup(args.reference, args.real_length)
+        if scale is not None:
+            print(f"[*] Registered scale: {scale:.5f} um per pixel")
+            return scale, "registry"
+
+    processor_ref = ImageProcessor(
+        args.reference, figures_path, info_path, artifacts=artifacts
+    )
+    # Calcular la escala sin mostrar los pasos intermedios
+    processor_ref.calculate_scale(
+        real_length=args.real_length,
+        show_original=False,
+        show_binary=False,
+        show_contours=False,
+        show_bar=False,
+    )
+    registry.record(args.reference, args.real_length, processor_ref.scale)
+    return processor_ref.scale, "reference"
+
+
+def analyze(args):
+    """
+    Runs the analysis of the reference image and every sample image.
+
+    Args:
+        args (argparse.Namespace): Options of the `analyze` command.
+    """
+    policy = "none" if args.no_figures else args.artifacts
+    skip = set(args.skip)
+    profiler.reset()
+    # La línea de comandos nunca muestra figuras: se dibujan solo en memoria
+    use_headless()
+    profiler.configure(trace_memory=args.profile_memory)
+    artifacts = set(BatchRunner.ARTIFACT_POLICIES[policy]) - skip
+    cache_dir = args.cache_dir or os.path.join(args.output_dir, ".cache")
+
+    # Generar las rutas de las imágenes de muestra (en modo servicio llegan después)
+    if args.watch:
+        sample_paths = []
+    else:
+        sample_paths = resolve_inputs(args.inputs, args.prefix)
+        if not sample_paths:
+            raise FileNotFoundError("[!] No sample images were found.")
+
+    manager = LatexManager(args.output_dir)
+    if args.update:
+        figures_path, info_path, base_path = manager.open_directory_structure(
+            args.update
         )
+    else:
+        figures_path, info_path, base_path = manager.create_directory_structure()
+    print(f"[*] The images will be saved in: {figures_path}")
+    print(f"[*] The results are located in: {info_path}")
 
-    # Leer datos existentes
-    with open(json_path, "r") as json_file:
-        content = json.load(json_file)
-
-    # Actualizar la sección correspondiente
-    if section == "reference":
-        content["reference"][key] = value
-    elif section == "samples":
-        # Si no existe un diccionario para el sample, inicializarlo
-        if key not in content["samples"]:
-            content["samples"][key] = {}
-        content["samples"][key] = value
-
-    # Escribir de vuelta al archivo
-    with open(json_path, "w") as json_file:
-        json.dump(content, json_file, indent=4)
-    print(f"[*] Updated: section '{section}', key '{key}'.")
-
-
-manager = LatexManager()
-figures_path, info_path, base_path = manager.create_directory_structure()
-print(f"[*] The images will be saved in: {figures_path}")
-print(f"[*] The JSON file is located in: {info_path}")
-
-xls_exp = ExcelExporter(base_path)
-
-# Procesar referencia
-reference_path = "data/reference.png"
-processor_ref = ImageProcessor(reference_path, figures_path, info_path)
-# Calcular la escala mostrando solo algunos pasos
-processor_ref.calculate_scale(
-    real_length=200,
-    show_original=False,
-    show_binary=False,
-    show_contours=False,
-    show_bar=False,
-)
+    store = ResultsStore(info_path)
 
-# Generar dinámicamente las rutas de las imágenes de muestra
-sample_paths = get_sample_paths()
-
-# Iterar sobre las imágenes de muestra
-for sample_path in sample_paths:
-    sample_name = os.path.basename(sample_path).split(".")[
-        0
-    ]  # Extraer solo el nombre base del archivo
-    print(f"\n[*] Processing: {sample_path}")
-
-    # Instanciar el procesador para la imagen actual
-    processor_sample = ImageProcessor(sample_path, figures_path, info_path)
-    processor_sample.scale = processor_ref.scale  # Aplicar la escala de referencia
-
-    # Procesar la imagen
-    processor_sample.obtain_particles()
-    processor_sample.visualize_contours_and_centroids()
-
-    # Calcular las propiedades de las partículas
-    calculator = ParticleCalculator(processor_sample.particles, figures_path, info_path)
-    print(calculator)
-    calculator.find_closest_pair_Delaunay()
-
-    # Mostrar resultados
-    print(f"[*] Minimum distance: {calculator.min_distance:.2f} um")
-    calculator.plot_particles(show_plot=False, show_closest=True, show_mesh=True)
-
-    sample_data = {
-        "particles_detected": len(processor_sample.particles.particle_list),
-        "combinations": calculator.combinations,
-        "min_distance": calculator.min_distance,
-        "distances": calculator.distances,
-        "image_path": sample_path,
+    # Escala: dada por opción, del registro de escalas o procesando la referencia
+    with profiler.stage("reference"):
+        scale, scale_source = resolve_scale(args, figures_path, info_path, artifacts)
+
+    # Parámetros que cambian los resultados de todas las muestras
+    analysis = {
+        "scale": scale,
+        "detection_backend": args.detection_backend,
+        "min_component_area": (
+            args.min_area if args.detection_backend == "components" else None
+        ),
+        "tile_size": args.tile_size,
+        "tile_overlap": args.tile_overlap if args.tile_size else None,
+        "nn_k": args.nn_k,
+        "nn_radius": args.nn_radius,
+        "closest_pair": args.closest_pair,
     }
-    update_json_section(info_path, "samples", sample_name, sample_data)
 
-scale = processor_ref.scale
-samples_num = len(sample_paths)
+    # En una actualización solo se procesan las muestras nuevas o modificadas
+    inputs = store.get("metadata", "inputs", {}) if args.update else {}
+    unchanged_analysis = store.get("metadata", "analysis") == analysis
+    previous = SampleManifest(inputs if unchanged_analysis else {})
+    changed, _, manifest = previous.diff(sample_paths)
+    removed = [] if args.watch else sorted(set(inputs) - set(manifest.fingerprints))
+    if args.update and not args.watch:
+        print(
+            f"[*] Update: {len(changed)} new or modified samples, "
+            f"{len(sample_paths) - len(changed)} unchanged, {len(removed)} removed."
+        )
+        # Las figuras de las muestras que se rehacen o se quitan ya no sirven
+        stale = removed + [SampleManifest.sample_name(path) for path in changed]
+        for _, sample_data in store.iter_section("samples", keys=stale):
+            remove_artifacts(figures_path, sample_data.get("artifacts"))
+        for sample_name in removed:
+            store.remove("samples", sample_name)
+
+    # Procesar las muestras en paralelo; un único escritor guarda figuras y resultados
+    runner = BatchRunner(
+        figures_path,
+        info_path,
+        scale,
+        store,
+        workers=args.workers,
+        artifacts=artifacts,
+        plot_renderer=args.plot_renderer,
+        tile_size=args.tile_size,
+        tile_overlap=args.tile_overlap,
+        detection_backend=args.detection_backend,
+        min_component_area=args.min_area,
+        cache_dir=None if args.no_cache else cache_dir,
+        cache_size=int(args.cache_size * 1024**2),
+        nn_k=args.nn_k,
+        nn_radius=args.nn_radius,
+        closest_pair=args.closest_pair,
+        pipeline=args.pipeline,
+        prefetch=args.prefetch,
+        write_queue=args.write_queue,
+    )
+
+    # La referencia se escribe antes que las muestras: en modo servicio el
+    # almacén debe ser utilizable mientras llegan imágenes
+    store.write_reference(
+        "scale", {"unit": "um", "value": scale, "source": scale_source}
+    )
+    store.write_reference(
+        "image_path", None if scale_source == "option" else args.reference
+    )
+    owner = SampleManifest.sample_name(args.reference)
+    reference_artifacts = (
+        {} if scale_source != "reference" else runner.registry.artifacts_of(owner)
+    )
+    if args.update and reference_artifacts:
+        # Las figuras nuevas de la referencia sustituyen a las anteriores
+        remove_artifacts(figures_path, store.get("reference", "artifacts"))
+    if reference_artifacts or not args.update:
+        store.write_reference("artifacts", reference_artifacts)
+    store.write("metadata", "analysis", analysis)
+
+    if args.watch:
+        folder = HotFolder(
+            args.inputs, args.prefix, settle_time=args.settle_time, manifest=previous
+        )
+
+        def checkpoint():
+            # Huellas de lo procesado y results.json al día, por si el servicio cae
+            store.write("metadata", "inputs", folder.manifest.fingerprints)
+            with profiler.stage("finalize"):
+                store.finalize(legacy_json=args.format == "json")
+
+        # SIGTERM (p. ej. al parar el servicio) se trata como Ctrl+C: cierre ordenado
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        with profiler.stage("samples"):
+            processed = runner.watch(
+                folder,
+                poll_interval=args.poll_interval,
+                checkpoint=checkpoint,
+                checkpoint_interval=args.checkpoint_interval,
+            )
+    else:
+        with profiler.stage("samples"):
+            processed = runner.run(changed)
+        store.write("metadata", "inputs", manifest.fingerprints)
+
+        # Generar el results.json heredado una sola vez al final
+        with profiler.stage("finalize"):
+            store.finalize(legacy_json=args.format == "json")
+
+    if "excel" not in skip:
+        if args.update:
+            ExcelExporter(base_path).update_excel(
+                processed, removed, charts=args.excel_charts
+            )
+        else:
+            ExcelExporter(base_path).process_json_to_excel(charts=args.excel_charts)
+
+    # Tablas columnares de partículas y bordes para cuadernos de análisis
+    if "tables" not in skip:
+        ColumnarExporter(base_path, table_format=args.table_format).export()
+
+    # Resumen de tiempos por etapa en la carpeta info de la ejecución
+    profiler.write_summary(info_path, lanes=runner.lanes)
+
+    return base_path
+
+
+def positive_int(value):
+    """
+    argparse type for options that must be an integer of at least 1.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_parser():
+    """
+    Builds the command-line parser.
+
+    Returns:
+        argparse.ArgumentParser: The parser with its subcommands.
+    """
+    parser = argparse.ArgumentParser(
+        description="Particle detection and distance analysis on microscope images."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="Analyze a batch of sample images."
+    )
+    analyze_parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=["data"],
+        help="Sample images, directories or glob patterns (default: data).",
+    )
+    analyze_parser.add_argument(
+        "--prefix",
+        default="sample",
+        help="Prefix of the sample images searched in directories (default: sample).",
+    )
+    analyze_parser.add_argument(
+        "--reference",
+        default="data/reference.png",
+        help="Reference image with the scale bar (default: data/reference.png).",
+    )
+    analyze_parser.add_argument(
+        "--real-length",
+        type=float,
+        default=200,
+        help="Real length of the reference bar in um (default: 200).",
+    )
+    analyze_parser.add_argument(
+        "--scale",
+        type=float,
+        default=None,
+        help="Scale in um per pixel (e.g. from the microscope metadata); the "
+        "reference image is not processed.",
+    )
+    analyze_parser.add_argument(
+        "--scale-registry",
+        default=None,
+        help="JSON registry of the scales of known reference images "
+        "(default: <output-dir>/scales.json).",
+    )
+    analyze_parser.add_argument(
+        "--recompute-scale",
+        action="store_true",
+        help="Process the reference image even if its scale is registered.",
+    )
+    analyze_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    analyze_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Service mode: keep the scale and the worker pool alive and "
+        "process every new image that appears in the input directories until "
+        "Ctrl+C or SIGTERM; Excel and tables are written on exit.",
+    )
+    analyze_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Watch mode: seconds between scans of the input directories "
+        "(default: 1).",
+    )
+    analyze_parser.add_argument(
+        "--settle-time",
+        type=float,
+        default=2.0,
+        help="Watch mode: seconds an image must stay unchanged before it is "
+        "processed, so partially written files are skipped (default: 2).",
+    )
+    analyze_parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=300.0,
+        help="Watch mode: seconds between updates of the sample fingerprints "
+        "and results.json (default: 300).",
+    )
+    analyze_parser.add_argument(
+        "--pipeline",
+        choices=list(BatchRunner.PIPELINES),
+        default="processes",
+        help="'processes' runs the samples in a pool of worker processes; "
+        "'async' overlaps image decoding, computation and writing in this "
+        "process through bounded queues (default: processes).",
+    )
+    analyze_parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=2,
+        help="Async pipeline: images decoded ahead of the computation (default: 2).",
+    )
+    analyze_parser.add_argument(
+        "--write-queue",
+        type=int,
+        default=2,
+        help="Async pipeline: computed samples waiting to be written (default: 2).",
+    )
+    analyze_parser.add_argument(
+        "--output-dir",
+        default="output",
+        help="Base directory of the runs (default: output).",
+    )
+    analyze_parser.add_argument(
+        "--update",
+        default=None,
+        metavar="RUN_DIR",
+        help="Update an existing run (e.g. output/010125_1) in place: only new "
+        "or modified samples are processed and removed samples are dropped "
+        "from its results, figures and Excel workbook.",
+    )
+    analyze_parser.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="Results format: 'jsonl' keeps only the results store, 'json' "
+        "also writes the legacy results.json (default: json).",
+    )
+    analyze_parser.add_argument(
+        "--artifacts",
+        choices=list(BatchRunner.ARTIFACT_POLICIES),
+        default="debug",
+        help="Figures to produce: 'none', 'summary' (centroid image and particle "
+        "plot) or 'debug' (every intermediate step, default).",
+    )
+    analyze_parser.add_argument(
+        "--plot-renderer",
+        choices=["matplotlib", "opencv"],
+        default="matplotlib",
+        help="Renderer of the particle plot; 'opencv' draws straight into an "
+        "image and is much faster on dense images (default: matplotlib).",
+    )
+    analyze_parser.add_argument(
+        "--detection-backend",
+        choices=list(ImageProcessor.DETECTION_BACKENDS),
+        default="contours",
+        help="Particle detection: 'contours' (contours and moments, with "
+        "perimeters) or 'components' (connected components in one native "
+        "call, areas as pixel counts; default: contours).",
+    )
+    analyze_parser.add_argument(
+        "--min-area",
+        type=int,
+        default=ImageProcessor.MIN_COMPONENT_AREA,
+        help="Components backend: smallest particle in pixels; smaller "
+        "components are discarded as noise. The default drops the same specks "
+        f"as the contours backend (default: {ImageProcessor.MIN_COMPONENT_AREA}).",
+    )
+    analyze_parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=None,
+        help="Process every sample in tiles of this many pixels. .npy inputs are "
+        "memory-mapped, so memory depends on the tile size only; other formats "
+        "are still decoded whole once, as grayscale (about 1 byte per pixel), "
+        "before being split (default: whole image).",
+    )
+    analyze_parser.add_argument(
+        "--tile-overlap",
+        type=int,
+        default=64,
+        help="Pixels shared by neighbouring tiles; must exceed the biggest "
+        "particle (default: 64).",
+    )
+    analyze_parser.add_argument(
+        "--nn-k",
+        type=positive_int,
+        default=1,
+        help="Nearest neighbours computed per particle; the distance to the "
+        "nearest one is exported with the particles (default: 1).",
+    )
+    analyze_parser.add_argument(
+        "--nn-radius",
+        type=float,
+        default=None,
+        help="Count the particle pairs within this distance in um "
+        "(default: not counted).",
+    )
+    analyze_parser.add_argument(
+        "--closest-pair",
+        choices=list(BatchRunner.CLOSEST_PAIR_METHODS),
+        default="delaunay",
+        help="Closest-pair search: 'delaunay' (triangulation; its edges are "
+        "stored as the distances and drawn as the mesh) or 'grid' (exact grid "
+        "search of the closest pair only, without a mesh; default: delaunay).",
+    )
+    analyze_parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Folder of the detection cache, which skips the detection on "
+        "unchanged images with every artifact policy. Figures drawn over the "
+        "image still decode it ('debug' also binarizes it again); use "
+        "--artifacts none for the fastest repeat runs "
+        "(default: <output-dir>/.cache).",
+    )
+    analyze_parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=DetectionCache.MAX_BYTES / 1024**2,
+        help="Maximum size of the detection cache in MB; the least recently "
+        "used entries are evicted (default: 1024).",
+    )
+    analyze_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the detection cache.",
+    )
+    analyze_parser.add_argument(
+        "--skip",
+        nargs="+",
+        choices=SKIPPABLE,
+        default=[],
+        metavar="ARTIFACT",
+        help=f"Artifacts not to produce: {', '.join(SKIPPABLE)}.",
+    )
+    analyze_parser.add_argument(
+        "--excel-charts",
+        action="store_true",
+        help="Add a scatter chart of the distance pairs to every sample sheet "
+        "of results.xlsx.",
+    )
+    analyze_parser.add_argument(
+        "--table-format",
+        choices=list(ColumnarExporter.FORMATS),
+        default=None,
+        help="Format of the particle and edge tables in tables/: 'parquet' "
+        "(needs pyarrow) or 'npy' columns (default: parquet if pyarrow is "
+        "installed, npy otherwise).",
+    )
+    analyze_parser.add_argument(
+        "--no-figures",
+        action="store_true",
+        help="Do not save any figure (same as --artifacts none).",
+    )
+    analyze_parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Record the tracemalloc peak of every stage in timings.json (slower).",
+    )
+    analyze_parser.set_defaults(func=analyze)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point. Without a subcommand, runs `analyze` with the default options.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    args = parser.parse_args(argv or ["analyze"])
+    if args.command is None:
+        parser.print_help()
+        return None
+    return args.func(args)
 
-update_json_section(info_path, "reference", "scale", {"unit": "um", "value": scale})
-update_json_section(info_path, "reference", "image_path", "data/reference.png")
 
-xls_exp.process_json_to_excel()
+if __name__ == "__main__":
+    # Guardia necesaria para que los procesos del pool no vuelvan a ejecutar el análisis
+    main()
@@ -0,0 +1,146 @@
+import os
+import re
+import threading
+
+
+class ArtifactRegistry:
+    """
+    Hands out unique figure names (`name_1.png`, `name_2.png`, ...) for a run.
+
+    The figures folder is scanned once; after that every name comes from an
+    in-memory counter per base name, so saving does not probe the filesystem
+    with one `os.path.exists` per suffix. Names are reserved by creating the
+    file exclusively, so two writers sharing the folder never get the same name.
+    The registry also records which files were produced for each owner
+    (usually a sample name).
+    """
+
+    _NUMBERED = re.compile(r"^(?P<base>.+)_(?P<number>\d+)(?P<ext>\.[^.]+)$")
+
+    # Un registro por carpeta y proceso
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    # CONSTRUCTOR
+    def __init__(self, figures_path):
+        """
+        Args:
+            figures_path (str): Folder where the figures are saved.
+        """
+        if not figures_path:
+            raise ValueError("[!] The path of figures is not defined.")
+
+        self.figures_path = figures_path
+        self._lock = threading.Lock()
+        self._counters = {}  # (base, ext) -> último número asignado
+        self._owners = {}  # owner -> {base: file name}
+        self._scan()
+
+    @classmethod
+    def for_directory(cls, figures_path):
+        """
+        Returns the registry shared by every writer of `figures_path` in this process.
+
+        Args:
+            figures_path (str): Folder where the figures are saved.
+
+        Returns:
+            ArtifactRegistry: The registry of the folder.
+        """
+        key = os.path.abspath(figures_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(figures_path)
+            return cls._instances[key]
+
+    def _scan(self):
+        """
+        Seeds the counters with the highest suffix already present in the folder.
+        """
+        if not os.path.isdir(self.figures_path):
+            return
+        with os.scandir(self.figures_path) as entries:
+            for entry in entries:
+                match = self._NUMBERED.match(entry.name)
+                if match:
+                    key = (match.group("base"), match.group("ext"))
+                    number = int(match.group("number"))
+                    self._counters[key] = max(self._counters.get(key, 0), number)
+
+    def allocate(self, filename, owner=None):
+        """
+        Reserves a unique path for `filename` with the next numeric suffix.
+
+        Args:
+            filename (str): Base name of the file (includes extension, e.g. 'plot.png').
+            owner (str): Optional owner (e.g. sample name) to record the file under.
+
+        Returns:
+            str: Path of the reserved (empty) file.
+        """
+        base_name, ext = os.path.splitext(filename)
+        key = (base_name, ext)
+
+        with self._lock:
+            while True:
+                number = self._counters.get(key, 0) + 1
+                self._counters[key] = number
+                name = f"{base_name}_{number}{ext}"
+                file_path = os.path.join(self.figures_path, name)
+                try:
+                    # Reserva atómica: falla si otro proceso ya creó el archivo
+                    os.close(
+                        os.open(file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+                    )
+                    break
+                except FileExistsError:
+                    continue
+
+            if owner is not None:
+                self._owners.setdefault(owner, {})[base_name] = name
+
+        return file_path
+
+    def write(self, filename, data, owner=None):
+        """
+        Writes already encoded content under a unique name.
+
+        Args:
+            filename (str): Base name of the file (includes extension).
+            data (bytes): Encoded file content.
+            owner (str): Optional owner to record the file under.
+
+        Returns:
+            str: Path of the written file.
+        """
+        file_path = self.allocate(filename, owner=owner)
+        with open(file_path, "wb") as artifact_file:
+            artifact_file.write(data)
+        return file_path
+
+    def artifacts_of(self, owner):
+        """
+        Returns the files recorded for `owner` as {base name: file name}.
+        """
+        with self._lock:
+            return dict(self._owners.get(owner, {}))
+
+    def remove(self, artifacts):
+        """
+        Deletes figures recorded for an owner, e.g. by a previous run of a
+        sample that has been processed again.
+
+        Args:
+            artifacts (dict): {base name: file name}, as stored with the sample.
+
+        Returns:
+            list: Paths of the deleted files.
+        """
+        removed = []
+        for filename in (artifacts or {}).values():
+            file_path = os.path.join(self.figures_path, filename)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+                removed.append(file_path)
+                print(f"[*] Figure removed: {file_path}")
+        return removed
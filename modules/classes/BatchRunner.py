@@ -0,0 +1,676 @@
+import os
+import time
+import signal
+import asyncio
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from modules.classes.ImageProcessor import ImageProcessor
+from modules.classes.ParticleCalculator import ParticleCalculator
+from modules.classes.ArtifactRegistry import ArtifactRegistry
+from modules.classes.DetectionCache import DetectionCache
+from modules.classes.SampleManifest import SampleManifest
+from modules.decorators import profiler
+from modules.geometry import DESCRIPTORS, summarize_descriptors
+from modules.plotting import pyplot, use_headless
+
+
+def _warm_imports(plot=False):
+    """
+    Imports the dependencies that the analysis of a sample defers (scipy and,
+    with `plot`, matplotlib), so that their import time is not charged to the
+    stages of the first sample that needs them.
+
+    Args:
+        plot (bool): If True, also imports pyplot and its line collections.
+    """
+    import scipy.spatial  # noqa: F401
+
+    if plot:
+        import matplotlib.collections  # noqa: F401
+
+        pyplot()
+
+
+def _init_worker(trace_memory=False, ignore_interrupt=False, plot=False):
+    """
+    Initializes a worker process: plots are only rendered to memory, the
+    deferred imports are done up front (see _warm_imports) and the profiler
+    traces memory if the main process does. With `ignore_interrupt`, Ctrl+C
+    and SIGTERM (sent to the whole process group by terminals and service
+    managers) only stop the main process, which finishes the samples in
+    progress and then stops the workers.
+    """
+    use_headless()
+    _warm_imports(plot)
+    profiler.configure(trace_memory=trace_memory)
+    if ignore_interrupt:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def process_sample(
+    sample_path,
+    figures_path,
+    info_path,
+    scale,
+    artifacts=None,
+    plot_renderer="matplotlib",
+    tile_size=None,
+    tile_overlap=64,
+    detection_backend="contours",
+    min_component_area=ImageProcessor.MIN_COMPONENT_AREA,
+    cache_dir=None,
+    cache_size=None,
+    nn_k=1,
+    nn_radius=None,
+    closest_pair="delaunay",
+):
+    """
+    Processes a single sample image: detection, Delaunay, nearest neighbours
+    and plot. Nothing is written to disk; figures are returned encoded.
+
+    Args:
+        sample_path (str): Path of the sample image.
+        figures_path (str): Folder where the figures of the run are saved.
+        info_path (str): Folder of the results of the run.
+        scale (float): Scale in um per pixel from the reference image.
+        artifacts (set): Figures to produce (ImageProcessor.ARTIFACT_KINDS plus
+            "plot"). None produces all of them.
+        plot_renderer (str): "matplotlib" or "opencv" for the particle plot.
+        tile_size (int): If given, the image is processed in tiles of this size.
+        tile_overlap (int): Pixels shared by neighbouring tiles.
+        detection_backend (str): "contours" or "components" (see ImageProcessor).
+        min_component_area (int): Smallest component kept by "components".
+        cache_dir (str): Folder of the detection cache; None disables it.
+        cache_size (int): Maximum size of the detection cache in bytes.
+        nn_k (int): Number of nearest neighbours computed per particle.
+        nn_radius (float): If given, the particle pairs within this
+            distance (um) are counted.
+        closest_pair (str): "delaunay" (closest pair and mesh edges) or "grid"
+            (closest pair only, no mesh).
+
+    Returns:
+        tuple: (sample_name, sample_data, artifacts, timings) where `artifacts`
+        is a list of (filename, bytes) in the order they were produced and
+        `timings` the profiler stages of the sample (see Profiler.pop_scope).
+    """
+    sample_name = SampleManifest.sample_name(sample_path)
+    with profiler.scope(sample_name):
+        sample_data, artifacts = _analyze_sample(
+            sample_path,
+            figures_path,
+            info_path,
+            scale,
+            artifacts,
+            plot_renderer,
+            tile_size,
+            tile_overlap,
+            detection_backend,
+            min_component_area,
+            cache_dir,
+            cache_size,
+            nn_k,
+            nn_radius,
+            closest_pair,
+        )
+
+    return sample_name, sample_data, artifacts, profiler.pop_scope(sample_name)
+
+
+def _analyze_sample(
+    sample_path,
+    figures_path,
+    info_path,
+    scale,
+    artifacts,
+    plot_renderer,
+    tile_size,
+    tile_overlap,
+    detection_backend,
+    min_component_area,
+    cache_dir,
+    cache_size,
+    nn_k,
+    nn_radius,
+    closest_pair,
+):
+    """
+    Body of process_sample, run inside the profiler scope of the sample.
+
+    Returns:
+        tuple: (sample_data, artifacts).
+    """
+    processor = _prepare_sample(
+        sample_path,
+        figures_path,
+        info_path,
+        scale,
+        artifacts,
+        tile_size,
+        tile_overlap,
+        detection_backend,
+        min_component_area,
+        cache_dir,
+        cache_size,
+    )
+    return _compute_sample(
+        processor, artifacts, plot_renderer, nn_k, nn_radius, closest_pair
+    )
+
+
+def _prepare_sample(
+    sample_path,
+    figures_path,
+    info_path,
+    scale,
+    artifacts,
+    tile_size,
+    tile_overlap,
+    detection_backend,
+    min_component_area,
+    cache_dir,
+    cache_size,
+):
+    """
+    I/O half of the analysis of a sample: looks its particles up in the
+    detection cache and, on a miss, decodes the image.
+
+    Returns:
+        ImageProcessor: The processor of the sample, ready for _compute_sample.
+    """
+    print(f"\n[*] Processing: {sample_path}")
+
+    if artifacts is None:
+        artifacts = set(BatchRunner.ARTIFACT_KINDS)
+
+    cache = None
+    if cache_dir:
+        cache = DetectionCache.for_directory(
+            cache_dir, max_bytes=cache_size or DetectionCache.MAX_BYTES
+        )
+
+    # Las figuras de referencia no aplican a las muestras
+    processor = ImageProcessor(
+        sample_path,
+        figures_path,
+        info_path,
+        defer_saves=True,
+        artifacts=set(artifacts) - {"reference"},
+        tile_size=tile_size,
+        tile_overlap=tile_overlap,
+        detection_backend=detection_backend,
+        min_component_area=min_component_area,
+        cache=cache,
+    )
+    processor.scale = scale  # Aplicar la escala de referencia
+    processor.prepare()
+    return processor
+
+
+def _compute_sample(
+    processor,
+    artifacts,
+    plot_renderer,
+    nn_k=1,
+    nn_radius=None,
+    closest_pair="delaunay",
+):
+    """
+    CPU half of the analysis of a sample: detection, closest pair, nearest
+    neighbours and plot (see process_sample for the options). Nothing is
+    written to disk.
+
+    Returns:
+        tuple: (sample_data, artifacts).
+    """
+    if artifacts is None:
+        artifacts = set(BatchRunner.ARTIFACT_KINDS)
+    scale = processor.scale
+
+    # Procesar la imagen
+    processor.obtain_particles()
+    if processor.artifacts & {"contours", "centroids"}:
+        processor.visualize_contours_and_centroids()
+
+    # Calcular las propiedades de las partículas
+    calculator = ParticleCalculator(
+        processor.particles,
+        processor.figures_path,
+        processor.info_path,
+        defer_saves=True,
+    )
+    print(calculator)
+    # La búsqueda en rejilla no construye la malla: no hay bordes que guardar
+    if closest_pair == "grid":
+        calculator.find_closest_pair_grid()
+    else:
+        calculator.find_closest_pair_Delaunay()
+    processor.store_cached_particles(edges=calculator.edges)
+
+    # Estadísticas de vecino más cercano sobre el área de la imagen (um^2)
+    height, width = processor.image_shape
+    calculator.find_nearest_neighbors(
+        k=nn_k, radius=nn_radius, area=width * height * scale**2
+    )
+
+    print(f"[*] Minimum distance: {calculator.min_distance:.2f} um")
+    if "plot" in artifacts:
+        calculator.plot_particles(
+            show_plot=False,
+            show_closest=True,
+            show_mesh=closest_pair == "delaunay",
+            renderer=plot_renderer,
+        )
+
+    table = processor.particles.table
+    sample_data = {
+        "particles_detected": len(table),
+        "combinations": calculator.combinations,
+        "min_distance": calculator.min_distance,
+        "nearest_neighbors": calculator.nn_stats,
+        "shape": summarize_descriptors(
+            {name: getattr(table, name) for name in DESCRIPTORS}
+        ),
+        "particles": table.to_records(),
+        "distances": calculator.distances,
+        "image_path": processor.image_path,
+    }
+    artifacts = processor.pending_artifacts + calculator.pending_artifacts
+
+    return sample_data, artifacts
+
+
+class BatchRunner:
+    """
+    Runs the per-sample analysis of a batch of images, optionally in a process
+    pool. Workers only compute; a single writer (this object, in the main
+    process) saves the figures and the results, always in input order.
+
+    With the "async" pipeline the samples go through three stages joined by
+    bounded queues, in this process: decoding (cache lookup and image read,
+    in a thread pool that prefetches the next images), computation
+    (detection, Delaunay and plot) and writing (figures and results, in a
+    background thread). Decoding and writing overlap with the computation
+    and the queue depths bound how many samples are held in memory.
+    """
+
+    PIPELINES = ("processes", "async")
+    CLOSEST_PAIR_METHODS = ("delaunay", "grid")
+
+    # Figuras por muestra: las del procesador más la gráfica de partículas
+    ARTIFACT_KINDS = ImageProcessor.ARTIFACT_KINDS + ("plot",)
+    ARTIFACT_POLICIES = {
+        policy: kinds + ("plot",) if kinds else ()
+        for policy, kinds in ImageProcessor.ARTIFACT_POLICIES.items()
+    }
+
+    # CONSTRUCTOR
+    def __init__(
+        self,
+        figures_path,
+        info_path,
+        scale,
+        store,
+        workers=1,
+        artifacts=None,
+        registry=None,
+        plot_renderer="matplotlib",
+        tile_size=None,
+        tile_overlap=64,
+        detection_backend="contours",
+        min_component_area=ImageProcessor.MIN_COMPONENT_AREA,
+        cache_dir=None,
+        cache_size=None,
+        nn_k=1,
+        nn_radius=None,
+        closest_pair="delaunay",
+        pipeline="processes",
+        prefetch=2,
+        write_queue=2,
+    ):
+        """
+        Args:
+            figures_path (str): Folder where the figures of the run are saved.
+            info_path (str): Folder of the results of the run.
+            scale (float): Scale in um per pixel from the reference image.
+            store (ResultsStore): Store where the sample results are written.
+            workers (int): Number of worker processes. 1 runs in this process.
+            artifacts (set): Figures to produce per sample. None produces all.
+            registry (ArtifactRegistry): Registry that names the figures.
+                Defaults to the shared registry of `figures_path`.
+            plot_renderer (str): "matplotlib" or "opencv" for the particle plot.
+            tile_size (int): If given, every image is processed in tiles of this
+                size (see ImageProcessor for the memory it bounds).
+            tile_overlap (int): Pixels shared by neighbouring tiles.
+            detection_backend (str): "contours" or "components" (see
+                ImageProcessor).
+            min_component_area (int): Smallest component, in pixels, kept by
+                the "components" backend.
+            cache_dir (str): Folder of the detection cache, shared by the
+                workers. None disables the cache.
+            cache_size (int): Maximum size of the detection cache in bytes.
+            nn_k (int): Number of nearest neighbours computed per particle.
+            nn_radius (float): If given, the particle pairs within this
+                distance (um) are counted.
+            closest_pair (str): "delaunay" (closest pair and mesh edges, which
+                are stored as the distances) or "grid" (exact grid search of
+                the closest pair only; no mesh is built or drawn).
+            pipeline (str): "processes" (process pool) or "async" (overlapped
+                decode, compute and write stages in this process).
+            prefetch (int): Async pipeline: decoded samples waiting for the
+                compute stage.
+            write_queue (int): Async pipeline: computed samples waiting for
+                the writer.
+
+        Raises:
+            ValueError: If the pipeline or the closest-pair method is not valid.
+        """
+        if pipeline not in self.PIPELINES:
+            raise ValueError(
+                f"Invalid pipeline: {pipeline}. "
+                f"Must be one of {', '.join(self.PIPELINES)}."
+            )
+        if closest_pair not in self.CLOSEST_PAIR_METHODS:
+            raise ValueError(
+                f"Invalid closest-pair method: {closest_pair}. "
+                f"Must be one of {', '.join(self.CLOSEST_PAIR_METHODS)}."
+            )
+        self.figures_path = figures_path
+        self.info_path = info_path
+        self.scale = scale
+        self.store = store
+        self.workers = max(1, int(workers or 1))
+        self.artifacts = set(self.ARTIFACT_KINDS if artifacts is None else artifacts)
+        self.registry = registry or ArtifactRegistry.for_directory(figures_path)
+        self.plot_renderer = plot_renderer
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.detection_backend = detection_backend
+        self.min_component_area = min_component_area
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.nn_k = nn_k
+        self.nn_radius = nn_radius
+        self.closest_pair = closest_pair
+        self.pipeline = pipeline
+        self.prefetch = max(1, int(prefetch))
+        self.write_queue = max(1, int(write_queue))
+
+    def run(self, sample_paths):
+        """
+        Processes every sample and writes its figures and results.
+
+        Args:
+            sample_paths (list): Paths of the sample images.
+
+        Returns:
+            list: Names of the processed samples, in the order they were written.
+        """
+        # Orden fijo para que los resultados no dependan de los workers
+        sample_paths = sorted(sample_paths)
+        if self.pipeline == "async":
+            return asyncio.run(self._run_async(sample_paths))
+
+        args = [self._sample_args(sample_path) for sample_path in sample_paths]
+
+        if self.workers == 1 or len(sample_paths) < 2:
+            if sample_paths:
+                with profiler.stage("imports"):
+                    _warm_imports(self._plots_with_matplotlib())
+            return self._write_results(
+                process_sample(*sample_args) for sample_args in args
+            )
+
+        workers = min(self.workers, len(sample_paths))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(profiler.trace_memory, False, self._plots_with_matplotlib()),
+        ) as pool:
+            # map entrega los resultados en el orden de entrada
+            return self._write_results(pool.map(process_sample, *zip(*args)))
+
+    @property
+    def lanes(self):
+        """
+        Number of threads or processes that may run the stages of the samples
+        at the same time: the workers, or with the async pipeline the decode,
+        compute and write threads.
+        """
+        if self.pipeline == "async":
+            compute_threads = 1 if self.plot_renderer == "matplotlib" else self.workers
+            return self.prefetch + compute_threads + 1
+        return self.workers
+
+    def _plots_with_matplotlib(self):
+        return "plot" in self.artifacts and self.plot_renderer == "matplotlib"
+
+    def _sample_args(self, sample_path):
+        """
+        Positional arguments of process_sample for one sample.
+        """
+        return (
+            sample_path,
+            self.figures_path,
+            self.info_path,
+            self.scale,
+            self.artifacts,
+            self.plot_renderer,
+            self.tile_size,
+            self.tile_overlap,
+            self.detection_backend,
+            self.min_component_area,
+            self.cache_dir,
+            self.cache_size,
+            self.nn_k,
+            self.nn_radius,
+            self.closest_pair,
+        )
+
+    def watch(
+        self, folder, poll_interval=1.0, checkpoint=None, checkpoint_interval=300.0
+    ):
+        """
+        Service mode: keeps a pool of worker processes alive and processes
+        every image reported by a HotFolder as soon as it is complete, until
+        interrupted (Ctrl+C or SIGTERM). Samples are written as they finish;
+        the samples in flight when the service stops are finished and written.
+
+        Args:
+            folder (HotFolder): Source of the new sample images.
+            poll_interval (float): Seconds between scans of the folder.
+            checkpoint (callable): Called every `checkpoint_interval` seconds
+                (if samples were written) and once when the service stops.
+            checkpoint_interval (float): Seconds between checkpoints.
+
+        Returns:
+            list: Names of the processed samples, in the order they were written.
+        """
+        processed = []
+        queued = deque()
+        running = {}
+        written = 0
+        last_checkpoint = time.monotonic()
+
+        def collect(futures):
+            for future in futures:
+                sample_path = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Se reintenta cuando el archivo cambie
+                    print(f"[!] Could not process {sample_path}: {e}")
+                    folder.mark_failed(sample_path)
+                    continue
+                # Una muestra modificada sustituye a la anterior: sus figuras sobran
+                superseded = self.store.get("samples", result[0])
+                if superseded:
+                    self.registry.remove(superseded.get("artifacts"))
+                processed.extend(self._write_results([result]))
+                folder.mark_done(sample_path)
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(profiler.trace_memory, True, self._plots_with_matplotlib()),
+        )
+        try:
+            print(f"[*] Watching: {', '.join(folder.directories)} (Ctrl+C to stop)")
+            while True:
+                queued.extend(folder.poll())
+                # Pocas tareas por worker: el resto espera en la cola sin ocupar memoria
+                while queued and len(running) < 2 * self.workers:
+                    sample_path = queued.popleft()
+                    future = pool.submit(
+                        process_sample, *self._sample_args(sample_path)
+                    )
+                    running[future] = sample_path
+
+                if running:
+                    done, _ = wait(
+                        running, timeout=poll_interval, return_when=FIRST_COMPLETED
+                    )
+                    collect(done)
+                else:
+                    time.sleep(poll_interval)
+
+                if (
+                    checkpoint
+                    and len(processed) > written
+                    and time.monotonic() - last_checkpoint >= checkpoint_interval
+                ):
+                    checkpoint()
+                    written = len(processed)
+                    last_checkpoint = time.monotonic()
+        except KeyboardInterrupt:
+            print(
+                f"\n[*] Stopping: finishing {len(running)} samples in progress "
+                "(interrupt again to abort)."
+            )
+            for sample_path in queued:
+                folder.release(sample_path)
+            collect(list(running))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        if checkpoint:
+            checkpoint()
+        return processed
+
+    def _write_results(self, results):
+        processed = []
+        for sample_name, sample_data, artifacts, timings in results:
+            # Los tiempos del worker se suman a los de la muestra en este proceso
+            profiler.merge(sample_name, timings)
+            with profiler.scope(sample_name), profiler.stage("write_results"):
+                # Solo el escritor asigna nombres, así no dependen del orden de los workers
+                for filename, data in artifacts:
+                    file_path = self.registry.write(filename, data, owner=sample_name)
+                    profiler.count("artifact_bytes", len(data))
+                    print(f"[*] Figure saved: {file_path}")
+                sample_data["artifacts"] = self.registry.artifacts_of(sample_name)
+                self.store.write_sample(sample_name, sample_data)
+            processed.append(sample_name)
+        return processed
+
+    def _prepare(self, sample_path):
+        sample_name = SampleManifest.sample_name(sample_path)
+        with profiler.scope(sample_name):
+            processor = _prepare_sample(
+                sample_path,
+                self.figures_path,
+                self.info_path,
+                self.scale,
+                self.artifacts,
+                self.tile_size,
+                self.tile_overlap,
+                self.detection_backend,
+                self.min_component_area,
+                self.cache_dir,
+                self.cache_size,
+            )
+        return sample_name, processor
+
+    def _compute(self, sample_name, processor):
+        with profiler.scope(sample_name):
+            sample_data, artifacts = _compute_sample(
+                processor,
+                self.artifacts,
+                self.plot_renderer,
+                self.nn_k,
+                self.nn_radius,
+                self.closest_pair,
+            )
+        return sample_name, sample_data, artifacts, profiler.pop_scope(sample_name)
+
+    async def _run_async(self, sample_paths):
+        """
+        Async pipeline: decode -> compute -> write, joined by bounded queues.
+        The results are written in input order.
+
+        Returns:
+            list: Names of the processed samples, in the order they were written.
+        """
+        # Las gráficas se dibujan fuera del hilo principal: solo en memoria
+        use_headless()
+        with profiler.stage("imports"):
+            _warm_imports(self._plots_with_matplotlib())
+        loop = asyncio.get_running_loop()
+        decoded = asyncio.Queue(maxsize=self.prefetch)
+        computed = asyncio.Queue(maxsize=self.write_queue)
+        processed = []
+
+        # pyplot no es seguro entre hilos: con matplotlib se calcula en un solo hilo
+        compute_threads = 1 if self.plot_renderer == "matplotlib" else self.workers
+        decode_pool = ThreadPoolExecutor(self.prefetch, thread_name_prefix="decode")
+        compute_pool = ThreadPoolExecutor(compute_threads, thread_name_prefix="compute")
+        write_pool = ThreadPoolExecutor(1, thread_name_prefix="write")
+
+        async def decode():
+            # Como mucho `prefetch` lecturas en curso, entregadas en orden
+            pending = deque()
+            for sample_path in sample_paths:
+                if len(pending) >= self.prefetch:
+                    await decoded.put(await pending.popleft())
+                pending.append(
+                    loop.run_in_executor(decode_pool, self._prepare, sample_path)
+                )
+            while pending:
+                await decoded.put(await pending.popleft())
+            await decoded.put(None)
+
+        async def compute():
+            pending = deque()
+            while True:
+                item = await decoded.get()
+                if item is None:
+                    break
+                if len(pending) >= compute_threads:
+                    await computed.put(await pending.popleft())
+                pending.append(loop.run_in_executor(compute_pool, self._compute, *item))
+            while pending:
+                await computed.put(await pending.popleft())
+            await computed.put(None)
+
+        async def write():
+            while True:
+                result = await computed.get()
+                if result is None:
+                    break
+                processed.extend(
+                    await loop.run_in_executor(
+                        write_pool, self._write_results, [result]
+                    )
+                )
+
+        try:
+            await asyncio.gather(decode(), compute(), write())
+        finally:
+            for pool in (decode_pool, compute_pool, write_pool):
+                pool.shutdown(wait=True)
+        return processed
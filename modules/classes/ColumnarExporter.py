@@ -0,0 +1,288 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+from modules.classes.ParticleTable import ParticleTable
+from modules.classes.EdgeStore import EdgeStore
+from modules.classes.ResultsStore import ResultsStore
+from modules.decorators import measure_execution_time, profiler
+
+
+def _pyarrow():
+    """
+    Imports pyarrow on first use.
+
+    Returns:
+        tuple: (pyarrow, pyarrow.parquet), or (None, None) if it is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # pyarrow es opcional: sin él se escriben columnas .npy
+        return None, None
+    return pa, pq
+
+
+class _NpyColumn:
+    """
+    Column of a .npy table written in chunks: the values are spooled to a raw
+    file and the .npy header is written once the final length is known.
+    """
+
+    def __init__(self, dtype, spool_dir):
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._spool = tempfile.TemporaryFile(dir=spool_dir)
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self._spool.write(values.tobytes())
+        self.length += len(values)
+
+    def save(self, path):
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.length,),
+        }
+        self._spool.seek(0)
+        with open(path, "wb") as npy_file:
+            np.lib.format.write_array_header_1_0(npy_file, header)
+            shutil.copyfileobj(self._spool, npy_file)
+        self._spool.close()
+        return os.path.getsize(path)
+
+
+class ColumnarExporter:
+    """
+    Exports the particles and the Delaunay edges of every sample of a run as
+    two columnar tables, so notebooks can load them without parsing
+    results.json:
+
+    - particles: sample, id, x_um, y_um and the shape descriptors.
+    - edges: sample, i, j (particle ids) and distance (um).
+
+    With pyarrow installed, each table is a Parquet file with one row group
+    per sample (read it with `pyarrow.parquet.read_table(path, filters=[
+    ("sample", "==", name)], memory_map=True)`). Otherwise each table is a
+    folder with one `.npy` file per column, plus `index.json` with the row
+    range of every sample; the columns can be opened with
+    `np.load(path, mmap_mode="r")` and sliced by sample. `read` loads either
+    format. Samples are read from the results store one at a time.
+    """
+
+    FORMATS = ("parquet", "npy")
+    FOLDER = "tables"
+    INDEX_FILENAME = "index.json"
+
+    PARTICLE_COLUMNS = {
+        name: np.int64 if name == "id" else np.float64
+        for name in ParticleTable.EXPORT_COLUMNS
+    }
+    EDGE_COLUMNS = {"i": np.int32, "j": np.int32, "distance": np.float64}
+
+    # CONSTRUCTOR
+    def __init__(self, output_directory, table_format=None):
+        """
+        Args:
+            output_directory (str): Folder of the run.
+            table_format (str): "parquet" or "npy". Defaults to Parquet when
+                pyarrow is installed and to .npy columns otherwise.
+
+        Raises:
+            FileNotFoundError: If the run has no results store.
+            ValueError: If the format is not valid or pyarrow is missing.
+        """
+        self.output_directory = output_directory
+        self.store = ResultsStore(os.path.join(output_directory, "info"))
+        if not self.store.exists():
+            raise FileNotFoundError(
+                f"[!] The results store does not exist: {self.store.path}"
+            )
+
+        pa, _ = _pyarrow()
+        if table_format is None:
+            table_format = "npy" if pa is None else "parquet"
+        if table_format not in self.FORMATS:
+            raise ValueError(
+                f"Invalid table format: {table_format}. "
+                f"Must be one of {', '.join(self.FORMATS)}."
+            )
+        if table_format == "parquet" and pa is None:
+            raise ValueError("[!] The parquet format requires pyarrow.")
+        self.table_format = table_format
+        self.tables_path = os.path.join(output_directory, self.FOLDER)
+
+    @classmethod
+    def sample_columns(cls, sample_data):
+        """
+        Converts the results of one sample into its particle and edge columns.
+
+        Args:
+            sample_data (dict): Sample results, as stored in the results store.
+
+        Returns:
+            tuple: ({column: ndarray} of the particles, {column: ndarray} of
+            the edges).
+        """
+        records = sample_data.get("particles", [])
+        particles = {
+            # Los NaN se guardan como null en JSON y vuelven a ser NaN aquí
+            name: np.array(
+                [record.get(name) for record in records], dtype=np.float64
+            ).astype(dtype)
+            for name, dtype in cls.PARTICLE_COLUMNS.items()
+        }
+
+        distances = sample_data.get("distances", [])
+        if not isinstance(distances, EdgeStore):
+            distances = EdgeStore.from_records(distances)
+        id_pairs = distances.id_pairs().reshape(-1, 2)
+        edges = {
+            "i": id_pairs[:, 0].astype(np.int32),
+            "j": id_pairs[:, 1].astype(np.int32),
+            "distance": distances.lengths,
+        }
+        return particles, edges
+
+    @measure_execution_time(stage="table_export")
+    def export(self):
+        """
+        Writes the particle and edge tables of the run.
+
+        Returns:
+            dict: {"particles": path, "edges": path}.
+        """
+        os.makedirs(self.tables_path, exist_ok=True)
+        if self.table_format == "parquet":
+            paths = self._export_parquet()
+        else:
+            paths = self._export_npy()
+        for path in paths.values():
+            print(f"[*] Table saved: {path}")
+        return paths
+
+    def _export_parquet(self):
+        pa, pq = _pyarrow()
+        paths = {
+            "particles": os.path.join(self.tables_path, "particles.parquet"),
+            "edges": os.path.join(self.tables_path, "edges.parquet"),
+        }
+        writers = {}
+        try:
+            for sample_name, sample_data in self.store.iter_samples():
+                tables = dict(zip(paths, self.sample_columns(sample_data)))
+                for table, columns in tables.items():
+                    size = len(next(iter(columns.values())))
+                    arrow_table = pa.table(
+                        {
+                            "sample": pa.array([sample_name] * size, pa.string()),
+                            **columns,
+                        }
+                    )
+                    if table not in writers:
+                        writers[table] = pq.ParquetWriter(
+                            paths[table], arrow_table.schema
+                        )
+                    # Un grupo de filas por muestra para poder filtrar sin leer el resto
+                    writers[table].write_table(arrow_table)
+                profiler.count("samples")
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        for path in paths.values():
+            if os.path.isfile(path):
+                profiler.count("table_bytes", os.path.getsize(path))
+        return paths
+
+    def _export_npy(self):
+        layouts = {
+            "particles": self.PARTICLE_COLUMNS,
+            "edges": self.EDGE_COLUMNS,
+        }
+        paths = {table: os.path.join(self.tables_path, table) for table in layouts}
+        for path in paths.values():
+            os.makedirs(path, exist_ok=True)
+
+        columns = {
+            table: {name: _NpyColumn(dtype, path) for name, dtype in layout.items()}
+            for (table, layout), path in zip(layouts.items(), paths.values())
+        }
+        indices = {table: {"samples": [], "offsets": [0]} for table in layouts}
+
+        for sample_name, sample_data in self.store.iter_samples():
+            tables = dict(zip(layouts, self.sample_columns(sample_data)))
+            for table, values in tables.items():
+                for name, column in columns[table].items():
+                    column.append(values[name])
+                indices[table]["samples"].append(sample_name)
+                indices[table]["offsets"].append(column.length)
+            profiler.count("samples")
+
+        for table, path in paths.items():
+            for name, column in columns[table].items():
+                size = column.save(os.path.join(path, f"{name}.npy"))
+                profiler.count("table_bytes", size)
+            index = {"columns": list(layouts[table]), **indices[table]}
+            with open(os.path.join(path, self.INDEX_FILENAME), "w") as index_file:
+                json.dump(index, index_file, indent=4)
+        return paths
+
+    @classmethod
+    def read(cls, output_directory, table="particles", samples=None):
+        """
+        Loads a table of a run written in either format.
+
+        Args:
+            output_directory (str): Folder of the run.
+            table (str): "particles" or "edges".
+            samples (list): If given, only the rows of these samples are read.
+
+        Returns:
+            dict: {column: ndarray}, including "sample" with the sample names.
+            With .npy columns and a single sample, the arrays are read-only
+            memory-mapped slices.
+        """
+        tables_path = os.path.join(output_directory, cls.FOLDER)
+        parquet_path = os.path.join(tables_path, f"{table}.parquet")
+        if os.path.isfile(parquet_path):
+            _, pq = _pyarrow()
+            if pq is None:
+                raise ValueError("[!] Reading parquet tables requires pyarrow.")
+            filters = None if samples is None else [("sample", "in", list(samples))]
+            arrow_table = pq.read_table(parquet_path, filters=filters, memory_map=True)
+            return {
+                name: arrow_table.column(name).to_numpy()
+                for name in arrow_table.column_names
+            }
+
+        folder = os.path.join(tables_path, table)
+        with open(os.path.join(folder, cls.INDEX_FILENAME)) as index_file:
+            index = json.load(index_file)
+        offsets = index["offsets"]
+        names = index["samples"]
+        wanted = (
+            range(len(names))
+            if samples is None
+            else [names.index(name) for name in samples if name in names]
+        )
+        ranges = [(offsets[k], offsets[k + 1]) for k in wanted]
+
+        result = {}
+        for name in index["columns"]:
+            column = np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+            if samples is None:
+                result[name] = column
+            elif len(ranges) == 1:
+                result[name] = column[ranges[0][0] : ranges[0][1]]
+            else:
+                result[name] = np.concatenate(
+                    [column[start:stop] for start, stop in ranges] or [column[:0]]
+                )
+        result["sample"] = np.repeat(
+            np.array([names[k] for k in wanted], dtype=object),
+            [stop - start for start, stop in ranges],
+        )
+        return result
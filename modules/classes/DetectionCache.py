@@ -0,0 +1,193 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+
+class DetectionCache:
+    """
+    On-disk cache of the detection results of an image.
+
+    Entries are keyed by a SHA-256 of the image content plus the processing
+    parameters, so renaming a file keeps its entry and changing a parameter
+    (threshold, CLAHE, kernels, scale, backend, ...) invalidates it. Each
+    entry is a `.npz` file with the particle table columns, the Delaunay
+    edges as int32 and the image size. The total size is bounded: when it is
+    exceeded, the least recently used entries (by modification time, which
+    is refreshed on every hit) are deleted until it is back under
+    LOW_WATER of the limit. The total is kept in memory and the folder is
+    only scanned when it goes over the limit, so storing an entry does not
+    stat the whole cache; entries written by other processes are counted at
+    the next scan.
+    """
+
+    # Se incrementa si cambia el contenido de las entradas
+    VERSION = 1
+    EXTENSION = ".npz"
+    MAX_BYTES = 1024**3
+    # Fracción del límite a la que se vacía: deja margen para varias entradas
+    LOW_WATER = 0.9
+
+    # Una caché por carpeta y proceso, para que el total en memoria se comparta
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    # CONSTRUCTOR
+    def __init__(self, cache_dir, max_bytes=MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): Folder of the cache (created if needed).
+            max_bytes (int): Maximum total size of the entries in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # Bytes de las entradas; None hasta el primer escaneo
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def for_directory(cls, cache_dir, max_bytes=MAX_BYTES):
+        """
+        Returns the cache shared by every user of `cache_dir` in this process.
+
+        Args:
+            cache_dir (str): Folder of the cache.
+            max_bytes (int): Maximum total size of the entries in bytes.
+
+        Returns:
+            DetectionCache: The cache of the folder.
+        """
+        key = os.path.abspath(cache_dir)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(cache_dir, max_bytes)
+            cache = cls._instances[key]
+            cache.max_bytes = max_bytes
+            return cache
+
+    @staticmethod
+    def file_hash(path, chunk_size=1 << 20):
+        """
+        Returns the SHA-256 of the content of a file, read in chunks.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as image_file:
+            for chunk in iter(lambda: image_file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, image_path, parameters):
+        """
+        Builds the key of an image processed with the given parameters.
+
+        Args:
+            image_path (str): Path of the image.
+            parameters (dict): JSON-serializable processing parameters.
+
+        Returns:
+            str: Hexadecimal key.
+        """
+        digest = hashlib.sha256()
+        digest.update(self.file_hash(image_path).encode())
+        digest.update(
+            json.dumps({"version": self.VERSION, **parameters}, sort_keys=True).encode()
+        )
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.EXTENSION)
+
+    def load(self, key):
+        """
+        Reads an entry and marks it as recently used.
+
+        Args:
+            key (str): Key of the entry.
+
+        Returns:
+            dict or None: {name: ndarray} with the stored arrays, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            os.utime(path)
+        except (OSError, ValueError):
+            # Entrada inexistente, desalojada por otro proceso o dañada
+            return None
+        return arrays
+
+    def store(self, key, arrays):
+        """
+        Writes an entry atomically and evicts old entries if the cache is full.
+
+        Args:
+            key (str): Key of the entry.
+            arrays (dict): {name: ndarray} to store.
+
+        Returns:
+            str: Path of the entry.
+        """
+        path = self._path(key)
+        descriptor, tmp_path = tempfile.mkstemp(
+            dir=self.cache_dir, suffix=".tmp" + self.EXTENSION
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as tmp_file:
+                np.savez(tmp_file, **arrays)
+                size = tmp_file.tell()
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total is not None:
+                self._total += size - replaced
+            full = self._total is None or self._total > self.max_bytes
+        # Solo se recorre la carpeta al empezar o cuando el total pasa del límite
+        if full:
+            self.evict()
+        return path
+
+    def evict(self):
+        """
+        Deletes the least recently used entries if the cache does not fit in
+        `max_bytes`, down to LOW_WATER of it.
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith(self.EXTENSION) and ".tmp" not in entry.name:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.LOW_WATER if total > self.max_bytes else total
+        deleted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        with self._lock:
+            self._total = total
+        return deleted
@@ -0,0 +1,141 @@
+import numpy as np
+
+
+class EdgeStore:
+    """
+    Compact container of the edges between particles and their lengths.
+
+    Edges are kept as an int32 (E, 2) array of particle indices and a float64
+    (E,) array of lengths, about 16 bytes per edge; the ids and coordinates
+    of the particles are looked up from the arrays of the particle table
+    (shared, not copied). The legacy format, one
+    `{"pair": {id1: (x1, y1), id2: (x2, y2)}, "distance": d}` dict per edge,
+    is only built on demand: when iterating or indexing the store and when
+    it is serialized to JSON (see `to_records`).
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, edges, lengths, ids, points):
+        """
+        Args:
+            edges (array-like): (E, 2) indices of the particles of every edge.
+            lengths (array-like): (E,) length of every edge.
+            ids (array-like): (N,) ids of the particles.
+            points (array-like): (N, 2) coordinates of the particles.
+        """
+        self.edges = np.ascontiguousarray(edges, dtype=np.int32).reshape(-1, 2)
+        self.lengths = np.ascontiguousarray(lengths, dtype=np.float64)
+        self.ids = np.asarray(ids)
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+        if len(self.lengths) != len(self.edges):
+            raise ValueError(
+                f"[!] Expected {len(self.edges)} lengths, got {len(self.lengths)}."
+            )
+
+    @classmethod
+    def from_table(cls, edges, lengths, table):
+        """
+        Builds the store of the edges between the particles of a ParticleTable.
+
+        Args:
+            edges (array-like): (E, 2) indices into the table.
+            lengths (array-like): (E,) lengths in um.
+            table (ParticleTable): Table with the ids and coordinates.
+
+        Returns:
+            EdgeStore: The new store.
+        """
+        return cls(edges, lengths, table.id, table.coordinates)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds the store from edges in the legacy format, e.g. as read back from
+        the results store (ids are converted back to int when possible).
+
+        Args:
+            records (iterable): {"pair": {id1: (x1, y1), id2: (x2, y2)},
+                "distance": d} dicts.
+
+        Returns:
+            EdgeStore: The new store.
+        """
+        index = {}
+        points = []
+        edges = []
+        lengths = []
+        for record in records:
+            pair = []
+            for key, point in record["pair"].items():
+                particle_id = int(key) if str(key).lstrip("-").isdigit() else key
+                if particle_id not in index:
+                    index[particle_id] = len(points)
+                    points.append(point)
+                pair.append(index[particle_id])
+            edges.append(pair)
+            lengths.append(record["distance"])
+
+        return cls(edges, lengths, list(index), points)
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __bool__(self):
+        return len(self.edges) > 0
+
+    def __getitem__(self, index):
+        """
+        Returns one edge in the legacy dict format.
+        """
+        i, j = self.edges[index].tolist()
+        id_i, id_j = self.ids[[i, j]].tolist()
+        return {
+            "pair": {
+                id_i: tuple(self.points[i].tolist()),
+                id_j: tuple(self.points[j].tolist()),
+            },
+            "distance": float(self.lengths[index]),
+        }
+
+    def __iter__(self):
+        """
+        Yields the edges one at a time in the legacy dict format.
+        """
+        ids = self.ids.tolist()
+        coords = [tuple(point) for point in self.points.tolist()]
+        for (i, j), distance in zip(self.edges.tolist(), self.lengths.tolist()):
+            yield {"pair": {ids[i]: coords[i], ids[j]: coords[j]}, "distance": distance}
+
+    def __repr__(self):
+        return f"EdgeStore with {len(self)} edges."
+
+    @property
+    def nbytes(self):
+        """
+        Bytes used by the edge and length arrays.
+        """
+        return self.edges.nbytes + self.lengths.nbytes
+
+    def id_pairs(self):
+        """
+        Returns the (E, 2) ids of the particles of every edge.
+        """
+        return self.ids[self.edges]
+
+    def rows(self):
+        """
+        Yields (id_1, id_2, x_1, y_1, x_2, y_2, distance) tuples, the layout of
+        the distance table of the Excel sheets, without building the dicts.
+        """
+        ids = self.ids.tolist()
+        coords = self.points.tolist()
+        for (i, j), distance in zip(self.edges.tolist(), self.lengths.tolist()):
+            yield (ids[i], ids[j], *coords[i], *coords[j], distance)
+
+    def to_records(self):
+        """
+        Returns every edge in the legacy dict format (used to serialize the
+        store to JSON).
+        """
+        return list(self)
@@ -1,106 +1,352 @@
 import os
-import json
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.chart import ScatterChart, Reference, Series
+from itertools import zip_longest
+from modules.classes.ResultsStore import ResultsStore
+from modules.classes.EdgeStore import EdgeStore
+from modules.decorators import measure_execution_time, profiler
+
+# pandas y openpyxl se importan dentro de los métodos: solo los carga quien exporta
 
 
 class ExcelExporter:
+    # Columnas de las tablas de cada hoja de muestra (como en el export con pandas)
+    DISTANCE_COLUMNS = ("id_1", "id_2", "x_1", "y_1", "x_2", "y_2", "distance")
+    DISTANCE_STARTCOL = 4
+    PARTICLE_STARTCOL = 12
+
     def __init__(self, output_directory):
         self.output_directory = output_directory
-        self.results_json_path = os.path.join(
-            self.output_directory, "info", "results.json"
-        )
-        if not os.path.isfile(self.results_json_path):
+        self.store = ResultsStore(os.path.join(self.output_directory, "info"))
+        if not self.store.exists():
             raise FileNotFoundError(
-                f"El archivo JSON no existe en la ruta: {self.results_json_path}"
+                f"El almacén de resultados no existe en la ruta: {self.store.path}"
             )
 
-    def process_json_to_excel(self):
+    @measure_execution_time(stage="excel_export")
+    def process_json_to_excel(self, streaming=True, charts=False):
+        """
+        Writes results.xlsx from the results store of the run, reading the
+        samples one at a time.
+
+        Args:
+            streaming (bool): If True, rows are streamed through an openpyxl
+                write-only workbook, so memory is bounded by the largest sample
+                instead of the whole workbook. If False, every sheet is built
+                with pandas in a normal workbook.
+            charts (bool): If True, adds a scatter chart of the distance pairs
+                to every sample sheet (streaming mode only).
+        """
+        if streaming:
+            return self._stream_to_excel(charts=charts)
+
+        import pandas as pd
+
         try:
-            with open(self.results_json_path, "r") as f:
-                data = json.load(f)
+            data = {
+                "reference": dict(self.store.iter_section("reference")),
+                "metadata": dict(self.store.iter_section("metadata")),
+            }
 
             excel_file_path = os.path.join(self.output_directory, "results.xlsx")
             with pd.ExcelWriter(excel_file_path, engine="openpyxl") as writer:
                 self._write_ref_sheet(writer, data)
-                for sample_name, sample_data in data.get("samples", {}).items():
+                for sample_name, sample_data in self.store.iter_samples():
                     self._write_sample_sheet(writer, sample_name, sample_data)
+                    profiler.count("samples")
 
+            profiler.count("excel_bytes", os.path.getsize(excel_file_path))
             print(f"Archivo Excel guardado en: {excel_file_path}")
             return excel_file_path
         except Exception as e:
-            print(f"Error procesando el archivo JSON: {e}")
+            print(f"Error procesando los resultados: {e}")
             raise
 
+    @measure_execution_time(stage="excel_update")
+    def update_excel(self, sample_names, removed=(), charts=False):
+        """
+        Updates results.xlsx in place after an incremental run: rewrites the
+        reference sheet and the sheets of the given samples, in their current
+        position, and deletes the sheets of the removed samples. Without a
+        workbook, the whole workbook is written.
+
+        Args:
+            sample_names (list): Samples whose sheets are (re)written.
+            removed (list): Samples whose sheets are deleted.
+            charts (bool): If True, adds a scatter chart of the distance pairs
+                to every rewritten sample sheet.
+
+        Returns:
+            str: Path of the workbook.
+        """
+        excel_file_path = os.path.join(self.output_directory, "results.xlsx")
+        if not os.path.isfile(excel_file_path):
+            return self.process_json_to_excel(charts=charts)
+
+        import pandas as pd
+
+        data = {
+            "reference": dict(self.store.iter_section("reference")),
+            "metadata": dict(self.store.iter_section("metadata")),
+        }
+        with pd.ExcelWriter(
+            excel_file_path, engine="openpyxl", mode="a", if_sheet_exists="overlay"
+        ) as writer:
+            book = writer.book
+            for sheet_name in removed:
+                if sheet_name in book.sheetnames:
+                    del book[sheet_name]
+
+            # Las hojas que se rehacen se borran enteras para no dejar filas sobrantes
+            positions = {
+                sheet_name: book.sheetnames.index(sheet_name)
+                for sheet_name in ["ref", *sample_names]
+                if sheet_name in book.sheetnames
+            }
+            for sheet_name in positions:
+                del book[sheet_name]
+
+            self._write_ref_sheet(writer, data)
+            for sample_name, sample_data in self.store.iter_section(
+                "samples", keys=sample_names
+            ):
+                self._write_sample_sheet(writer, sample_name, sample_data)
+                count = len(sample_data.get("distances", []))
+                if charts and count:
+                    sheet = book[sample_name]
+                    self._add_distance_chart(
+                        sheet, sample_name, count, sheet.max_column
+                    )
+                profiler.count("samples")
+
+            # Cada hoja reescrita vuelve a su posición; las nuevas quedan al final
+            for sheet_name, position in sorted(
+                positions.items(), key=lambda item: item[1]
+            ):
+                if sheet_name in book.sheetnames:
+                    book.move_sheet(
+                        sheet_name, position - book.sheetnames.index(sheet_name)
+                    )
+
+        profiler.count("excel_bytes", os.path.getsize(excel_file_path))
+        print(f"Archivo Excel actualizado: {excel_file_path}")
+        return excel_file_path
+
     def _write_ref_sheet(self, writer, data):
-        ref_data = data.get("reference", {})
-        metadata = data.get("metadata", {})
-        scale_info = ref_data.get("scale", {})
+        import pandas as pd
+
+        rows = self._ref_rows(data)
         ref_df = pd.DataFrame(
             {
-                "Property": [
-                    "Scale Value",
-                    "Scale Unit",
-                    "Image Path",
-                    "Created At",
-                    "Description",
-                ],
-                "Value": [
-                    scale_info.get("value", "N/A"),
-                    scale_info.get("unit", "N/A"),
-                    ref_data.get("image_path", "N/A"),
-                    metadata.get("created_at", "N/A"),
-                    metadata.get("description", "N/A"),
-                ],
+                "Property": [name for name, _ in rows],
+                "Value": [value for _, value in rows],
             }
         )
         ref_df.to_excel(writer, index=False, sheet_name="ref")
 
+    def _flatten_properties(self, data, prefix=""):
+        """
+        Flattens nested dictionaries into (property, value) rows, joining keys
+        with dots. Lists and other non-scalar values are skipped.
+        """
+        rows = []
+        for key, value in data.items():
+            name = f"{prefix}{key}"
+            if isinstance(value, dict):
+                rows.extend(self._flatten_properties(value, prefix=f"{name}."))
+            elif value is None or isinstance(value, (str, int, float, bool)):
+                rows.append((name, value))
+        return rows
+
     def _write_sample_sheet(self, writer, sample_name, sample_data):
+        import pandas as pd
+
+        properties = self._flatten_properties(
+            {
+                key: value
+                for key, value in sample_data.items()
+                if key not in ("distances", "particles")
+            }
+        )
         base_data = {
-            "Property": [key for key in sample_data.keys() if key != "distances"],
-            "Value": [
-                value for key, value in sample_data.items() if key != "distances"
-            ],
+            "Property": [key for key, _ in properties],
+            "Value": [value for _, value in properties],
         }
         sample_df = pd.DataFrame(base_data)
         sample_df.to_excel(writer, index=False, sheet_name=sample_name, startcol=0)
 
         distances = sample_data.get("distances", [])
         if distances:
-            distance_rows = []
-            for dist in distances:
-                pair = dist.get("pair", {})
-                keys = list(pair.keys())
-                if len(keys) == 2:
-                    id_1, id_2 = keys
-                    x_1, y_1 = pair[id_1]
-                    x_2, y_2 = pair[id_2]
-                    distance = dist.get("distance", 0)
-                    distance_rows.append([id_1, id_2, x_1, y_1, x_2, y_2, distance])
             distance_df = pd.DataFrame(
-                distance_rows,
-                columns=["id_1", "id_2", "x_1", "y_1", "x_2", "y_2", "distance"],
+                list(self._distance_rows(distances)),
+                columns=list(self.DISTANCE_COLUMNS),
             )
             distance_df.to_excel(
-                writer, index=False, sheet_name=sample_name, startcol=4, startrow=0
+                writer,
+                index=False,
+                sheet_name=sample_name,
+                startcol=self.DISTANCE_STARTCOL,
+                startrow=0,
+            )
+
+        # Descriptores por partícula a la derecha de las distancias
+        particles = sample_data.get("particles", [])
+        if particles:
+            particle_df = pd.DataFrame(particles)
+            particle_df.to_excel(
+                writer,
+                index=False,
+                sheet_name=sample_name,
+                startcol=self.PARTICLE_STARTCOL,
+                startrow=0,
             )
 
-    def _add_charts_to_samples(self, excel_file_path, data):
-        wb = load_workbook(excel_file_path)
-        for sample_name in data.get("samples", {}).keys():
-            ws = wb[sample_name]
-            chart = ScatterChart()
-            chart.title = f"Scatter Plot for {sample_name}"
-            chart.x_axis.title = "X Coordinate"
-            chart.y_axis.title = "Y Coordinate"
+    def _stream_to_excel(self, charts=False):
+        """
+        Writes results.xlsx row by row in write-only mode, with the same layout
+        as the pandas export: properties in columns A-B, distances from column
+        E and particles from column M, all starting on the header row.
+        """
+        from openpyxl import Workbook
+        from openpyxl.styles import Font
+
+        excel_file_path = os.path.join(self.output_directory, "results.xlsx")
+        workbook = Workbook(write_only=True)
+        bold = Font(bold=True)
+
+        data = {
+            "reference": dict(self.store.iter_section("reference")),
+            "metadata": dict(self.store.iter_section("metadata")),
+        }
+        ref_sheet = workbook.create_sheet("ref")
+        ref_sheet.append(self._header_cells(ref_sheet, ("Property", "Value"), bold))
+        for row in self._ref_rows(data):
+            ref_sheet.append(row)
+
+        for sample_name, sample_data in self.store.iter_samples():
+            sheet = workbook.create_sheet(sample_name)
+            rows = self._sample_rows(sheet, sample_data, bold)
+            for row in rows["rows"]:
+                sheet.append(row)
+            if charts and rows["distances"]:
+                self._add_distance_chart(
+                    sheet, sample_name, rows["distances"], rows["width"]
+                )
+            profiler.count("samples")
+
+        workbook.save(excel_file_path)
+        profiler.count("excel_bytes", os.path.getsize(excel_file_path))
+        print(f"Archivo Excel guardado en: {excel_file_path}")
+        return excel_file_path
+
+    @staticmethod
+    def _header_cells(sheet, names, font):
+        from openpyxl.cell import WriteOnlyCell
+
+        cells = []
+        for name in names:
+            cell = WriteOnlyCell(sheet, value=name)
+            cell.font = font
+            cells.append(cell)
+        return cells
+
+    @staticmethod
+    def _ref_rows(data):
+        ref_data = data.get("reference", {})
+        metadata = data.get("metadata", {})
+        scale_info = ref_data.get("scale", {})
+        return [
+            ("Scale Value", scale_info.get("value", "N/A")),
+            ("Scale Unit", scale_info.get("unit", "N/A")),
+            ("Image Path", ref_data.get("image_path", "N/A")),
+            ("Created At", metadata.get("created_at", "N/A")),
+            ("Description", metadata.get("description", "N/A")),
+        ]
+
+    def _distance_rows(self, distances):
+        if isinstance(distances, EdgeStore):
+            yield from distances.rows()
+            return
+        for dist in distances:
+            pair = dist.get("pair", {})
+            keys = list(pair.keys())
+            if len(keys) == 2:
+                id_1, id_2 = keys
+                x_1, y_1 = pair[id_1]
+                x_2, y_2 = pair[id_2]
+                yield (id_1, id_2, x_1, y_1, x_2, y_2, dist.get("distance", 0))
+
+    def _sample_rows(self, sheet, sample_data, font):
+        """
+        Builds the row generator of a sample sheet, merging its property,
+        distance and particle tables side by side.
+
+        Returns:
+            dict: 'rows' (generator of rows, header included), 'distances'
+            (number of distance rows) and 'width' (number of columns used).
+        """
+        properties = self._flatten_properties(
+            {
+                key: value
+                for key, value in sample_data.items()
+                if key not in ("distances", "particles")
+            }
+        )
+        count = len(sample_data.get("distances", []))
+        distances = self._distance_rows(sample_data.get("distances", []))
+        particles = sample_data.get("particles", [])
+        particle_columns = list(particles[0]) if particles else []
+
+        width = 2
+        if count:
+            width = self.DISTANCE_STARTCOL + len(self.DISTANCE_COLUMNS)
+        if particle_columns:
+            width = self.PARTICLE_STARTCOL + len(particle_columns)
+
+        def rows():
+            header = [None] * width
+            header[0:2] = self._header_cells(sheet, ("Property", "Value"), font)
+            if count:
+                start = self.DISTANCE_STARTCOL
+                header[start : start + len(self.DISTANCE_COLUMNS)] = self._header_cells(
+                    sheet, self.DISTANCE_COLUMNS, font
+                )
+            if particle_columns:
+                start = self.PARTICLE_STARTCOL
+                header[start : start + len(particle_columns)] = self._header_cells(
+                    sheet, particle_columns, font
+                )
+            yield header
+
+            for prop, dist, particle in zip_longest(properties, distances, particles):
+                row = [None] * width
+                if prop is not None:
+                    row[0:2] = prop
+                if dist is not None:
+                    start = self.DISTANCE_STARTCOL
+                    row[start : start + len(dist)] = dist
+                if particle is not None:
+                    start = self.PARTICLE_STARTCOL
+                    row[start : start + len(particle_columns)] = [
+                        particle.get(column) for column in particle_columns
+                    ]
+                yield row
+
+        return {"rows": rows(), "distances": count, "width": width}
 
-            x_values = Reference(ws, min_col=6, min_row=2, max_row=ws.max_row)
-            y_values = Reference(ws, min_col=7, min_row=2, max_row=ws.max_row)
+    def _add_distance_chart(self, sheet, sample_name, count, width):
+        """
+        Adds the scatter chart of the first particle of every distance pair
+        (columns x_1, y_1), to the right of the tables of the sheet.
+        """
+        from openpyxl.chart import ScatterChart, Reference, Series
+        from openpyxl.utils import get_column_letter
 
-            series = Series(y_values, x_values, title="Particle Pairs")
-            chart.series.append(series)
+        chart = ScatterChart()
+        chart.title = f"Scatter Plot for {sample_name}"
+        chart.x_axis.title = "X Coordinate"
+        chart.y_axis.title = "Y Coordinate"
 
-            ws.add_chart(chart, "J1")  # Coloca el gráfico en una posición fija
-        wb.save(excel_file_path)
+        x_column = self.DISTANCE_STARTCOL + self.DISTANCE_COLUMNS.index("x_1") + 1
+        x_values = Reference(sheet, min_col=x_column, min_row=2, max_row=count + 1)
+        y_values = Reference(sheet, min_col=x_column + 1, min_row=2, max_row=count + 1)
+        chart.series.append(Series(y_values, x_values, title="Particle Pairs"))
+        sheet.add_chart(chart, f"{get_column_letter(width + 2)}1")
@@ -0,0 +1,195 @@
+import os
+import time
+from modules.classes.SampleManifest import SampleManifest
+
+
+class HotFolder:
+    """
+    Polls folders where an acquisition system drops sample images and reports
+    every new or modified image once it is completely written.
+
+    A file is taken as complete when its size and modification time have not
+    changed for `settle_time` seconds and, for PNG files, it ends with the
+    IEND chunk. Images already in the manifest (same content) are not
+    reported again, so a service can be restarted on the same run. Images
+    whose processing failed are retried only after they change. An image
+    with the same sample name (file name without extension) as another one
+    that is still present is not reported, since its results would replace
+    the other's.
+    """
+
+    # Fin de un PNG completo: longitud 0, tipo IEND y su CRC
+    PNG_TRAILER = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+    # CONSTRUCTOR
+    def __init__(
+        self,
+        directories,
+        prefix="sample",
+        extensions=(".png",),
+        settle_time=2.0,
+        manifest=None,
+    ):
+        """
+        Args:
+            directories (list): Folders to watch.
+            prefix (str): Prefix of the sample images.
+            extensions (tuple): Extensions of the sample images.
+            settle_time (float): Seconds a file must stay unchanged before it
+                is reported.
+            manifest (SampleManifest): Fingerprints of the samples already
+                processed. Updated as samples are marked done.
+
+        Raises:
+            NotADirectoryError: If a folder does not exist.
+        """
+        for directory in directories:
+            if not os.path.isdir(directory):
+                raise NotADirectoryError(
+                    f"[!] The directory '{directory}' does not exist."
+                )
+        self.directories = list(directories)
+        self.prefix = prefix
+        self.extensions = tuple(extensions)
+        self.settle_time = settle_time
+        self.manifest = manifest or SampleManifest()
+
+        # Ruta -> ((tamaño, mtime), instante desde el que no cambia)
+        self._seen = {}
+        # Ruta -> huella de las muestras entregadas y aún no terminadas
+        self._claimed = {}
+        # Ruta -> (tamaño, mtime) con el que falló el procesamiento
+        self._failed = {}
+        # Rutas omitidas por compartir el nombre de muestra con otra imagen
+        self._conflicts = set()
+
+    def _scan(self):
+        for directory in self.directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if (
+                        entry.name.startswith(self.prefix)
+                        and entry.name.endswith(self.extensions)
+                        and entry.is_file()
+                    ):
+                        yield entry.path, entry.stat()
+
+    def _name_owner(self, name, path):
+        """
+        Returns the path of another image that is present and already uses
+        the sample name `name`, or None.
+        """
+        others = [other for other in self._claimed if other != path]
+        previous = self.manifest.fingerprints.get(name)
+        if previous:
+            others.append(previous["path"])
+        for other in others:
+            if SampleManifest.sample_name(other) != name or not os.path.exists(other):
+                continue
+            if os.path.realpath(other) != os.path.realpath(path):
+                return other
+        return None
+
+    @classmethod
+    def is_complete(cls, path):
+        """
+        Returns False if the file is clearly truncated (a PNG without its
+        IEND chunk); other formats only rely on the settle time.
+        """
+        if not path.lower().endswith(".png"):
+            return True
+        try:
+            with open(path, "rb") as image_file:
+                image_file.seek(0, os.SEEK_END)
+                if image_file.tell() < len(cls.PNG_TRAILER):
+                    return False
+                image_file.seek(-len(cls.PNG_TRAILER), os.SEEK_END)
+                return image_file.read() == cls.PNG_TRAILER
+        except OSError:
+            return False
+
+    def poll(self, now=None):
+        """
+        Scans the folders once.
+
+        Args:
+            now (float): Current time.monotonic(); defaults to the clock.
+
+        Returns:
+            list: Sorted paths of the images that are complete and have not
+            been processed yet. Each one is reported once until it is marked
+            done or failed.
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+        present = set()
+        for path, stat in self._scan():
+            present.add(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if path in self._claimed or self._failed.get(path) == signature:
+                continue
+
+            name = SampleManifest.sample_name(path)
+            owner = self._name_owner(name, path)
+            if owner is not None:
+                if path not in self._conflicts:
+                    print(
+                        f"[!] Skipped {path}: its sample name '{name}' is "
+                        f"already used by {owner}."
+                    )
+                    self._conflicts.add(path)
+                continue
+            self._conflicts.discard(path)
+
+            previous = self.manifest.fingerprints.get(name)
+            if previous and (previous["size"], previous["mtime_ns"]) == signature:
+                continue
+
+            # El reloj de espera vuelve a empezar cada vez que el archivo cambia
+            seen = self._seen.get(path)
+            if seen is None or seen[0] != signature:
+                self._seen[path] = (signature, now)
+                if self.settle_time > 0:
+                    continue
+            elif now - seen[1] < self.settle_time:
+                continue
+            if stat.st_size == 0 or not self.is_complete(path):
+                continue
+
+            fingerprint = SampleManifest.fingerprint(path, previous)
+            del self._seen[path]
+            if previous and previous.get("sha256") == fingerprint["sha256"]:
+                # Solo se tocó o se copió: mismo contenido, no se procesa
+                self.manifest.fingerprints[name] = fingerprint
+                continue
+            self._claimed[path] = fingerprint
+            ready.append(path)
+
+        # Olvidar los archivos que desaparecieron antes de completarse
+        for path in set(self._seen) - present:
+            del self._seen[path]
+        self._conflicts &= present
+        return sorted(ready)
+
+    def mark_done(self, path):
+        """
+        Records a reported image as processed.
+        """
+        fingerprint = self._claimed.pop(path)
+        self._failed.pop(path, None)
+        self.manifest.fingerprints[SampleManifest.sample_name(path)] = fingerprint
+
+    def mark_failed(self, path):
+        """
+        Records that a reported image could not be processed; it is reported
+        again once its size or modification time change.
+        """
+        fingerprint = self._claimed.pop(path)
+        self._failed[path] = (fingerprint["size"], fingerprint["mtime_ns"])
+
+    def release(self, path):
+        """
+        Returns a reported image that was not processed; it is reported again
+        on the next poll.
+        """
+        del self._claimed[path]
@@ -1,7 +1,13 @@
 import cv2 as cv
 import os
-from matplotlib import pyplot as plt
-from modules.classes.Particle import Particle
+import shutil
+import tempfile
+import numpy as np
+from modules.classes.ParticleTable import ParticleTable
+from modules.geometry import label_moments, shape_descriptors
+from modules.classes.ArtifactRegistry import ArtifactRegistry
+from modules.decorators import measure_execution_time, profiler
+from modules.plotting import pyplot
 
 
 class Image:
@@ -10,13 +16,202 @@ class Image:
     """
 
     # CONSTRUCTOR
-    def __init__(self, image_path):
+    def __init__(self, image_path, keep_original=True):
         self.image_path = image_path
-        self.original = cv.imread(image_path)  # cargamos la imagen del constructor
-        self.gray = cv.cvtColor(self.original, cv.COLOR_BGR2GRAY)
-        self.hsv = cv.cvtColor(self.original, cv.COLOR_BGR2HSV)  # Convertir a HSV
+        original = cv.imread(image_path)  # cargamos la imagen del constructor
+        self.gray = cv.cvtColor(original, cv.COLOR_BGR2GRAY)
+        # Si no se necesita, la imagen a color se libera tras la conversión
+        self._original = original if keep_original else None
+        self._hsv = None
         self.th = None
 
+    @property
+    def shape(self):
+        """
+        (height, width) of the image in pixels.
+        """
+        return self.gray.shape
+
+    @property
+    def original(self):
+        """
+        BGR image. If it was released after decoding, it is read again.
+        """
+        if self._original is None:
+            self._original = cv.imread(self.image_path)
+        return self._original
+
+    @property
+    def hsv(self):
+        """
+        HSV version of the image, computed only when it is first requested.
+        """
+        if self._hsv is None:
+            self._hsv = cv.cvtColor(self.original, cv.COLOR_BGR2HSV)
+        return self._hsv
+
+
+class TiledImage:
+    """
+    Grayscale image that is read in overlapping tiles instead of as a whole.
+
+    `.npy` files are memory-mapped, so only the tile being processed is read
+    from disk. Other formats cannot be decoded partially: they are decoded
+    once straight to grayscale (one byte per pixel, a third of the colour
+    image), spilled to a temporary memory-mapped file and released, so the
+    processing afterwards only holds one tile. The peak memory of that
+    decode still grows with the image size.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, image_path, tile_size=2048, overlap=64):
+        """
+        Args:
+            image_path (str): Path of the image (`.npy` arrays are memory-mapped).
+            tile_size (int): Side in pixels of the tiles each pixel belongs to.
+            overlap (int): Extra pixels read around every tile. It must be
+                larger than the biggest particle so that every particle is
+                complete in at least one tile.
+        """
+        if tile_size <= 0 or overlap < 0:
+            raise ValueError("The tile size must be positive and the overlap >= 0.")
+
+        self.image_path = image_path
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.th = None
+        self._spill_dir = None
+
+        if image_path.lower().endswith(".npy"):
+            self._data = np.load(image_path, mmap_mode="r")
+        else:
+            self._data = self._spill_to_memmap(image_path)
+
+    def _spill_to_memmap(self, image_path):
+        # El decodificador convierte a gris fila a fila: nunca existe la imagen a
+        # color (libpng puede redondear un nivel distinto que cv.cvtColor)
+        gray = cv.imread(image_path, cv.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"[!] The image '{image_path}' could not be read.")
+
+        self._spill_dir = tempfile.mkdtemp(prefix="tiles_")
+        gray_path = os.path.join(self._spill_dir, "gray.npy")
+        np.save(gray_path, gray)
+        del gray
+
+        return np.load(gray_path, mmap_mode="r")
+
+    @property
+    def shape(self):
+        """
+        (height, width) of the image in pixels.
+        """
+        return self._data.shape[:2]
+
+    def read(self, y0, y1, x0, x1):
+        """
+        Reads a region of the image as a contiguous grayscale array.
+        """
+        block = np.ascontiguousarray(self._data[y0:y1, x0:x1])
+        if block.ndim == 3:
+            block = cv.cvtColor(block, cv.COLOR_BGR2GRAY)
+        return block
+
+    def tiles(self):
+        """
+        Yields the tiles of the image in row-major order.
+
+        Yields:
+            tuple: (core, padded) regions as (y0, y1, x0, x1). The cores
+            partition the image; the padded regions extend them by `overlap`.
+        """
+        height, width = self.shape
+        for y0 in range(0, height, self.tile_size):
+            for x0 in range(0, width, self.tile_size):
+                y1 = min(y0 + self.tile_size, height)
+                x1 = min(x0 + self.tile_size, width)
+                padded = (
+                    max(y0 - self.overlap, 0),
+                    min(y1 + self.overlap, height),
+                    max(x0 - self.overlap, 0),
+                    min(x1 + self.overlap, width),
+                )
+                yield (y0, y1, x0, x1), padded
+
+    def close(self):
+        """
+        Releases the memory map and deletes the temporary grayscale file.
+        """
+        self._data = None
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __del__(self):
+        self.close()
+
+
+def contour_properties(contours):
+    """
+    Calculates the centroid, area and perimeter (in pixels) of every contour
+    with a non-zero area.
+
+    Args:
+        contours (list): Contours as returned by cv.findContours.
+
+    Returns:
+        tuple: (indices, centroids, areas, perimeters, moments) of the
+        contours with a non-zero area; `centroids` are integer (cx, cy)
+        tuples and `moments` a (K, 3) array with mu20, mu02 and mu11.
+    """
+    indices = []
+    centroids = []
+    areas = []
+    perimeters = []
+    moments = []
+    for index, contour in enumerate(contours):
+        M = cv.moments(contour)
+        if M["m00"] != 0:  # Evitar división por cero
+            cx = int(M["m10"] / M["m00"])
+            cy = int(M["m01"] / M["m00"])
+            indices.append(index)
+            centroids.append((cx, cy))
+            areas.append(M["m00"])
+            perimeters.append(cv.arcLength(contour, True))
+            moments.append((M["mu20"], M["mu02"], M["mu11"]))
+    moments = np.array(moments, dtype=np.float64).reshape(-1, 3)
+    return indices, centroids, areas, perimeters, moments
+
+
+def component_properties(binary, min_area=1):
+    """
+    Calculates the centroid, area and bounding box (in pixels) of every
+    8-connected component of a binarized image in one native call.
+
+    Args:
+        binary (ndarray): Binarized image (non-zero pixels are foreground).
+        min_area (int): Components with fewer pixels are discarded.
+
+    Returns:
+        tuple: (centroids, areas, boxes, moments) with the (K, 2) integer
+        centroids, the (K,) areas as pixel counts, the (K, 4) boxes
+        (x, y, w, h) and the (K, 3) central moments mu20, mu02, mu11 of the
+        pixels. The background label is excluded.
+    """
+    count, labels, stats, centroids = cv.connectedComponentsWithStats(
+        binary, connectivity=8
+    )
+    _, mu20, mu02, mu11 = label_moments(
+        labels, count, origins=stats[1:, :2], foreground=binary
+    )
+    keep = stats[1:, cv.CC_STAT_AREA] >= min_area
+    return (
+        centroids[1:][keep].astype(np.int64),
+        stats[1:, cv.CC_STAT_AREA][keep].astype(np.float64),
+        stats[1:, :4][keep].astype(np.int64),
+        np.column_stack((mu20, mu02, mu11))[keep],
+    )
+
 
 class ParticleList:
     """
@@ -27,7 +222,45 @@ class ParticleList:
     def __init__(self):
         self.contours = None
         self.centroids = None
-        self.particle_list = None
+        self.areas = None  # Áreas de los contornos en píxeles^2
+        self.perimeters = None  # Perímetros de los contornos en píxeles
+        self.boxes = None  # Cajas (x, y, w, h) en píxeles, si el backend las da
+        self.moments = None  # Momentos centrales (mu20, mu02, mu11) en píxeles
+        self.edges = None  # Bordes (E, 2) de la triangulación, si vienen de la caché
+        self._table = None  # ParticleTable con las columnas de las partículas
+        self._particle_list = None
+
+    @property
+    def table(self):
+        """
+        ParticleTable with the columns of the detected particles.
+        """
+        return self._table
+
+    @table.setter
+    def table(self, table):
+        # La lista de Particle se regenera a partir de la nueva tabla
+        self._table = table
+        self._particle_list = None
+
+    @property
+    def particle_list(self):
+        """
+        List of Particle objects, created lazily from the table the first time
+        it is accessed.
+        """
+        if self._particle_list is None and self.table is not None:
+            self._particle_list = self.table.to_particle_list()
+        return self._particle_list
+
+    @particle_list.setter
+    def particle_list(self, particle_list):
+        self._table = (
+            None
+            if particle_list is None
+            else ParticleTable.from_particles(particle_list)
+        )
+        self._particle_list = particle_list
 
 
 class ImageProcessor:
@@ -35,43 +268,190 @@ class ImageProcessor:
     Class to process images to detect particles and calculate their properties.
     """
 
+    # Tipos de figuras que puede guardar el procesador
+    ARTIFACT_KINDS = ("reference", "binarized", "contours", "centroids")
+
+    # Políticas de figuras: ninguna, solo el resumen o todos los pasos intermedios
+    ARTIFACT_POLICIES = {
+        "none": (),
+        "summary": ("centroids",),
+        "debug": ARTIFACT_KINDS,
+    }
+
+    # Detección: contornos + momentos, o componentes conexas en una sola llamada
+    DETECTION_BACKENDS = ("contours", "components")
+
+    # Componentes más pequeñas (en píxeles) que se descartan: las de 1-2 píxeles
+    # son contornos de área nula, que el backend de contornos ya descarta
+    MIN_COMPONENT_AREA = 3
+
+    # Parámetros de la binarización (forman parte de la clave de la caché)
+    CLAHE_CLIP_LIMIT = 3.0
+    CLAHE_TILE_GRID = (8, 8)
+    BLUR_KERNEL = (3, 3)
+    DILATE_KERNEL = (3, 3)
+    MANUAL_THRESHOLD = 30
+
+    # Figuras dibujadas sobre la imagen: con un acierto de la caché, la imagen
+    # solo se decodifica (y binariza, para las dos primeras) si se piden
+    IMAGE_ARTIFACTS = ("binarized", "contours", "centroids")
+
     # CONSTRUCTOR
-    def __init__(self, image_path, figures_path, info_path):
+    def __init__(
+        self,
+        image_path,
+        figures_path,
+        info_path,
+        defer_saves=False,
+        artifacts=None,
+        artifact_policy="debug",
+        registry=None,
+        tile_size=None,
+        tile_overlap=64,
+        detection_backend="contours",
+        min_component_area=MIN_COMPONENT_AREA,
+        cache=None,
+    ):
+        """
+        Args:
+            image_path (str): Path of the image to process.
+            figures_path (str): Folder where the figures are saved.
+            info_path (str): Folder of the results of the run.
+            defer_saves (bool): If True, figures are kept in `pending_artifacts`.
+            artifacts (set): Figures to save (see ARTIFACT_KINDS). Overrides the
+                policy when given.
+            artifact_policy (str): "none", "summary" or "debug". Images that are
+                not saved are not drawn either, and with "none" the colour image
+                is released right after the grayscale conversion.
+            registry (ArtifactRegistry): Registry that names the saved figures.
+                Defaults to the shared registry of `figures_path`.
+            tile_size (int): If given, the image is processed in tiles of this
+                size (see TiledImage). Only `.npy` inputs keep peak memory
+                independent of the image size; other formats are decoded once
+                as grayscale before being split. The binarized, contour and centroid
+                figures need the whole image and are not produced.
+            tile_overlap (int): Pixels shared by neighbouring tiles; must be
+                larger than the biggest particle.
+            detection_backend (str): "contours" (cv.findContours and moments
+                per contour, areas and perimeters of the contour polygons) or
+                "components" (cv.connectedComponentsWithStats, areas as pixel
+                counts and no perimeters). Contours are still traced for the
+                contour figure when it is requested.
+            min_component_area (int): "components" backend: components with
+                fewer pixels are discarded as noise. The default drops the
+                same specks as the "contours" backend, whose contours have a
+                zero area.
+            cache (DetectionCache): If given, the particle table and the
+                Delaunay edges are read from it when the image and the
+                processing parameters have not changed. On a hit the image is
+                only decoded for the figures drawn over it (IMAGE_ARTIFACTS),
+                and only binarized again for the binarized and contour
+                figures; the detection itself is never redone.
+        """
+        if detection_backend not in self.DETECTION_BACKENDS:
+            raise ValueError(
+                f"Invalid detection backend: {detection_backend}. "
+                f"Must be one of {', '.join(self.DETECTION_BACKENDS)}."
+            )
+        if artifact_policy not in self.ARTIFACT_POLICIES:
+            raise ValueError(
+                f"Invalid artifact policy: {artifact_policy}. "
+                f"Must be one of {', '.join(self.ARTIFACT_POLICIES)}."
+            )
+        if artifacts is None:
+            artifacts = self.ARTIFACT_POLICIES[artifact_policy]
+
         self.image_path = image_path
         self.figures_path = figures_path
         self.info_path = info_path
-        self.image = Image(self.image_path)
+        self.registry = registry
+        # Las figuras se registran bajo el nombre de la imagen (p. ej. 'sample1')
+        self.artifact_owner = os.path.splitext(os.path.basename(image_path))[0]
+        # Figuras que se guardan
+        self.artifacts = set(artifacts)
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.detection_backend = detection_backend
+        self.min_component_area = min_component_area
+        if tile_size:
+            self.artifacts -= {"binarized", "contours", "centroids"}
+        # La imagen se decodifica la primera vez que se usa (no con la caché)
+        self._image = None
+        self.cache = cache
+        self.cache_key = None
+        self.cache_hit = False
+        self._cached_shape = None
+
+        # Si se difieren, las imágenes se codifican en memoria y las escribe otro proceso
+        self.pending_artifacts = [] if defer_saves else None
 
         self.scale: 1.0  # Escala inicial predeterminada (en um por píxel)
 
         self.particles = ParticleList()
 
-    def save_image(self, image, filename):
+    @property
+    def image(self):
+        """
+        Decoded image (TiledImage in tiled mode), loaded on first access.
+        """
+        if self._image is None:
+            with profiler.stage("decode"):
+                if self.tile_size:
+                    self._image = TiledImage(
+                        self.image_path, self.tile_size, self.tile_overlap
+                    )
+                else:
+                    # La imagen a color solo se usa para las figuras de la referencia
+                    self._image = Image(
+                        self.image_path, keep_original="reference" in self.artifacts
+                    )
+        return self._image
+
+    @property
+    def image_shape(self):
+        """
+        (height, width) of the image in pixels, without decoding it when the
+        particles came from the cache.
+        """
+        if self._image is None and self._cached_shape is not None:
+            return self._cached_shape
+        return self.image.shape
+
+    def save_image(self, image, filename, kind=None):
         """
         Saves an image in the `figures_path` folder with a unique name.
 
-        If the file already exists, an incremental numeric suffix (_1, _2, etc.) is added to it.
+        An incremental numeric suffix (_1, _2, etc.) is added to it; the name is
+        taken from the artifact registry of the folder. When saves are
+        deferred, the encoded image is appended to `pending_artifacts` as
+        (filename, bytes) instead of being written.
 
         Args:
             image (ndarray): The image to be saved.
             filename (str): Base name of the file (includes extension, for example, 'image.png').
+            kind (str): Artifact kind (see ARTIFACT_KINDS). The image is skipped
+                if this kind is not in `self.artifacts`.
         """
+        if kind is not None and kind not in self.artifacts:
+            return
+
         if not self.figures_path:
             raise ValueError("[!] The path of figures is not defined.")
 
-        # Separar el nombre base y la extensión del archivo
-        base_name, ext = os.path.splitext(filename)
-        file_path = os.path.join(self.figures_path, filename)
-        counter = 1
-        file_path = os.path.join(self.figures_path, f"{base_name}_{counter}{ext}")
+        if self.pending_artifacts is not None:
+            _, ext = os.path.splitext(filename)
+            _, encoded = cv.imencode(ext, image)
+            self.pending_artifacts.append((filename, encoded.tobytes()))
+            profiler.count("artifact_bytes", encoded.nbytes)
+            return
 
-        # Buscar un nombre único
-        while os.path.exists(file_path):
-            file_path = os.path.join(self.figures_path, f"{base_name}_{counter}{ext}")
-            counter += 1
+        # Reservar un nombre único en el registro de la carpeta
+        registry = self.registry or ArtifactRegistry.for_directory(self.figures_path)
+        file_path = registry.allocate(filename, owner=self.artifact_owner)
 
         # Guardar la imagen
         cv.imwrite(file_path, image)
+        profiler.count("artifact_bytes", os.path.getsize(file_path))
         print(f"[*] Image saved: {file_path}")
 
     def visualize_step(self, image, title="Step", show_step=True):
@@ -87,12 +467,14 @@ class ImageProcessor:
             # Convert BGR to RGB if the image is in OpenCV format (common for OpenCV images)
             if image.ndim == 3 and image.shape[2] == 3:  # Check if it's a color image
                 image = image[:, :, ::-1]  # Convert BGR to RGB
+            plt = pyplot()
             plt.figure(figsize=(8, 6))
             plt.imshow(image, cmap="gray" if image.ndim == 2 else None)
             plt.title(title)
             plt.axis("off")  # Turn off axis for cleaner visualization
             plt.show()
 
+    @measure_execution_time(stage="calculate_scale")
     def calculate_scale(self, real_length, **kwargs):
         """
         Calculates the image scale based on the reference bar.
@@ -134,31 +516,38 @@ class ImageProcessor:
         }
         options.update(kwargs)  # Sobrescribir valores si se pasan en kwargs
 
+        # Las figuras solo se dibujan si se muestran o se guardan
+        save = "reference" in self.artifacts
+
         # Paso 1: Mostrar imagen original si es necesario
-        self.visualize_step(
-            self.image.original,
-            title="Imagen Original",
-            show_step=options["show_original"],
-        )
-        self.save_image(self.image.original, "original_reference.png")
+        if options["show_original"] or save:
+            self.visualize_step(
+                self.image.original,
+                title="Imagen Original",
+                show_step=options["show_original"],
+            )
+            self.save_image(
+                self.image.original, "original_reference.png", kind="reference"
+            )
 
         # Paso 2: Binarizar la imagen
         _, binary = cv.threshold(self.image.gray, 200, 255, cv.THRESH_BINARY)
         self.visualize_step(
             binary, title="Binarized Image", show_step=options["show_binary"]
         )
-        self.save_image(binary, "binarized_reference.png")
+        self.save_image(binary, "binarized_reference.png", kind="reference")
 
         # Paso 3: Detección de contornos
         contours, _ = cv.findContours(binary, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        contour_img = self.image.original.copy()
-        cv.drawContours(contour_img, contours, -1, (255, 0, 0), 2)
-        self.visualize_step(
-            contour_img,
-            title="Contours Detected",
-            show_step=options["show_contours"],
-        )
-        self.save_image(contour_img, "contours_reference.png")
+        if options["show_contours"] or save:
+            contour_img = self.image.original.copy()
+            cv.drawContours(contour_img, contours, -1, (255, 0, 0), 2)
+            self.visualize_step(
+                contour_img,
+                title="Contours Detected",
+                show_step=options["show_contours"],
+            )
+            self.save_image(contour_img, "contours_reference.png", kind="reference")
 
         # Paso 4: Identificar barra de referencia
         bar_contour = find_reference_bar(contours)
@@ -166,93 +555,344 @@ class ImageProcessor:
             raise ValueError("The reference bar could not be found.")
 
         x, y, w, h = cv.boundingRect(bar_contour)
-        bar_img = self.image.original.copy()
-        cv.rectangle(bar_img, (x, y), (x + w, y + h), (0, 0, 255), 2)
-        self.visualize_step(
-            bar_img,
-            title="Reference Bar Identified",
-            show_step=options["show_bar"],
-        )
-        self.save_image(bar_img, "bar_reference.png")
+        if options["show_bar"] or save:
+            bar_img = self.image.original.copy()
+            cv.rectangle(bar_img, (x, y), (x + w, y + h), (0, 0, 255), 2)
+            self.visualize_step(
+                bar_img,
+                title="Reference Bar Identified",
+                show_step=options["show_bar"],
+            )
+            self.save_image(bar_img, "bar_reference.png", kind="reference")
 
         # Paso 5: Calcular la escala
         self.scale = real_length / max(w, h)
         print(f"[*] Calculated scale: {self.scale:.5f} um per pixel")
 
-    def otsuS_Binarization(self):
-        img = self.image.gray
+    @staticmethod
+    def binarize(img):
+        """
+        Binarizes a grayscale image: CLAHE, Otsu after a Gaussian blur,
+        dilation and a lower manual threshold, combined.
+
+        Args:
+            img (ndarray): Grayscale image (not modified).
+
+        Returns:
+            ndarray: Binarized image.
+        """
 
         # Mejorar contraste con CLAHE
         def enhance_contrast(img):
-            clahe = cv.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+            clahe = cv.createCLAHE(
+                clipLimit=ImageProcessor.CLAHE_CLIP_LIMIT,
+                tileGridSize=ImageProcessor.CLAHE_TILE_GRID,
+            )
             return clahe.apply(img)
 
         img = enhance_contrast(img)
 
-        # Umbralización Otsu con y sin preprocesamiento
-        _, th2 = cv.threshold(img, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
-        blur = cv.GaussianBlur(img, (3, 3), 0)
-        _, th3 = cv.threshold(blur, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+        # Umbralización Otsu tras GaussianBlur (reutilizando el buffer del desenfoque)
+        blur = cv.GaussianBlur(img, ImageProcessor.BLUR_KERNEL, 0)
+        _, th3 = cv.threshold(blur, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU, dst=blur)
 
         # Dilatación para resaltar partículas pequeñas
-        kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE, (3, 3))
+        kernel = cv.getStructuringElement(
+            cv.MORPH_ELLIPSE, ImageProcessor.DILATE_KERNEL
+        )
         th3 = cv.dilate(th3, kernel, iterations=1)
 
-        # Combinar con un umbral manual más bajo
-        _, th_manual = cv.threshold(img, 30, 255, cv.THRESH_BINARY)
-        th_combined = cv.bitwise_or(th3, th_manual)
+        # Combinar con un umbral manual más bajo (en el buffer de CLAHE, ya no se usa)
+        _, th_manual = cv.threshold(
+            img, ImageProcessor.MANUAL_THRESHOLD, 255, cv.THRESH_BINARY, dst=img
+        )
+        return cv.bitwise_or(th3, th_manual, dst=th3)
+
+    @measure_execution_time(stage="binarization")
+    def otsuS_Binarization(self):
+        th_combined = self.binarize(self.image.gray)
 
         self.image.th = th_combined
-        self.save_image(th_combined, "otsu_combined.png")
+        self.save_image(th_combined, "otsu_combined.png", kind="binarized")
 
         return th_combined
 
+    @measure_execution_time(stage="find_contours")
+    def find_contours(self, binary):
+        """
+        Detects the external contours of a binarized image.
+
+        Args:
+            binary (ndarray): Binarized image.
+
+        Returns:
+            list: Detected contours.
+        """
+        contours, _ = cv.findContours(binary, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        self.particles.contours = contours
+        profiler.count("contours", len(contours))
+        return contours
+
+    @measure_execution_time(stage="centroids")
+    def compute_centroids(self, contours):
+        """
+        Calculates the centroid, area and perimeter (in pixels) of every contour
+        with a non-zero area.
+
+        Args:
+            contours (list): Detected contours.
+
+        Returns:
+            list: (cx, cy) centroids in pixels.
+        """
+        _, centroids, areas, perimeters, moments = contour_properties(contours)
+
+        self.particles.moments = moments
+        self.particles.centroids = centroids
+        self.particles.areas = areas
+        self.particles.perimeters = perimeters
+
+        return centroids
+
+    @measure_execution_time(stage="components")
+    def find_components(self, binary):
+        """
+        Detects the particles as the 8-connected components of a binarized
+        image, getting centroids, areas and bounding boxes in one native call.
+
+        Args:
+            binary (ndarray): Binarized image.
+
+        Returns:
+            list: (cx, cy) centroids in pixels.
+        """
+        centroids, areas, boxes, moments = component_properties(
+            binary, self.min_component_area
+        )
+
+        self.particles.moments = moments
+        self.particles.contours = None
+        self.particles.centroids = list(map(tuple, centroids.tolist()))
+        self.particles.areas = areas
+        self.particles.perimeters = None
+        self.particles.boxes = boxes
+
+        return self.particles.centroids
+
+    def detect_blobs(self, binary):
+        """
+        Runs the detection backend on a binarized image.
+
+        Args:
+            binary (ndarray): Binarized image.
+
+        Returns:
+            tuple: (contours, centroids, areas, perimeters, boxes, moments) of
+            the particles with a non-zero area: (K, 2) integer centroids, (K,)
+            areas and perimeters, (K, 4) boxes (x, y, w, h) and (K, 3) central
+            moments in pixels. `contours` and `perimeters` are None with
+            "components".
+        """
+        if self.detection_backend == "components":
+            centroids, areas, boxes, moments = component_properties(
+                binary, self.min_component_area
+            )
+            return None, centroids, areas, None, boxes, moments
+
+        contours, _ = cv.findContours(binary, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        indices, centroids, areas, perimeters, moments = contour_properties(contours)
+        contours = [contours[i] for i in indices]
+        boxes = [cv.boundingRect(contour) for contour in contours]
+        return (
+            contours,
+            np.array(centroids, dtype=np.int64).reshape(-1, 2),
+            np.array(areas, dtype=np.float64),
+            np.array(perimeters, dtype=np.float64),
+            np.array(boxes, dtype=np.int64).reshape(-1, 4),
+            moments,
+        )
+
     def find_contours_and_centroids(self):
-        img = self.image.gray
+        if self.tile_size:
+            return self.find_contours_and_centroids_tiled()
+
         th3 = self.otsuS_Binarization()
+        if self.detection_backend == "components":
+            return None, self.find_components(th3)
+
         # Detección de contornos en la imagen binarizada (con Otsu tras GaussianBlur)
-        contours, _ = cv.findContours(th3, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        contours = self.find_contours(th3)
+
+        # Calcular centroides, áreas y perímetros
+        centroids = self.compute_centroids(contours)
+
+        return contours, centroids
 
-        # Calcular centroides
+    @measure_execution_time(stage="tiles")
+    def find_contours_and_centroids_tiled(self, tolerance=2):
+        """
+        Detects the particles tile by tile and merges them without duplicates.
+
+        Each tile is binarized and searched for particles (with the detection
+        backend) on its padded region. A particle is kept by a tile when it
+        does not touch an inner edge of the padded region (it is complete) and
+        its centroid lies in the core of the tile, widened by `tolerance`
+        pixels because each tile binarizes with its own contrast and
+        threshold. Particles claimed by two tiles near a core edge are merged
+        when their bounding boxes overlap.
+
+        Args:
+            tolerance (int): Pixels the cores are widened by.
+
+        Returns:
+            tuple: (contours, centroids) in image coordinates. `contours` is
+            None with the "components" backend.
+        """
+        height, width = self.image.shape
+        contours = []
         centroids = []
-        for contour in contours:
-            M = cv.moments(contour)
-            if M["m00"] != 0:  # Evitar división por cero
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                centroids.append((cx, cy))
-            else:
-                pass
+        areas = []
+        perimeters = []
+        boxes = []
+        moments = []
+        owners = []
+        truncated = 0
 
-        self.particles.contours = contours
-        self.particles.centroids = centroids
+        for tile_index, (core, padded) in enumerate(self.image.tiles()):
+            y0, y1, x0, x1 = core
+            py0, py1, px0, px1 = padded
+            with profiler.stage("binarization"):
+                binary = self.binarize(self.image.read(py0, py1, px0, px1))
+            with profiler.stage("detection"):
+                (
+                    tile_contours,
+                    tile_centroids,
+                    tile_areas,
+                    tile_perimeters,
+                    tile_boxes,
+                    tile_moments,
+                ) = self.detect_blobs(binary)
+            del binary
+            profiler.count("tiles")
 
-        return contours, centroids
+            # Partículas cortadas por un borde interior de la región leída
+            x, y, w, h = tile_boxes.T
+            cut = (
+                ((x == 0) & (px0 > 0))
+                | ((y == 0) & (py0 > 0))
+                | ((x + w == px1 - px0) & (px1 < width))
+                | ((y + h == py1 - py0) & (py1 < height))
+            )
+            truncated += int(
+                np.count_nonzero(cut & (np.maximum(w, h) > self.image.overlap))
+            )
+
+            cx = tile_centroids[:, 0] + px0
+            cy = tile_centroids[:, 1] + py0
+            inside = (
+                (cx >= x0 - tolerance)
+                & (cx < x1 + tolerance)
+                & (cy >= y0 - tolerance)
+                & (cy < y1 + tolerance)
+            )
+            kept = np.flatnonzero(~cut & inside)
+
+            centroids.append(np.column_stack((cx[kept], cy[kept])))
+            areas.append(tile_areas[kept])
+            boxes.append(tile_boxes[kept] + (px0, py0, 0, 0))
+            moments.append(tile_moments[kept])
+            owners.append(np.full(len(kept), tile_index))
+            if tile_perimeters is not None:
+                perimeters.append(tile_perimeters[kept])
+            if tile_contours is not None:
+                contours.extend(tile_contours[i] + (px0, py0) for i in kept.tolist())
+
+        centroids = np.concatenate(centroids)
+        keep = self._merge_tile_duplicates(
+            centroids, np.concatenate(boxes), np.concatenate(owners), tolerance
+        )
+        if truncated:
+            print(
+                f"[!] {truncated} particles cut by a tile edge are larger than the "
+                f"tile overlap ({self.image.overlap} px) and may be missing; "
+                "increase the overlap."
+            )
+
+        self.particles.centroids = list(map(tuple, centroids[keep].tolist()))
+        self.particles.areas = np.concatenate(areas)[keep]
+        self.particles.boxes = np.concatenate(boxes)[keep]
+        self.particles.moments = np.concatenate(moments)[keep]
+        if self.detection_backend == "components":
+            self.particles.contours = None
+            self.particles.perimeters = None
+        else:
+            self.particles.contours = [contours[i] for i in keep.tolist()]
+            self.particles.perimeters = np.concatenate(perimeters)[keep]
+
+        return self.particles.contours, self.particles.centroids
 
+    def _merge_tile_duplicates(self, centroids, boxes, owners, tolerance):
+        """
+        Returns the indices of the particles to keep, dropping the copies of a
+        particle kept by two tiles (same object: centroids within a few pixels
+        and bounding boxes overlapping by more than half).
+        """
+        if len(centroids) < 2:
+            return np.arange(len(centroids))
+
+        from scipy.spatial import cKDTree
+
+        points = centroids.astype(np.float64)
+        pairs = cKDTree(points).query_pairs(r=2 * tolerance + 1, output_type="ndarray")
+        dropped = set()
+        for i, j in sorted(map(tuple, pairs.tolist())):
+            if owners[i] == owners[j] or i in dropped or j in dropped:
+                continue
+            (ax, ay, aw, ah), (bx, by, bw, bh) = boxes[i].tolist(), boxes[j].tolist()
+            overlap_w = min(ax + aw, bx + bw) - max(ax, bx)
+            overlap_h = min(ay + ah, by + bh) - max(ay, by)
+            if overlap_w > 0 and overlap_h > 0:
+                if overlap_w * overlap_h > 0.5 * min(aw * ah, bw * bh):
+                    # Se conserva la detección de la primera tesela
+                    dropped.add(max(i, j))
+
+        return np.array(
+            [i for i in range(len(centroids)) if i not in dropped], dtype=np.int64
+        )
+
+    @measure_execution_time(stage="visualize")
     def visualize_contours_and_centroids(self, show_plot=False):
         centroids = self.particles.centroids
         contours = self.particles.contours
         img = self.image.gray  # Imagen en escala de grises original
 
-        # Crear imágenes independientes para contornos y centroides
-        contoured_image = cv.cvtColor(img, cv.COLOR_GRAY2BGR)  # Imagen para contornos
-        centroid_image = cv.cvtColor(img, cv.COLOR_GRAY2BGR)  # Imagen para centroides
+        # Solo se dibujan las imágenes que se van a guardar o mostrar
+        draw_contours = show_plot or "contours" in self.artifacts
+        draw_centroids = show_plot or "centroids" in self.artifacts
 
-        # Dibujar contornos
-        for contour in contours:
-            cv.drawContours(contoured_image, [contour], -1, (255, 0, 0), 1)
+        if draw_contours and contours is None:
+            # Sin contornos (backend de componentes o caché): solo para la figura
+            contours, _ = cv.findContours(
+                self.image.th, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE
+            )
 
-        # Dibujar centroides
-        for centroid in centroids:
-            if centroid is not None:
-                cx, cy = centroid
-                cv.circle(centroid_image, (cx, cy), 1, (0, 255, 0), -1)
+        if draw_contours:
+            # Dibujar todos los contornos en una sola llamada
+            contoured_image = cv.cvtColor(img, cv.COLOR_GRAY2BGR)
+            cv.drawContours(contoured_image, contours, -1, (255, 0, 0), 1)
+            self.save_image(contoured_image, "contoured_image.png", kind="contours")
 
-        self.save_image(contoured_image, "contoured_image.png")
-        self.save_image(centroid_image, "centroid_image.png")
+        if draw_centroids:
+            centroid_image = cv.cvtColor(img, cv.COLOR_GRAY2BGR)
+            for centroid in centroids:
+                if centroid is not None:
+                    cx, cy = centroid
+                    cv.circle(centroid_image, (cx, cy), 1, (0, 255, 0), -1)
+            self.save_image(centroid_image, "centroid_image.png", kind="centroids")
 
         if show_plot:
             # Mostrar las imágenes
+            plt = pyplot()
             plt.figure(figsize=(10, 5))
             plt.subplot(1, 2, 1)
             plt.imshow(contoured_image)
@@ -266,9 +906,36 @@ class ImageProcessor:
 
             plt.show()
 
+    @measure_execution_time(stage="descriptors")
+    def compute_descriptors(self):
+        """
+        Computes the size and shape descriptors of all the detected particles
+        in batch from their areas, perimeters and central moments, in um with
+        the scale of the processor (see modules.geometry.shape_descriptors).
+
+        Returns:
+            dict or None: One array per descriptor, or None if the detection
+            did not provide moments.
+        """
+        if self.particles.moments is None:
+            return None
+
+        moments = np.asarray(self.particles.moments, dtype=np.float64).reshape(-1, 3)
+        return shape_descriptors(
+            self.particles.areas,
+            self.particles.perimeters,
+            moments[:, 0],
+            moments[:, 1],
+            moments[:, 2],
+            scale=self.scale,
+        )
+
+    @measure_execution_time(stage="particle_table")
     def convert_centroids_to_particles(self):
         """
-        Converts the centroids into instances of the Particle class and stores them in self.particles.particle_list.
+        Converts the centroids into a ParticleTable (coordinates in um) stored in
+        self.particles.table. Particle instances are available lazily through
+        self.particles.particle_list.
         """
         if not hasattr(self, "particles"):
             raise AttributeError(
@@ -285,18 +952,118 @@ class ImageProcessor:
                 "The object must have a 'scale' attribute indicating the scale in um/pixel."
             )
 
-        self.particles.particle_list = []  # Inicializar lista para las partículas
-        for idx, (cx, cy) in enumerate(self.particles.centroids):
-            # Convertir coordenadas a micrómetros
-            x_um = cx * self.scale
-            y_um = cy * self.scale
+        # Convertir coordenadas, áreas y perímetros a micrómetros en bloque
+        self.particles.table = ParticleTable.from_centroids(
+            self.particles.centroids,
+            self.scale,
+            areas=self.particles.areas,
+            perimeters=self.particles.perimeters,
+            descriptors=self.compute_descriptors(),
+        )
+        profiler.count("particles", len(self.particles.table))
 
-            # Crear instancia de Particle
-            particle = Particle(id=idx, x=x_um, y=y_um)
+    def processing_parameters(self):
+        """
+        Parameters that determine the detected particles, used with the image
+        content as the key of the detection cache.
 
-            # Agregar la partícula a la lista
-            self.particles.particle_list.append(particle)
+        Returns:
+            dict: JSON-serializable parameters.
+        """
+        return {
+            "clahe_clip_limit": self.CLAHE_CLIP_LIMIT,
+            "clahe_tile_grid": list(self.CLAHE_TILE_GRID),
+            "blur_kernel": list(self.BLUR_KERNEL),
+            "dilate_kernel": list(self.DILATE_KERNEL),
+            "manual_threshold": self.MANUAL_THRESHOLD,
+            "detection_backend": self.detection_backend,
+            "min_component_area": (
+                self.min_component_area
+                if self.detection_backend == "components"
+                else None
+            ),
+            "tile_size": self.tile_size,
+            "tile_overlap": self.tile_overlap if self.tile_size else None,
+            "scale": float(self.scale),
+        }
+
+    @measure_execution_time(stage="cache_lookup")
+    def load_cached_particles(self):
+        """
+        Fills `self.particles` from the detection cache.
+
+        Returns:
+            bool: True on a cache hit.
+        """
+        self.cache_key = self.cache.key(self.image_path, self.processing_parameters())
+        entry = self.cache.load(self.cache_key)
+        if entry is None:
+            profiler.count("cache_misses")
+            return False
+
+        table = ParticleTable(
+            **{name: entry[name] for name in ParticleTable.COLUMNS if name in entry}
+        )
+        self.particles.table = table
+        self.particles.centroids = list(
+            zip(
+                table.x_px.astype(np.int64).tolist(),
+                table.y_px.astype(np.int64).tolist(),
+            )
+        )
+        self.particles.edges = entry["edges"] if "edges" in entry else None
+        self._cached_shape = tuple(int(size) for size in entry["shape"])
+        self.cache_hit = True
+        profiler.count("cache_hits")
+        return True
+
+    @measure_execution_time(stage="cache_store")
+    def store_cached_particles(self, edges=None):
+        """
+        Stores the particle table of the image, and the Delaunay edges computed
+        from it, in the detection cache. Does nothing without a cache or when
+        the particles were read from it.
+
+        Args:
+            edges (ndarray): Optional (E, 2) edges of the triangulation.
+        """
+        if self.cache is None or self.cache_hit or self.particles.table is None:
+            return
+
+        table = self.particles.table
+        arrays = {name: getattr(table, name) for name in ParticleTable.COLUMNS}
+        arrays["shape"] = np.array(self.image_shape, dtype=np.int64)
+        if edges is not None:
+            arrays["edges"] = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        if self.cache_key is None:
+            self.cache_key = self.cache.key(
+                self.image_path, self.processing_parameters()
+            )
+        self.cache.store(self.cache_key, arrays)
+
+    def prepare(self):
+        """
+        Does the I/O of the processing ahead of the computation: looks the
+        particles up in the detection cache and, on a miss or when a figure is
+        drawn over the image, decodes the image. Lets a pipeline prefetch the
+        next images while others are processed.
+        """
+        if self.cache is not None and self.cache_key is None:
+            if self.load_cached_particles() and not (
+                self.artifacts & set(self.IMAGE_ARTIFACTS)
+            ):
+                return
+        self.image
 
+    @measure_execution_time(stage="obtain_particles")
     def obtain_particles(self):
+        # La caché solo se consulta una vez (quizá ya lo hizo prepare)
+        if self.cache is not None and self.cache_key is None:
+            self.load_cached_particles()
+        if self.cache_hit:
+            # Las partículas vienen de la caché: solo se binariza para las figuras
+            if self.artifacts & {"binarized", "contours"}:
+                self.otsuS_Binarization()
+            return
         self.find_contours_and_centroids()
         self.convert_centroids_to_particles()
@@ -1,7 +1,7 @@
 import os
-import json
 from datetime import datetime
 import subprocess
+from modules.classes.ResultsStore import ResultsStore
 
 
 class LatexManager:
@@ -18,7 +18,7 @@ class LatexManager:
 
     def create_directory_structure(self):
         """
-        Crea la estructura de directorios para guardar figuras y datos JSON.
+        Crea la estructura de directorios para guardar figuras y resultados.
 
         Returns:
             tuple: Path de las carpetas figures e info creadas.
@@ -42,30 +42,50 @@ class LatexManager:
         os.makedirs(figures_path, exist_ok=True)
         os.makedirs(info_path, exist_ok=True)
 
-        # Crear archivo JSON inicial en info
-        self._create_initial_json(info_path)
+        # Crear el almacén de resultados inicial en info
+        self._create_results_store(info_path)
 
         return figures_path, info_path, base_path
 
-    def _create_initial_json(self, info_path):
+    def open_directory_structure(self, run_path):
         """
-        Crea un archivo JSON inicial para almacenar datos.
+        Reuses the directory structure of an existing run, so that it can be
+        updated in place.
+
+        Args:
+            run_path (str): Folder of the run (e.g. output/010125_1).
+
+        Returns:
+            tuple: Paths of the figures and info folders and of the run.
+
+        Raises:
+            FileNotFoundError: If the folder does not contain a run.
+        """
+        figures_path = os.path.join(run_path, "figures")
+        info_path = os.path.join(run_path, "info")
+        if not os.path.isfile(ResultsStore(info_path).path):
+            raise FileNotFoundError(
+                f"[!] '{run_path}' is not a run directory (no {ResultsStore.FILENAME})."
+            )
+        os.makedirs(figures_path, exist_ok=True)
+
+        self.current_dir = run_path
+        self.figures_dir = figures_path
+        return figures_path, info_path, run_path
+
+    def _create_results_store(self, info_path):
+        """
+        Crea el almacén de resultados (results.jsonl) con los metadatos iniciales.
 
         Args:
             info_path (str): Path de la carpeta info.
         """
-        initial_data = {
-            "reference": {},
-            "samples": {},
-            "metadata": {
+        ResultsStore(info_path).create(
+            {
                 "created_at": datetime.now().isoformat(),
                 "description": "Particulate analysis results",
-            },
-        }
-        json_path = os.path.join(info_path, "results.json")
-        with open(json_path, "w") as json_file:
-            json.dump(initial_data, json_file, indent=4)
-        print(f"[*] Initial JSON file created: {json_path}")
+            }
+        )
 
     def generate_pdf(self, content):
         """
@@ -3,6 +3,8 @@ class Particle:
     Representa una partícula detectada en una imagen.
     """
 
+    __slots__ = ("id", "x", "y")
+
     def __init__(self, id, x, y):
         self.id = id
         self.x = x
@@ -1,8 +1,21 @@
-import matplotlib.pyplot as plt
+import cv2 as cv
+import io
 import math
 import os
+import numpy as np
 from itertools import combinations
-from scipy.spatial import Delaunay
+from modules.geometry import (
+    closest_pair_delaunay,
+    closest_pair_grid,
+    delaunay_mesh,
+    edge_lengths,
+    nearest_neighbor_stats,
+)
+from modules.classes.ParticleTable import ParticleTable
+from modules.classes.EdgeStore import EdgeStore
+from modules.classes.ArtifactRegistry import ArtifactRegistry
+from modules.decorators import measure_execution_time, profiler
+from modules.plotting import pyplot
 
 
 class ParticleCalculator:
@@ -10,12 +23,25 @@ class ParticleCalculator:
     Class to perform calculations and analysis on particles.
     """
 
-    def __init__(self, particles, figures_path, info_path):
+    def __init__(
+        self,
+        particles,
+        figures_path,
+        info_path,
+        defer_saves=False,
+        registry=None,
+        artifact_owner=None,
+    ):
         """
         Initializes the class with the particles to be analyzed.
 
         Args:
             particles: object containing the list of particles and their associated attributes.
+            defer_saves (bool): If True, plots are kept in `pending_artifacts` as
+                (filename, bytes) instead of being written to `figures_path`.
+            registry (ArtifactRegistry): Registry that names the saved plots.
+                Defaults to the shared registry of the figures folder.
+            artifact_owner (str): Name (e.g. sample) the saved plots are recorded under.
         """
         if not hasattr(particles, "particle_list"):
             raise AttributeError(
@@ -28,84 +54,159 @@ class ParticleCalculator:
         self.figures_path = figures_path
         self.info_path = info_path
         self.distances = []
+        self.edges = None  # Bordes (E, 2) de la última triangulación
+        self.edge_lengths = None  # Longitudes (E,) de esos bordes
         self.combinations = 0
+        self.nn_distances = None  # Distancia al vecino más cercano (N,)
+        self.knn_distances = None  # Distancias a los k vecinos (N, k)
+        self.knn_indices = None  # Índices de los k vecinos (N, k)
+        self.nn_stats = {}
+        self.pending_artifacts = [] if defer_saves else None
+        self.registry = registry
+        self.artifact_owner = artifact_owner
 
     def __repr__(self):
         """
         Chain representation of the ParticleCalculator class.
         """
-        return f"ParticleCalculator with {len(self.particles.particle_list)} particles."
+        return f"ParticleCalculator with {len(self.table)} particles."
 
-    def save_plot(self, figures_path, filename):
+    @property
+    def table(self):
+        """
+        ParticleTable of the analysed particles. Containers that only provide a
+        `particle_list` are converted on the fly.
+        """
+        table = getattr(self.particles, "table", None)
+        if table is None:
+            table = ParticleTable.from_particles(self.particles.particle_list)
+        return table
+
+    def save_plot(self, figures_path, filename, dpi=300, tight=True):
         """
         Saves the current matplotlib figure as an image in a specific folder.
 
-        Always append a numeric suffix (_1, _2, etc.) to the file name.
+        Always append a numeric suffix (_1, _2, etc.) to the file name, taken
+        from the artifact registry of the folder.
 
         Args:
             figures_path (str): Directory where the image will be saved.
             filename (str): Base name of the file (includes extension, e.g. 'plot.png').
+            dpi (int): Resolution of the saved image.
+            tight (bool): If True, crops the figure with bbox_inches="tight".
         """
         if not figures_path:
             raise ValueError("[!] The path of figures is not defined.")
 
-        # Separar el nombre base y la extensión del archivo
-        base_name, ext = os.path.splitext(filename)
-        counter = 1
-        file_path = os.path.join(figures_path, f"{base_name}_{counter}{ext}")
+        options = {"dpi": dpi, "bbox_inches": "tight" if tight else None}
+        plt = pyplot()
+
+        if self.pending_artifacts is not None:
+            buffer = io.BytesIO()
+            plt.savefig(
+                buffer, format=os.path.splitext(filename)[1].lstrip("."), **options
+            )
+            self.pending_artifacts.append((filename, buffer.getvalue()))
+            profiler.count("artifact_bytes", buffer.tell())
+            return
 
-        # Buscar un nombre único
-        while os.path.exists(file_path):
-            counter += 1
-            file_path = os.path.join(figures_path, f"{base_name}_{counter}{ext}")
+        # Reservar un nombre único en el registro de la carpeta
+        registry = self.registry or ArtifactRegistry.for_directory(figures_path)
+        file_path = registry.allocate(filename, owner=self.artifact_owner)
 
         # Guardar la figura actual
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        plt.savefig(file_path, **options)
+        profiler.count("artifact_bytes", os.path.getsize(file_path))
+        print(f"[*] Graph saved: {file_path}")
+
+    def save_canvas(self, figures_path, image, filename):
+        """
+        Saves an image rendered with OpenCV, with the same naming as save_plot.
+
+        Args:
+            figures_path (str): Directory where the image will be saved.
+            image (ndarray): BGR image.
+            filename (str): Base name of the file (includes extension, e.g. 'plot.png').
+        """
+        if not figures_path:
+            raise ValueError("[!] The path of figures is not defined.")
+
+        if self.pending_artifacts is not None:
+            _, encoded = cv.imencode(os.path.splitext(filename)[1], image)
+            self.pending_artifacts.append((filename, encoded.tobytes()))
+            profiler.count("artifact_bytes", encoded.nbytes)
+            return
+
+        registry = self.registry or ArtifactRegistry.for_directory(figures_path)
+        file_path = registry.allocate(filename, owner=self.artifact_owner)
+        cv.imwrite(file_path, image)
+        profiler.count("artifact_bytes", os.path.getsize(file_path))
         print(f"[*] Graph saved: {file_path}")
 
-    def plot_particles(self, show_plot=True, show_closest=False, show_mesh=False):
+    def mesh_edges(self):
+        """
+        Returns the unique edges of the Delaunay mesh of the particles, reusing
+        the ones computed by find_closest_pair_Delaunay when available.
+
+        Returns:
+            ndarray: (E, 2) array of particle indices.
+        """
+        if self.edges is not None:
+            return self.edges
+        edges, _ = delaunay_mesh(self.table.coordinates)
+        return edges
+
+    @measure_execution_time(stage="plot")
+    def plot_particles(
+        self,
+        show_plot=True,
+        show_closest=False,
+        show_mesh=False,
+        renderer="matplotlib",
+        dpi=300,
+        tight=True,
+    ):
         """
         Plots the particles and optionally highlights the closest pair and displays a triangular mesh connecting the particles.
         and displays a triangular mesh connecting the particles.
 
+        The mesh is drawn as a single LineCollection built from the unique edges,
+        so its cost does not depend on the number of matplotlib artists.
+
         Args:
             show_closest (bool): if True, shows the closest pair and the line between them.
             show_mesh (bool): If True, displays a triangle mesh between all particles.
-            save_filename (str): If provided, saves the plot as an image with this filename.
+            renderer (str): "matplotlib" for the annotated figure, or "opencv" to
+                draw straight into an image array (much faster for huge point sets).
+            dpi (int): Resolution of the saved matplotlib figure.
+            tight (bool): If True, crops the saved figure with bbox_inches="tight".
         """
-        x_coords = [p.x for p in self.particles.particle_list]
-        y_coords = [p.y for p in self.particles.particle_list]
+        if renderer == "opencv":
+            self.render_particles_canvas(show_closest=show_closest, show_mesh=show_mesh)
+            return
+        if renderer != "matplotlib":
+            raise ValueError(
+                f"Invalid renderer: {renderer}. Must be 'matplotlib' or 'opencv'."
+            )
+
+        from matplotlib.collections import LineCollection
+
+        plt = pyplot()
+        points = self.table.coordinates
+        x_coords = points[:, 0]
+        y_coords = points[:, 1]
 
         plt.figure(figsize=(10, 8))
 
         # Graficar todas las partículas
         plt.scatter(x_coords, y_coords, c="blue", s=10, label="Particles")
 
-        # Generar malla triangular si se solicita
-        if show_mesh:
-            points = list(zip(x_coords, y_coords))
-            triangulation = Delaunay(points)
-
-            # Dibujar los triángulos
-            for simplex in triangulation.simplices:
-                plt.plot(
-                    [points[simplex[0]][0], points[simplex[1]][0]],
-                    [points[simplex[0]][1], points[simplex[1]][1]],
-                    c="green",
-                    linewidth=0.2,
-                )
-                plt.plot(
-                    [points[simplex[1]][0], points[simplex[2]][0]],
-                    [points[simplex[1]][1], points[simplex[2]][1]],
-                    c="green",
-                    linewidth=0.2,
-                )
-                plt.plot(
-                    [points[simplex[2]][0], points[simplex[0]][0]],
-                    [points[simplex[2]][1], points[simplex[0]][1]],
-                    c="green",
-                    linewidth=0.2,
-                )
+        # Generar malla triangular si se solicita, como una sola colección de segmentos
+        if show_mesh and len(points) >= 3:
+            segments = points[self.mesh_edges()]
+            plt.gca().add_collection(
+                LineCollection(segments, colors="green", linewidths=0.2)
+            )
 
         # Si se debe mostrar el par más cercano y existe uno
         if show_closest and self.closest_pair:
@@ -129,7 +230,7 @@ class ParticleCalculator:
         plt.axis("equal")
 
         # Guardar el gráfico
-        self.save_plot(self.figures_path, "particles_plot.png")
+        self.save_plot(self.figures_path, "particles_plot.png", dpi=dpi, tight=tight)
 
         # Mostrar el gráfico si show_plot es True
         if show_plot:
@@ -137,6 +238,51 @@ class ParticleCalculator:
 
         plt.close()
 
+    def render_particles_canvas(
+        self, show_closest=False, show_mesh=False, size=2048, margin=20
+    ):
+        """
+        Renders the particles (and optionally the mesh and the closest pair)
+        directly into a NumPy image with OpenCV and saves it as particles_plot.png.
+
+        Args:
+            show_closest (bool): If True, draws the closest pair in red.
+            show_mesh (bool): If True, draws the Delaunay mesh.
+            size (int): Size in pixels of the longest side of the canvas.
+            margin (int): Empty border in pixels.
+
+        Returns:
+            ndarray: The rendered BGR image.
+        """
+        points = self.table.coordinates
+        origin = points.min(axis=0) if len(points) else np.zeros(2)
+        extent = np.ptp(points, axis=0).max() if len(points) else 0.0
+        factor = (size - 2 * margin) / extent if extent > 0 else 1.0
+
+        # Coordenadas en píxeles del lienzo (el eje Y ya crece hacia abajo)
+        pixels = np.rint((points - origin) * factor + margin).astype(np.int32)
+        width, height = pixels.max(axis=0) + margin + 1 if len(points) else (size, size)
+        canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+
+        if show_mesh and len(points) >= 3:
+            segments = pixels[self.mesh_edges()]
+            cv.polylines(canvas, segments, False, (0, 128, 0), 1, cv.LINE_AA)
+
+        for x, y in pixels.tolist():
+            cv.circle(canvas, (x, y), 2, (255, 0, 0), -1)
+
+        if show_closest and self.closest_pair:
+            p1, p2 = self.closest_pair
+            pair = np.rint(
+                (np.array([[p1.x, p1.y], [p2.x, p2.y]]) - origin) * factor + margin
+            ).astype(np.int32)
+            cv.line(canvas, tuple(pair[0]), tuple(pair[1]), (0, 0, 255), 2)
+            for x, y in pair.tolist():
+                cv.circle(canvas, (x, y), 4, (0, 0, 255), -1)
+
+        self.save_canvas(self.figures_path, canvas, "particles_plot.png")
+        return canvas
+
     def find_closest_pair(self):
         """
         Finds the pair of particles that are at the smallest distance from each other
@@ -176,67 +322,113 @@ class ParticleCalculator:
         self.closest_pair = closest_pair
         self.min_distance = min_distance
 
+    @measure_execution_time(stage="closest_pair")
     def find_closest_pair_Delaunay(self):
         """
         Finds the pair of particles that are at the smallest distance from each other
         and stores it in self.closest_pair. Calculates distances only between particles
         that are connected in a Delaunay triangulation, ensuring no duplicate distances.
+
+        The unique edges and their lengths are computed with NumPy over the whole
+        triangulation and kept in self.edges and self.edge_lengths;
+        self.distances is an EdgeStore over the same arrays that yields the
+        legacy per-edge dicts on demand. When the particles carry the edges of
+        a previous triangulation (e.g. from the detection cache), only the
+        lengths are recomputed. Duplicated or collinear centroids, which Qhull
+        cannot triangulate, fall back to the exact grid search (see
+        modules.geometry.delaunay_mesh).
         """
 
-        if len(self.particles.particle_list) < 2:
+        table = self.table
+        if len(table) < 2:
             print("At least two particles are needed to calculate the distance.")
             self.closest_pair = []  # Resetear por si no hay suficientes partículas
             return None
 
-        # Reiniciar lista de distancias
-        self.distances = []
-        self.combinations = 0
-        min_distance = float("inf")
-        closest_pair = None
-
-        # Extraer las coordenadas de las partículas
-        points = [(p.x, p.y) for p in self.particles.particle_list]
+        # Coordenadas de las partículas como arreglo (N, 2)
+        points = table.coordinates
+
+        # Bordes únicos de la triangulación y sus longitudes en un solo paso
+        edges = getattr(self.particles, "edges", None)
+        if edges is not None and len(edges):
+            edges = np.asarray(edges, dtype=np.int64)
+            lengths = edge_lengths(points, edges)
+            best = int(np.argmin(lengths))
+        else:
+            edges, lengths, best = closest_pair_delaunay(points)
+
+        # Bordes compactos; los diccionarios por borde solo se crean al pedirlos
+        self.distances = EdgeStore.from_table(edges, lengths, table)
+        self.edges = self.distances.edges
+        self.edge_lengths = self.distances.lengths
+        self.combinations = len(edges)
+        profiler.count("particles", len(table))
+        profiler.count("edges", len(edges))
 
-        # Generar la triangulación de Delaunay
-        delaunay = Delaunay(points)
+        # Actualizar la pareja más cercana
+        i, j = edges[best]
+        self.closest_pair = (table[i], table[j])
+        self.min_distance = float(lengths[best])
 
-        # Conjunto para almacenar bordes ya procesados
-        processed_edges = set()
+    @measure_execution_time(stage="closest_pair")
+    def find_closest_pair_grid(self):
+        """
+        Finds the pair of particles that are at the smallest distance from each other
+        and stores it in self.closest_pair, with an exact grid search in O(n log n)
+        that accepts any input, including duplicated or collinear centroids.
 
-        # Iterar sobre los bordes de los triángulos de la malla de Delaunay
-        for simplex in delaunay.simplices:
-            for i, j in [(0, 1), (1, 2), (2, 0)]:  # Los 3 bordes de cada triángulo
-                p1, p2 = (
-                    self.particles.particle_list[simplex[i]],
-                    self.particles.particle_list[simplex[j]],
-                )
+        No mesh is built: self.distances only holds the closest pair, and
+        self.combinations the number of pairs kept (1).
+        """
+        table = self.table
+        if len(table) < 2:
+            print("At least two particles are needed to calculate the distance.")
+            self.closest_pair = []  # Resetear por si no hay suficientes partículas
+            return None
 
-                # Crear una representación única del borde (ordenado para evitar duplicados)
-                edge = tuple(sorted([p1.id, p2.id]))
+        i, j, distance = closest_pair_grid(table.coordinates)
+        self.distances = EdgeStore.from_table([[i, j]], [distance], table)
+        # Sin malla: mesh_edges la calculará si se dibuja
+        self.edges = None
+        self.edge_lengths = None
+        self.combinations = len(self.distances)
+        profiler.count("particles", len(table))
 
-                # Si el borde ya ha sido procesado, lo ignoramos
-                if edge in processed_edges:
-                    continue
+        self.closest_pair = (table[i], table[j])
+        self.min_distance = distance
 
-                # Marcar el borde como procesado
-                processed_edges.add(edge)
+    @measure_execution_time(stage="nearest_neighbors")
+    def find_nearest_neighbors(self, k=1, radius=None, area=None, bins=20):
+        """
+        Computes per-particle nearest-neighbour distances with a KD-tree in
+        O(n log n) and stores them in self.nn_distances, self.knn_distances,
+        self.knn_indices and a summary in self.nn_stats. The distance to the
+        nearest neighbour is also stored in the `nn_distance` column of the
+        particle table, so it is exported with the particles.
 
-                distance = math.sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
-                self.combinations += 1  # Contar combinaciones de bordes
+        Args:
+            k (int): Number of nearest neighbours to query per particle.
+            radius (float): If given, counts the pairs within this distance (um).
+            area (float): Area of the analysed region in um^2, used for the
+                Clark–Evans ratio. Defaults to the bounding box of the particles.
+            bins (int): Number of bins of the NN-distance histogram.
 
-                # Guardar la distancia en la lista
-                self.distances.append(
-                    {
-                        "pair": {p1.id: (p1.x, p1.y), p2.id: (p2.x, p2.y)},
-                        "distance": distance,
-                    }
-                )
+        Returns:
+            dict: The summary statistics (mean, median, histogram, Clark–Evans, ...).
+        """
+        table = self.table
+        if len(table) < 2:
+            print("At least two particles are needed to calculate the distance.")
+            self.nn_stats = {}
+            return None
 
-                # Verificar si esta es la distancia mínima
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_pair = (p1, p2)
+        points = table.coordinates
+        (
+            self.nn_distances,
+            self.knn_distances,
+            self.knn_indices,
+            self.nn_stats,
+        ) = nearest_neighbor_stats(points, k=k, radius=radius, area=area, bins=bins)
+        table.nn_distance = np.ascontiguousarray(self.nn_distances, dtype=np.float64)
 
-        # Actualizar la pareja más cercana
-        self.closest_pair = closest_pair
-        self.min_distance = min_distance
+        return self.nn_stats
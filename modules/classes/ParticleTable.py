@@ -0,0 +1,167 @@
+import numpy as np
+from modules.classes.Particle import Particle
+
+
+class ParticleTable:
+    """
+    Columnar container of the particles detected in an image.
+
+    Every attribute is stored as a contiguous NumPy array with one entry per
+    particle, so the pipeline can pass coordinates around without building
+    Python objects. `Particle` instances are only created on demand.
+    """
+
+    COLUMNS = (
+        "id",
+        "x_px",
+        "y_px",
+        "x_um",
+        "y_um",
+        "area",
+        "perimeter",
+        "equivalent_diameter",
+        "circularity",
+        "aspect_ratio",
+        "orientation",
+        "nn_distance",
+    )
+
+    # Columnas que se exportan por partícula en los resultados
+    EXPORT_COLUMNS = ("id", "x_um", "y_um") + COLUMNS[5:]
+
+    # CONSTRUCTOR
+    def __init__(self, **columns):
+        """
+        Initializes the table from its columns.
+
+        Args:
+            columns: One array per name in COLUMNS, all with the same length.
+                Missing columns are filled with NaN (`id` defaults to 0..N-1).
+        """
+        size = len(next(iter(columns.values()))) if columns else 0
+
+        self.id = np.ascontiguousarray(
+            columns.get("id", np.arange(size)), dtype=np.int64
+        )
+        for name in self.COLUMNS[1:]:
+            values = columns.get(name)
+            if values is None:
+                values = np.full(size, np.nan)
+            setattr(self, name, np.ascontiguousarray(values, dtype=np.float64))
+
+        for name in self.COLUMNS:
+            if len(getattr(self, name)) != size:
+                raise ValueError(
+                    f"[!] Column '{name}' must have {size} entries, "
+                    f"got {len(getattr(self, name))}."
+                )
+
+        self._coordinates = None
+
+    @classmethod
+    def from_centroids(
+        cls, centroids, scale, areas=None, perimeters=None, descriptors=None
+    ):
+        """
+        Builds the table from pixel centroids and converts them to micrometres.
+
+        Args:
+            centroids (array-like): (N, 2) centroids in pixels.
+            scale (float): Scale in um per pixel.
+            areas (array-like): Areas in pixels^2, optional.
+            perimeters (array-like): Perimeters in pixels, optional.
+            descriptors (dict): Columns already in um (see
+                modules.geometry.shape_descriptors), optional. They take
+                precedence over `areas` and `perimeters`.
+
+        Returns:
+            ParticleTable: The new table.
+        """
+        centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 2)
+        columns = {
+            "id": np.arange(len(centroids)),
+            "x_px": centroids[:, 0],
+            "y_px": centroids[:, 1],
+            "x_um": centroids[:, 0] * scale,
+            "y_um": centroids[:, 1] * scale,
+        }
+        if areas is not None:
+            columns["area"] = np.asarray(areas, dtype=np.float64) * scale**2
+        if perimeters is not None:
+            columns["perimeter"] = np.asarray(perimeters, dtype=np.float64) * scale
+        if descriptors is not None:
+            columns.update(descriptors)
+        return cls(**columns)
+
+    @classmethod
+    def from_particles(cls, particle_list):
+        """
+        Builds the table from a list of Particle objects (coordinates in um).
+
+        Args:
+            particle_list (list): List of Particle instances.
+
+        Returns:
+            ParticleTable: The new table.
+        """
+        return cls(
+            id=[p.id for p in particle_list],
+            x_um=[p.x for p in particle_list],
+            y_um=[p.y for p in particle_list],
+        )
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, index):
+        """
+        Returns a Particle view of the row `index`.
+        """
+        return Particle(
+            id=int(self.id[index]),
+            x=float(self.x_um[index]),
+            y=float(self.y_um[index]),
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return f"ParticleTable({len(self)} particles)"
+
+    @property
+    def coordinates(self):
+        """
+        (N, 2) float64 array with the coordinates in um, built once and cached.
+        """
+        if self._coordinates is None:
+            self._coordinates = np.column_stack((self.x_um, self.y_um))
+        return self._coordinates
+
+    def to_records(self, columns=None):
+        """
+        Returns one dictionary per particle with the given columns, as native
+        Python values for JSON (NaN becomes None).
+
+        Args:
+            columns (tuple): Names of the columns. Defaults to EXPORT_COLUMNS.
+
+        Returns:
+            list: [{column: value, ...}, ...] in row order.
+        """
+        columns = columns or self.EXPORT_COLUMNS
+        values = [
+            [None if v != v else v for v in getattr(self, name).tolist()]
+            for name in columns
+        ]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def to_particle_list(self):
+        """
+        Materializes the table as a list of Particle objects.
+        """
+        return [
+            Particle(id=i, x=x, y=y)
+            for i, x, y in zip(self.id.tolist(), self.x_um.tolist(), self.y_um.tolist())
+        ]
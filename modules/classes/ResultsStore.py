@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import threading
+import numpy as np
+from modules.decorators import profiler
+
+
+def _json_default(value):
+    """
+    Converts NumPy values to native Python types for json.dumps.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, "to_records"):
+        # Contenedores columnares (EdgeStore, ParticleTable) en su formato de registros
+        return value.to_records()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ResultsStore:
+    """
+    Append-only store of the results of a run, kept as JSON Lines.
+
+    Every call to `write` appends a single record `{"section", "key", "value"}`
+    to `results.jsonl`, so each sample is serialized exactly once. When the same
+    key is written again, the last record wins, and a key is removed by appending
+    a tombstone record. `finalize` can rebuild the legacy `results.json` layout
+    from the records.
+
+    Reads go through an in-memory index of the byte offset of the last record
+    of every key. It is updated by the appends of this object, and only the
+    bytes appended by other writers since the last read are scanned.
+    """
+
+    FILENAME = "results.jsonl"
+    LEGACY_FILENAME = "results.json"
+    SECTIONS = ("reference", "samples", "metadata")
+
+    # Cabecera de cada registro, escrita siempre en el mismo orden
+    _HEADER = re.compile(r'^\{"section": "(\w+)", "key": ("(?:[^"\\]|\\.)*")')
+    # Bytes del principio de cada línea en los que se busca la cabecera
+    _HEADER_BYTES = 1024
+
+    # CONSTRUCTOR
+    def __init__(self, info_path):
+        """
+        Initializes the store of a run.
+
+        Args:
+            info_path (str): Path of the info folder of the run.
+        """
+        self.info_path = info_path
+        self.path = os.path.join(info_path, self.FILENAME)
+        self.legacy_path = os.path.join(info_path, self.LEGACY_FILENAME)
+        self._lock = threading.Lock()
+        self._offsets = {}  # (section, key) -> offset de su último registro
+        self._indexed_bytes = 0  # Bytes del archivo ya indexados
+
+    def exists(self):
+        """
+        Returns True if the store or a legacy results.json exists.
+        """
+        return os.path.isfile(self.path) or os.path.isfile(self.legacy_path)
+
+    def create(self, metadata):
+        """
+        Creates an empty store containing only the metadata of the run.
+
+        Args:
+            metadata (dict): Metadata of the run (creation date, description...).
+        """
+        with open(self.path, "w", encoding="utf-8") as store_file:
+            for key, value in metadata.items():
+                store_file.write(self._encode("metadata", key, value))
+        with self._lock:
+            self._offsets = {}
+            self._indexed_bytes = 0
+        print(f"[*] Results store created: {self.path}")
+
+    def write(self, section, key, value):
+        """
+        Appends a record to the store.
+
+        Args:
+            section (str): Section of the record ("reference", "samples" or "metadata").
+            key (str): Key that identifies the data within the section.
+            value (any): JSON-serializable value.
+
+        Raises:
+            ValueError: If the section is not valid.
+        """
+        if section not in self.SECTIONS:
+            raise ValueError(
+                f"Invalid section: {section}. Must be one of {', '.join(self.SECTIONS)}."
+            )
+
+        record = self._encode(section, key, value)
+        self._append(section, key, record)
+        profiler.count("results_bytes", len(record))
+        print(f"[*] Updated: section '{section}', key '{key}'.")
+
+    def remove(self, section, key):
+        """
+        Removes a key by appending a tombstone record; it is skipped when the
+        store is read unless the key is written again.
+
+        Args:
+            section (str): Section of the record.
+            key (str): Key to remove.
+        """
+        record = json.dumps(
+            {"section": section, "key": key, "value": None, "deleted": True}
+        )
+        self._append(section, key, record + "\n")
+        print(f"[*] Removed: section '{section}', key '{key}'.")
+
+    def write_sample(self, sample_name, sample_data):
+        self.write("samples", sample_name, sample_data)
+
+    def write_reference(self, key, value):
+        self.write("reference", key, value)
+
+    def _encode(self, section, key, value):
+        record = {"section": section, "key": key, "value": value}
+        return json.dumps(record, default=_json_default) + "\n"
+
+    def _append(self, section, key, record):
+        data = record.encode("utf-8")
+        with self._lock, open(self.path, "ab") as store_file:
+            offset = store_file.tell()
+            store_file.write(data)
+            # El índice solo se actualiza si ya cubría todo lo anterior
+            if offset == self._indexed_bytes:
+                self._offsets[(section, key)] = offset
+                self._indexed_bytes = offset + len(data)
+
+    def _index(self):
+        """
+        Returns, for every (section, key), the byte offset of its last record.
+        Only the records appended since the previous call by other writers are
+        read, and only their headers are decoded.
+        """
+        with self._lock:
+            size = os.path.getsize(self.path)
+            if size < self._indexed_bytes:
+                # El archivo se ha vuelto a crear: se indexa de nuevo
+                self._offsets = {}
+                self._indexed_bytes = 0
+            if size > self._indexed_bytes:
+                with open(self.path, "rb") as store_file:
+                    store_file.seek(self._indexed_bytes)
+                    offset = self._indexed_bytes
+                    for line in store_file:
+                        if not line.endswith(b"\n"):
+                            break  # Registro que otro proceso aún está escribiendo
+                        header = line[: self._HEADER_BYTES].decode("utf-8", "ignore")
+                        match = self._HEADER.match(header)
+                        if match:
+                            key = (match.group(1), json.loads(match.group(2)))
+                            self._offsets[key] = offset
+                        offset += len(line)
+                    self._indexed_bytes = offset
+            return dict(self._offsets)
+
+    def iter_section(self, section, keys=None):
+        """
+        Yields the (key, value) pairs of a section one at a time, in the order
+        in which the keys were first written.
+
+        Args:
+            section (str): Section to read.
+            keys (iterable): If given, only these keys are decoded and yielded.
+        """
+        keys = None if keys is None else set(keys)
+        if not os.path.isfile(self.path):
+            # Compatibilidad con ejecuciones anteriores sin results.jsonl
+            with open(self.legacy_path, "r") as json_file:
+                for key, value in json.load(json_file).get(section, {}).items():
+                    if keys is None or key in keys:
+                        yield key, value
+            return
+
+        offsets = [
+            offset
+            for (sec, key), offset in self._index().items()
+            if sec == section and (keys is None or key in keys)
+        ]
+        with open(self.path, "rb") as store_file:
+            for offset in offsets:
+                store_file.seek(offset)
+                record = json.loads(store_file.readline())
+                if not record.get("deleted"):
+                    yield record["key"], record["value"]
+
+    def get(self, section, key, default=None):
+        """
+        Reads the last value written for a key, decoding only that record.
+
+        Args:
+            section (str): Section of the record.
+            key (str): Key of the record.
+            default (any): Value returned if the key is missing or removed.
+
+        Returns:
+            any: The stored value or `default`.
+        """
+        for _, value in self.iter_section(section, keys=[key]):
+            return value
+        return default
+
+    def iter_samples(self):
+        """
+        Yields (sample_name, sample_data) one sample at a time.
+        """
+        return self.iter_section("samples")
+
+    def read(self):
+        """
+        Reads the whole store into the legacy results.json layout.
+
+        Returns:
+            dict: {"reference": {...}, "samples": {...}, "metadata": {...}}
+        """
+        return {section: dict(self.iter_section(section)) for section in self.SECTIONS}
+
+    def finalize(self, legacy_json=True):
+        """
+        Finishes the run. If requested, writes the legacy results.json with the
+        content of the store.
+
+        Args:
+            legacy_json (bool): If True, writes results.json next to the store.
+
+        Returns:
+            str or None: Path of results.json if it was written.
+        """
+        if not legacy_json:
+            return None
+
+        content = self.read()
+        with open(self.legacy_path, "w") as json_file:
+            json.dump(content, json_file, indent=4, default=_json_default)
+        print(f"[*] Legacy JSON file written: {self.legacy_path}")
+        return self.legacy_path
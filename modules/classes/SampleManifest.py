@@ -0,0 +1,84 @@
+import os
+from modules.classes.DetectionCache import DetectionCache
+
+
+class SampleManifest:
+    """
+    Fingerprints of the sample images of a run, used to find which samples
+    are new, modified or removed when the run is updated.
+
+    A fingerprint holds the path, size, modification time and SHA-256 of the
+    file. Files with the same size and modification time are taken as
+    unchanged without reading them; otherwise their content is hashed, so a
+    file that was only touched or copied is not processed again.
+    """
+
+    # CONSTRUCTOR
+    def __init__(self, fingerprints=None):
+        """
+        Args:
+            fingerprints (dict): {sample name: fingerprint} of a previous run.
+        """
+        self.fingerprints = dict(fingerprints or {})
+
+    @staticmethod
+    def sample_name(sample_path):
+        """
+        Name under which a sample is stored (file name without extension).
+        """
+        return os.path.splitext(os.path.basename(sample_path))[0]
+
+    @staticmethod
+    def fingerprint(sample_path, previous=None):
+        """
+        Fingerprint of a file, reusing the hash of `previous` when the size and
+        modification time have not changed.
+
+        Args:
+            sample_path (str): Path of the file.
+            previous (dict): Previous fingerprint of the same sample, if any.
+
+        Returns:
+            dict: {"path", "size", "mtime_ns", "sha256"}.
+        """
+        stat = os.stat(sample_path)
+        if (
+            previous
+            and previous.get("size") == stat.st_size
+            and previous.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            sha256 = previous["sha256"]
+        else:
+            sha256 = DetectionCache.file_hash(sample_path)
+        return {
+            "path": sample_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        }
+
+    def diff(self, sample_paths):
+        """
+        Compares the current sample images with the fingerprints of the manifest.
+
+        Args:
+            sample_paths (list): Paths of the current sample images.
+
+        Returns:
+            tuple: (changed, removed, manifest) where `changed` lists the paths
+            of the new or modified samples, `removed` the names of the samples
+            that are no longer present and `manifest` a SampleManifest with the
+            fingerprints of the current samples.
+        """
+        changed = []
+        fingerprints = {}
+        for sample_path in sorted(sample_paths):
+            name = self.sample_name(sample_path)
+            previous = self.fingerprints.get(name)
+            current = self.fingerprint(sample_path, previous)
+            if previous is None or previous.get("sha256") != current["sha256"]:
+                changed.append(sample_path)
+            fingerprints[name] = current
+
+        removed = sorted(set(self.fingerprints) - set(fingerprints))
+        return changed, removed, SampleManifest(fingerprints)
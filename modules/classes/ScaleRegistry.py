@@ -0,0 +1,82 @@
+import os
+import json
+import tempfile
+from datetime import datetime
+from modules.classes.DetectionCache import DetectionCache
+
+
+class ScaleRegistry:
+    """
+    Persistent registry of the scales calculated from reference images.
+
+    Entries are keyed by the SHA-256 of the reference image and the real
+    length of its bar, so runs and batches that share a microscope setting
+    reuse the scale without processing the reference again. The registry is
+    a small JSON file, rewritten atomically on every update.
+    """
+
+    FILENAME = "scales.json"
+
+    # CONSTRUCTOR
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the JSON file (created on the first update).
+        """
+        self.path = path
+
+    @staticmethod
+    def key(reference_hash, real_length):
+        return f"{reference_hash}:{float(real_length)!r}"
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as registry_file:
+                return json.load(registry_file)
+        except (OSError, ValueError):
+            # Un registro dañado se trata como vacío y se reescribe
+            return {}
+
+    def lookup(self, reference_path, real_length):
+        """
+        Returns the registered scale of a reference image.
+
+        Args:
+            reference_path (str): Path of the reference image.
+            real_length (float): Real length of the reference bar in um.
+
+        Returns:
+            float or None: Scale in um per pixel, or None if it is not registered.
+        """
+        reference_hash = DetectionCache.file_hash(reference_path)
+        entry = self._load().get(self.key(reference_hash, real_length))
+        return None if entry is None else entry["scale"]
+
+    def record(self, reference_path, real_length, scale):
+        """
+        Registers the scale calculated from a reference image.
+
+        Args:
+            reference_path (str): Path of the reference image.
+            real_length (float): Real length of the reference bar in um.
+            scale (float): Scale in um per pixel.
+        """
+        reference_hash = DetectionCache.file_hash(reference_path)
+        entries = self._load()
+        entries[self.key(reference_hash, real_length)] = {
+            "scale": scale,
+            "unit": "um",
+            "real_length": real_length,
+            "reference": reference_path,
+            "created_at": datetime.now().isoformat(),
+        }
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        descriptor, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as tmp_file:
+            json.dump(entries, tmp_file, indent=4)
+        os.replace(tmp_path, self.path)
+        print(f"[*] Scale registered: {self.path}")
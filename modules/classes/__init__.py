@@ -1,13 +1,50 @@
-from .Particle import Particle
-from .ImageProcessor import ImageProcessor
-from .ParticleCalculator import ParticleCalculator
-from .LatexManager import LatexManager
-from .ExcelExporter import ExcelExporter
-
-__all__ = [
-    "Particle",
-    "ImageProcessor",
-    "ParticleCalculator",
-    "LatexManager",
-    "ExcelExporter",
-]
+# modules/classes/__init__.py
+import sys
+import types
+import importlib
+
+# Cada clase se importa la primera vez que se usa, no al importar el paquete:
+# así matplotlib, pandas, openpyxl y scipy solo se cargan si hacen falta
+_MODULES = {
+    "Particle": ".Particle",
+    "ParticleTable": ".ParticleTable",
+    "EdgeStore": ".EdgeStore",
+    "ArtifactRegistry": ".ArtifactRegistry",
+    "DetectionCache": ".DetectionCache",
+    "ImageProcessor": ".ImageProcessor",
+    "ParticleCalculator": ".ParticleCalculator",
+    "LatexManager": ".LatexManager",
+    "ResultsStore": ".ResultsStore",
+    "ExcelExporter": ".ExcelExporter",
+    "ColumnarExporter": ".ColumnarExporter",
+    "BatchRunner": ".BatchRunner",
+    "SampleManifest": ".SampleManifest",
+    "ScaleRegistry": ".ScaleRegistry",
+    "HotFolder": ".HotFolder",
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value  # Las siguientes consultas no pasan por aquí
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _LazyPackage(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Al importar un submódulo se enlaza en el paquete con su nombre, que es
+        # el de su clase: se omite para que el nombre siga resolviendo la clase
+        if name in _MODULES and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _LazyPackage
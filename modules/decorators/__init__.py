@@ -1,4 +1,5 @@
 # modules/decorators/__init__.py
+from .profiler import Profiler, profiler
 from .measure_execution_time import measure_execution_time
 
-__all__ = ["measure_execution_time"]
+__all__ = ["measure_execution_time", "Profiler", "profiler"]
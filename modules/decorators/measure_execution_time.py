@@ -1,24 +1,41 @@
 import time
 from functools import wraps
+from .profiler import profiler
 
 
-def measure_execution_time(func):
+def measure_execution_time(func=None, *, stage=None, verbose=None):
     """
     Decorator to measure the execution time of a function.
 
+    The call is timed with `time.perf_counter_ns` and recorded as a stage of
+    the shared profiler. Can be used bare (`@measure_execution_time`), which
+    also prints the time, or with a stage name
+    (`@measure_execution_time(stage="binarization")`), which only records it.
+
     :param func: The function to be measured.
+    :param stage: Name of the profiler stage. Defaults to the function name.
+    :param verbose: Print the execution time. Defaults to True only when no
+        stage name is given.
     :return: Wrapped function with execution time measurement.
     """
+    if func is None:
+        return lambda f: measure_execution_time(f, stage=stage, verbose=verbose)
+
+    name = stage or func.__name__
+    if verbose is None:
+        verbose = stage is None
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print(
-            f"[@] Function '{func.__name__}' executed in {execution_time:.4f} seconds."
-        )
+        start_time = time.perf_counter_ns()
+        with profiler.stage(name):
+            result = func(*args, **kwargs)
+        end_time = time.perf_counter_ns()
+        if verbose:
+            execution_time = (end_time - start_time) / 1e9
+            print(
+                f"[@] Function '{func.__name__}' executed in {execution_time:.4f} seconds."
+            )
         return result
 
     return wrapper
@@ -0,0 +1,325 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Collects named stage timings of the pipeline.
+
+    Stages are timed with `time.perf_counter_ns` and can be nested; a nested
+    stage is recorded under the path of its parents (e.g. 'obtain_particles/
+    binarization'). Each stage keeps its number of calls, total and maximum
+    time, free-form counters (particles, edges, bytes written, ...) and,
+    when memory tracing is enabled, the tracemalloc peak above the memory in
+    use when the stage started.
+
+    Timings are grouped in scopes: one per image, plus the 'run' scope for
+    everything that happens outside an image. Scopes recorded in worker
+    processes are moved to the main process with `pop_scope` and `merge`.
+    """
+
+    RUN_SCOPE = "run"
+    FILENAME = "timings.json"
+
+    # CONSTRUCTOR
+    def __init__(self, enabled=True, trace_memory=False):
+        """
+        Args:
+            enabled (bool): If False, stages run without being timed.
+            trace_memory (bool): If True, records the tracemalloc peak of each
+                stage (starts tracemalloc, which slows allocations down).
+        """
+        self.enabled = enabled
+        self.trace_memory = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+        self.configure(trace_memory=trace_memory)
+
+    def configure(self, enabled=None, trace_memory=None):
+        """
+        Changes the options of the profiler.
+
+        Args:
+            enabled (bool): Enables or disables the timing of stages.
+            trace_memory (bool): Enables or disables the tracemalloc peaks.
+        """
+        if enabled is not None:
+            self.enabled = enabled
+        if trace_memory is not None:
+            if trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.trace_memory = trace_memory
+
+    def reset(self):
+        """
+        Discards every recorded timing and restarts the run clock.
+        """
+        with self._lock:
+            self.scopes = {}  # scope -> {ruta de la etapa: estadísticas}
+            self._started_ns = time.perf_counter_ns()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = [self._root_frame()]
+        return self._local.stack
+
+    @staticmethod
+    def _root_frame():
+        # Marco sin nombre que solo acumula el pico de memoria del scope
+        return {"name": None, "counters": {}, "peak": 0, "start_bytes": 0}
+
+    def _tracing(self):
+        return self.trace_memory and tracemalloc.is_tracing()
+
+    def _scope(self):
+        return getattr(self._local, "scope", self.RUN_SCOPE)
+
+    @contextmanager
+    def scope(self, name):
+        """
+        Records the stages run inside the block under the scope `name`
+        (usually the name of the image being processed). Stage paths start
+        again inside the scope, so they are the same whether the image is
+        processed in this process or in a worker.
+        """
+        previous_scope = self._scope()
+        previous_stack = self._stack()
+        root = self._root_frame()
+        if self._tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            previous_stack[-1]["peak"] = max(previous_stack[-1]["peak"], peak)
+
+        self._local.scope = name
+        self._local.stack = [root]
+        try:
+            yield
+        finally:
+            self._local.scope = previous_scope
+            self._local.stack = previous_stack
+            if self._tracing():
+                peak = max(tracemalloc.get_traced_memory()[1], root["peak"])
+                previous_stack[-1]["peak"] = max(previous_stack[-1]["peak"], peak)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the block as the stage `name`, nested under the running stages.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        frame = {"name": name, "counters": {}, "peak": 0, "start_bytes": 0}
+        tracing = self._tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # El pico del padre se guarda antes de reiniciarlo para esta etapa
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["start_bytes"] = current
+
+        stack.append(frame)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            path = "/".join(f["name"] for f in stack[1:])
+            stack.pop()
+
+            peak_bytes = None
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], frame["peak"])
+                peak_bytes = max(0, peak - frame["start_bytes"])
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+
+            self._record(path, elapsed, frame["counters"], peak_bytes)
+
+    def count(self, name, value=1):
+        """
+        Adds `value` to the counter `name` of the innermost running stage.
+        Outside any stage, the counter is recorded under the scope itself.
+        """
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if len(stack) > 1:
+            counters = stack[-1]["counters"]
+            counters[name] = counters.get(name, 0) + value
+        else:
+            self._record("", 0, {name: value}, None, calls=0)
+
+    def _record(self, path, elapsed_ns, counters, peak_bytes, calls=1):
+        with self._lock:
+            stages = self.scopes.setdefault(self._scope(), {})
+            stats = stages.setdefault(path, self._empty_stats())
+            self._add_stats(
+                stats,
+                {
+                    "calls": calls,
+                    "total_ns": elapsed_ns,
+                    "max_ns": elapsed_ns,
+                    "peak_bytes": peak_bytes,
+                    "counters": counters,
+                },
+            )
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "calls": 0,
+            "total_ns": 0,
+            "max_ns": 0,
+            "peak_bytes": None,
+            "counters": {},
+        }
+
+    @staticmethod
+    def _add_stats(stats, other):
+        stats["calls"] += other["calls"]
+        stats["total_ns"] += other["total_ns"]
+        stats["max_ns"] = max(stats["max_ns"], other["max_ns"])
+        if other["peak_bytes"] is not None:
+            stats["peak_bytes"] = max(stats["peak_bytes"] or 0, other["peak_bytes"])
+        for name, value in other["counters"].items():
+            stats["counters"][name] = stats["counters"].get(name, 0) + value
+
+    def pop_scope(self, name):
+        """
+        Removes the scope `name` and returns its stages, so that they can be
+        sent to another process and merged there.
+
+        Returns:
+            dict: {stage path: statistics}.
+        """
+        with self._lock:
+            return self.scopes.pop(name, {})
+
+    def merge(self, name, stages):
+        """
+        Adds the stages of a scope recorded elsewhere (e.g. a worker process).
+
+        Args:
+            name (str): Scope the stages belong to.
+            stages (dict): {stage path: statistics}, as returned by pop_scope.
+        """
+        with self._lock:
+            target = self.scopes.setdefault(name, {})
+            for path, stats in stages.items():
+                self._add_stats(target.setdefault(path, self._empty_stats()), stats)
+
+    @staticmethod
+    def _format_stages(stages):
+        formatted = {}
+        for path, stats in sorted(stages.items()):
+            entry = {
+                "calls": stats["calls"],
+                "total_s": stats["total_ns"] / 1e9,
+                "max_s": stats["max_ns"] / 1e9,
+            }
+            if stats["peak_bytes"] is not None:
+                entry["peak_bytes"] = stats["peak_bytes"]
+            if stats["counters"]:
+                entry["counters"] = dict(stats["counters"])
+            formatted[path or "<scope>"] = entry
+        return formatted
+
+    def report(self):
+        """
+        Builds the timing report of the run.
+
+        Returns:
+            dict: 'elapsed_s' since the last reset, 'run' with every stage
+            aggregated over all scopes, and 'images' with the stages of each
+            image scope.
+        """
+        with self._lock:
+            totals = {}
+            for stages in self.scopes.values():
+                for path, stats in stages.items():
+                    self._add_stats(totals.setdefault(path, self._empty_stats()), stats)
+            images = {
+                name: self._format_stages(stages)
+                for name, stages in sorted(self.scopes.items())
+                if name != self.RUN_SCOPE
+            }
+
+        return {
+            "elapsed_s": (time.perf_counter_ns() - self._started_ns) / 1e9,
+            "trace_memory": self.trace_memory,
+            "run": self._format_stages(totals),
+            "images": images,
+        }
+
+    def write_summary(self, info_path, filename=None, lanes=1):
+        """
+        Writes the timing report to the info folder of the run and prints the
+        top-level stages, slowest first.
+
+        Stages of the run scope happen in this process one after another, so
+        they are printed as a share of the wall time. Stages of the images are
+        summed over the samples, which may run at the same time in `lanes`
+        worker processes or threads, so they are printed as a share of
+        `lanes` x the wall time.
+
+        Args:
+            info_path (str): Info folder of the run.
+            filename (str): Name of the file (default: timings.json).
+            lanes (int): Number of samples processed at the same time.
+
+        Returns:
+            str: Path of the written file.
+        """
+        report = self.report()
+        report["lanes"] = lanes
+        file_path = os.path.join(info_path, filename or self.FILENAME)
+        with open(file_path, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+
+        with self._lock:
+            run_stages = self._format_stages(self.scopes.get(self.RUN_SCOPE, {}))
+        image_stages = {}
+        for stages in report["images"].values():
+            for path, stats in stages.items():
+                total = image_stages.setdefault(path, {"total_s": 0.0, "calls": 0})
+                total["total_s"] += stats["total_s"]
+                total["calls"] += stats["calls"]
+
+        elapsed = report["elapsed_s"] or 1.0
+        print(f"[*] Timing summary ({report['elapsed_s']:.2f} s):")
+        self._print_stages(run_stages, elapsed)
+        if image_stages:
+            print(
+                f"    Per image, summed over {lanes} parallel lane(s) "
+                f"(% of {lanes} x {report['elapsed_s']:.2f} s):"
+            )
+            self._print_stages(image_stages, lanes * elapsed)
+        print(f"[*] Timing summary written: {file_path}")
+        return file_path
+
+    @staticmethod
+    def _print_stages(stages, available_s):
+        top_level = sorted(
+            (
+                (path, stats)
+                for path, stats in stages.items()
+                if "/" not in path and path != "<scope>"
+            ),
+            key=lambda item: item[1]["total_s"],
+            reverse=True,
+        )
+        for path, stats in top_level:
+            print(
+                f"    {path:<24} {stats['total_s']:>9.3f} s "
+                f"{100 * stats['total_s'] / available_s:>5.1f}%  x{stats['calls']}"
+            )
+
+
+# Perfilador compartido por todo el proceso
+profiler = Profiler()
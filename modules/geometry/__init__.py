@@ -0,0 +1,40 @@
+# modules/geometry/__init__.py
+from .closest_pair import (
+    delaunay_edges,
+    delaunay_mesh,
+    edge_lengths,
+    line_edges,
+    closest_pair_delaunay,
+    closest_pair_grid,
+)
+from .batch import pack_samples, delaunay_edges_batch, closest_pairs_batch
+from .nearest_neighbors import (
+    nearest_neighbors,
+    nearest_neighbor_stats,
+    clark_evans_ratio,
+)
+from .shape_descriptors import (
+    DESCRIPTORS,
+    label_moments,
+    shape_descriptors,
+    summarize_descriptors,
+)
+
+__all__ = [
+    "delaunay_edges",
+    "delaunay_mesh",
+    "edge_lengths",
+    "line_edges",
+    "closest_pair_delaunay",
+    "closest_pair_grid",
+    "pack_samples",
+    "delaunay_edges_batch",
+    "closest_pairs_batch",
+    "nearest_neighbors",
+    "nearest_neighbor_stats",
+    "clark_evans_ratio",
+    "DESCRIPTORS",
+    "label_moments",
+    "shape_descriptors",
+    "summarize_descriptors",
+]
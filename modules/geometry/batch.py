@@ -0,0 +1,187 @@
+import numpy as np
+from .closest_pair import delaunay_mesh
+
+
+def pack_samples(samples):
+    """
+    Concatenates the coordinates of many samples into one ragged array.
+
+    Args:
+        samples (iterable): (N_i, 2) arrays of coordinates, one per sample.
+
+    Returns:
+        tuple: (points, offsets) where `points` is the (P, 2) float64 array of
+        all the coordinates and `offsets` the (S + 1,) int64 array such that
+        sample i is `points[offsets[i]:offsets[i + 1]]`.
+    """
+    arrays = [np.asarray(sample, dtype=np.float64).reshape(-1, 2) for sample in samples]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(array) for array in arrays], out=offsets[1:])
+    points = np.concatenate(arrays) if arrays else np.empty((0, 2))
+    return points, offsets
+
+
+def _segment_argmin(values, offsets):
+    """
+    Index of the minimum of every segment `values[offsets[i]:offsets[i + 1]]`
+    (the first one in case of ties, like np.argmin), or -1 for empty segments.
+    """
+    count = len(offsets) - 1
+    best = np.full(count, -1, dtype=np.int64)
+    sizes = np.diff(offsets)
+    nonempty = sizes > 0
+    if not nonempty.any():
+        return best
+
+    minima = np.full(count, np.nan)
+    minima[nonempty] = np.minimum.reduceat(values, offsets[:-1][nonempty])
+    segments = np.repeat(np.arange(count), sizes)
+    # Primera posición de cada segmento que alcanza su mínimo
+    candidates = np.flatnonzero(values == minima[segments])
+    owners = segments[candidates]
+    first = np.ones(len(candidates), dtype=bool)
+    first[1:] = owners[1:] != owners[:-1]
+    best[owners[first]] = candidates[first]
+    return best
+
+
+def delaunay_edges_batch(points, offsets):
+    """
+    Extracts the unique Delaunay edges of every sample of a ragged array.
+
+    Only the triangulation runs once per sample (one Qhull call each); the
+    edges of all the samples are extracted and deduplicated together, in
+    shared buffers. Within a sample, the edges come in the same order as
+    `delaunay_mesh`: degenerate samples (duplicated or collinear points) use
+    its fallbacks, samples with 2 points have their single edge and samples
+    with fewer points have none.
+
+    Args:
+        points (ndarray): (P, 2) coordinates of all the samples.
+        offsets (ndarray): (S + 1,) row offsets of the samples.
+
+    Returns:
+        tuple: (edges, edge_offsets, degenerate) where `edges` is the (E, 2)
+        int64 array of global point indices, `edge_offsets` the (S + 1,)
+        offsets of the edges of every sample and `degenerate` the (S,) bool
+        array of the samples of 3 or more points that needed a fallback.
+    """
+    from scipy.spatial import Delaunay, QhullError
+
+    points = np.asarray(points, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    count = len(offsets) - 1
+    sizes = np.diff(offsets)
+    degenerate = np.zeros(count, dtype=bool)
+
+    # Triángulos de todas las muestras, con índices globales, en orden de muestra
+    simplices = []
+    for i in np.flatnonzero(sizes >= 3).tolist():
+        start, stop = offsets[i], offsets[i + 1]
+        try:
+            triangulation = Delaunay(points[start:stop])
+            if not len(triangulation.coplanar):
+                simplices.append(triangulation.simplices + start)
+                continue
+        except QhullError:
+            pass
+        # Muestra degenerada: sus bordes como triángulos (a, b, a)
+        degenerate[i] = True
+        edges, _ = delaunay_mesh(points[start:stop])
+        simplices.append(edges[:, [0, 1, 0]] + start)
+    # Las muestras de 2 puntos tienen un único borde: un triángulo degenerado
+    pairs = offsets[:-1][sizes == 2]
+    simplices.append(np.stack((pairs, pairs + 1, pairs), axis=1))
+    simplices = np.concatenate(simplices).astype(np.int64)
+
+    edges = np.stack(
+        (simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [2, 0]]), axis=1
+    ).reshape(-1, 2)
+    lo = np.minimum(edges[:, 0], edges[:, 1])
+    hi = np.maximum(edges[:, 0], edges[:, 1])
+    # Los bordes (a, a) de los triángulos degenerados no son bordes
+    keep = lo != hi
+    edges, lo, hi = edges[keep], lo[keep], hi[keep]
+
+    # Índices globales: una clave única por borde en todas las muestras
+    _, first = np.unique(lo * max(len(points), 1) + hi, return_index=True)
+    first.sort()
+    edges = edges[first]
+
+    # Los bordes de las muestras de 2 puntos van al final: se agrupan por muestra
+    sample_of_edge = np.searchsorted(offsets, edges[:, 0], side="right") - 1
+    order = np.argsort(sample_of_edge, kind="stable")
+    edges = edges[order]
+    edge_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sample_of_edge, minlength=count), out=edge_offsets[1:])
+    return edges, edge_offsets, degenerate
+
+
+def closest_pairs_batch(points, offsets):
+    """
+    Runs the Delaunay closest-pair search on every sample of a ragged array in
+    one call, and summarizes the edges of every sample.
+
+    Args:
+        points (ndarray): (P, 2) coordinates of all the samples.
+        offsets (ndarray): (S + 1,) row offsets of the samples (see
+            `pack_samples`).
+
+    Returns:
+        dict: Arrays with one entry per sample:
+            - "min_distance": (S,) length of the shortest edge (NaN if none).
+            - "closest_pair": (S, 2) indices of its points within the sample
+              (-1 if none).
+            - "edge_count", "edge_mean", "edge_std", "edge_max": (S,) number of
+              edges and statistics of their lengths (NaN if none).
+            - "degenerate": (S,) True for the samples of duplicated or
+              collinear points, searched with the fallbacks of `delaunay_mesh`.
+        and the edges themselves:
+            - "edges": (E, 2) indices within each sample.
+            - "lengths": (E,) lengths.
+            - "edge_offsets": (S + 1,) offsets of the edges of every sample.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    count = len(offsets) - 1
+    edges, edge_offsets, degenerate = delaunay_edges_batch(points, offsets)
+
+    diff = points[edges[:, 0]] - points[edges[:, 1]]
+    lengths = np.sqrt(diff[:, 0] * diff[:, 0] + diff[:, 1] * diff[:, 1])
+    segments = np.repeat(np.arange(count), np.diff(edge_offsets))
+
+    # Estadísticas por muestra con bincount, sin bucles en Python
+    edge_count = np.diff(edge_offsets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total = np.bincount(segments, weights=lengths, minlength=count)
+        edge_mean = total / edge_count
+        deviations = lengths - edge_mean[segments]
+        edge_std = np.sqrt(
+            np.bincount(segments, weights=deviations * deviations, minlength=count)
+            / edge_count
+        )
+    edge_max = np.full(count, np.nan)
+    has_edges = edge_count > 0
+    if has_edges.any():
+        edge_max[has_edges] = np.maximum.reduceat(lengths, edge_offsets[:-1][has_edges])
+
+    best = _segment_argmin(lengths, edge_offsets)
+    min_distance = np.full(count, np.nan)
+    closest_pair = np.full((count, 2), -1, dtype=np.int64)
+    min_distance[has_edges] = lengths[best[has_edges]]
+    # Índices locales a cada muestra
+    local_edges = edges - offsets[segments][:, None]
+    closest_pair[has_edges] = local_edges[best[has_edges]]
+
+    return {
+        "min_distance": min_distance,
+        "closest_pair": closest_pair,
+        "edge_count": edge_count,
+        "edge_mean": edge_mean,
+        "edge_std": edge_std,
+        "edge_max": edge_max,
+        "degenerate": degenerate,
+        "edges": local_edges,
+        "lengths": lengths,
+        "edge_offsets": edge_offsets,
+    }
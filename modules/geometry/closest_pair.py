@@ -0,0 +1,314 @@
+import numpy as np
+
+
+def delaunay_edges(points, simplices=None):
+    """
+    Extracts the unique edges of the Delaunay triangulation of a point set.
+
+    The edges are returned in the order in which they first appear when walking
+    the simplices as (0, 1), (1, 2), (2, 0), keeping the orientation of that
+    first appearance. This is the same order the per-simplex loop produced.
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates.
+        simplices (ndarray): Precomputed (T, 3) simplices. If None, the
+            triangulation is computed from `points`.
+
+    Returns:
+        ndarray: (E, 2) int array with the point indices of every unique edge.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if simplices is None:
+        # scipy se importa al usarse: cuesta más que el resto del arranque
+        from scipy.spatial import Delaunay
+
+        simplices = Delaunay(points).simplices
+
+    # Los 3 bordes de cada triángulo, intercalados por simplex
+    edges = np.stack(
+        (simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [2, 0]]), axis=1
+    ).reshape(-1, 2)
+
+    # Clave única por borde sin importar la orientación
+    lo = np.minimum(edges[:, 0], edges[:, 1]).astype(np.int64)
+    hi = np.maximum(edges[:, 0], edges[:, 1]).astype(np.int64)
+    keys = lo * len(points) + hi
+
+    # Primera aparición de cada borde, en orden de recorrido
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+
+    return edges[first]
+
+
+def edge_lengths(points, edges):
+    """
+    Computes the Euclidean length of every edge in one batch.
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates.
+        edges (ndarray): (E, 2) int array of point indices.
+
+    Returns:
+        ndarray: (E,) float64 array of lengths.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    dx = points[edges[:, 0], 0] - points[edges[:, 1], 0]
+    dy = points[edges[:, 0], 1] - points[edges[:, 1], 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def line_edges(points):
+    """
+    Edges of the degenerate triangulation of collinear points: the path that
+    joins the points sorted along their line.
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates.
+
+    Returns:
+        ndarray: (N - 1, 2) int array of point indices.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    # Dirección de la recta: entre los extremos del eje de mayor extensión
+    axis = int(np.argmax(np.ptp(points, axis=0)))
+    direction = points[np.argmax(points[:, axis])] - points[np.argmin(points[:, axis])]
+    order = np.argsort((points - points[0]) @ direction, kind="stable")
+    return np.stack((order[:-1], order[1:]), axis=1)
+
+
+def _cell_pairs(counts_a, starts_a, counts_b, starts_b, lo=0, hi=None):
+    """
+    Every (a, b) combination of the points of paired cells, as positions in
+    the cell-sorted order, without Python loops. With `lo` and `hi` only the
+    combinations in that range of the enumeration are returned.
+    """
+    sizes = counts_a * counts_b
+    if lo == 0 and hi is None:
+        total = int(sizes.sum())
+        owner = np.repeat(np.arange(len(sizes)), sizes)
+        local = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    else:
+        ends = np.cumsum(sizes)
+        index = np.arange(lo, hi, dtype=np.int64)
+        owner = np.searchsorted(ends, index, side="right")
+        local = index - (ends - sizes)[owner]
+    return (
+        starts_a[owner] + local // counts_b[owner],
+        starts_b[owner] + local % counts_b[owner],
+    )
+
+
+def _candidate_blocks(counts, starts, neighbours, limit):
+    """
+    Candidate pairs of the grid search (same cell and neighbouring cells), as
+    (first, second) positions in the cell-sorted order, in blocks of at most
+    `limit` pairs so that crowded cells do not have to fit in memory at once.
+    """
+    groups = [(counts, starts, counts, starts)]
+    groups += [(counts[a], starts[a], counts[b], starts[b]) for a, b in neighbours]
+    block, size = [], 0
+    for index, group in enumerate(groups):
+        total = int(np.sum(group[0] * group[2]))
+        lo = 0
+        while lo < total:
+            hi = min(lo + limit - size, total)
+            if lo == 0 and hi == total:
+                first, second = _cell_pairs(*group)
+            else:
+                first, second = _cell_pairs(*group, lo, hi)
+            if index == 0:
+                # Dentro de una celda, cada par una sola vez
+                inside = first < second
+                first, second = first[inside], second[inside]
+            block.append((first, second))
+            size += hi - lo
+            lo = hi
+            if size >= limit:
+                yield tuple(np.concatenate(part) for part in zip(*block))
+                block, size = [], 0
+    if block:
+        yield tuple(np.concatenate(part) for part in zip(*block))
+
+
+def closest_pair_grid(points, budget=32):
+    """
+    Finds the exact closest pair of points with a uniform grid hash, in
+    O(n log n) (the cost of sorting the points by cell). Unlike the Delaunay
+    search it works on any input: duplicated, collinear or just two points.
+
+    The points are hashed into square cells of side h and only the pairs in
+    the same or neighbouring cells are measured. If the shortest of them is
+    at most h, it is the closest pair, since any pair closer than h lies in
+    neighbouring cells; otherwise h grows to that distance and the search is
+    repeated. Crowded grids (more than `budget` candidate pairs per point)
+    are refined by halving h first; the final exact pass, whose side cannot
+    be refined, measures its candidates in blocks of `budget` pairs per
+    point, so memory stays bounded.
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates, N >= 2.
+        budget (int): Candidate pairs per point allowed before refining.
+
+    Returns:
+        tuple: (i, j, distance) with i < j; among pairs at the same distance,
+        the one with the smallest (i, j).
+
+    Raises:
+        ValueError: If there are fewer than two points.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(points)
+    if n < 2:
+        raise ValueError("[!] At least two points are needed for the closest pair.")
+
+    # Puntos repetidos: distancia 0, sin necesidad de rejilla
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    same = np.all(points[order[1:]] == points[order[:-1]], axis=1)
+    if same.any():
+        pairs = np.sort(np.stack((order[:-1][same], order[1:][same]), axis=1), axis=1)
+        i, j = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))[0]].tolist()
+        return i, j, 0.0
+
+    # Lado inicial: en torno a un punto por celda
+    extent = np.ptp(points, axis=0)
+    area = float(extent[0] * extent[1])
+    h = np.sqrt(area / n) if area > 0 else float(extent.max()) / n
+    origin = points.min(axis=0)
+
+    exact = False
+    for _ in range(128):
+        cells = np.floor((points - origin) / h).astype(np.int64)
+        # Rangos densos por eje para que la clave de celda no desborde
+        columns, cx = np.unique(cells[:, 0], return_inverse=True)
+        rows, cy = np.unique(cells[:, 1], return_inverse=True)
+        keys = cx.astype(np.int64) * len(rows) + cy
+        by_cell = np.argsort(keys, kind="stable")
+        cell_keys, starts, counts = np.unique(
+            keys[by_cell], return_index=True, return_counts=True
+        )
+        cell_x = columns[cell_keys // len(rows)]
+        cell_y = rows[cell_keys % len(rows)]
+
+        # Celdas vecinas: la misma y la mitad de las 8 adyacentes
+        neighbours = []
+        for dx, dy in ((1, -1), (1, 0), (1, 1), (0, 1)):
+            rank_x = np.searchsorted(columns, cell_x + dx)
+            rank_y = np.searchsorted(rows, cell_y + dy)
+            valid = (rank_x < len(columns)) & (rank_y < len(rows))
+            valid[valid] &= (columns[rank_x[valid]] == cell_x[valid] + dx) & (
+                rows[rank_y[valid]] == cell_y[valid] + dy
+            )
+            target = np.searchsorted(
+                cell_keys, rank_x[valid] * len(rows) + rank_y[valid]
+            )
+            found = target < len(cell_keys)
+            found[found] &= (
+                cell_keys[target[found]]
+                == rank_x[valid][found] * len(rows) + rank_y[valid][found]
+            )
+            neighbours.append((np.flatnonzero(valid)[found], target[found]))
+
+        candidates = int(np.sum(counts * (counts - 1) // 2)) + sum(
+            int(np.sum(counts[a] * counts[b])) for a, b in neighbours
+        )
+        if not exact and candidates > budget * n:
+            h /= 2
+            continue
+
+        # El paso exacto puede superar el presupuesto: se mide por bloques
+        best = None
+        for first, second in _candidate_blocks(
+            counts, starts, neighbours, max(budget * n, 1)
+        ):
+            if len(first) == 0:
+                continue
+            pairs = np.sort(np.stack((by_cell[first], by_cell[second]), axis=1), axis=1)
+            diff = points[pairs[:, 0]] - points[pairs[:, 1]]
+            distances = np.sqrt(diff[:, 0] * diff[:, 0] + diff[:, 1] * diff[:, 1])
+            # Desempate por (i, j) solo entre los pares a la distancia mínima
+            ties = np.flatnonzero(distances == distances.min())
+            k = ties[np.lexsort((pairs[ties, 1], pairs[ties, 0]))[0]]
+            candidate = (float(distances[k]), *pairs[k].tolist())
+            best = candidate if best is None else min(best, candidate)
+
+        if best is None:
+            # Todas las celdas aisladas: celdas más grandes
+            h *= 2
+            continue
+
+        distance, i, j = best
+        if distance <= h or exact:
+            return i, j, distance
+
+        # La distancia hallada acota la mínima: con ese lado la búsqueda es exacta
+        h = distance
+        exact = True
+
+    raise RuntimeError("[!] The grid search did not converge.")
+
+
+def delaunay_mesh(points):
+    """
+    Unique edges of the Delaunay mesh of a point set, robust to degenerate
+    inputs:
+
+    - Points that Qhull leaves out of the triangulation (duplicates) are
+      joined to their nearest vertex.
+    - If there is no triangulation (fewer than 3 points, or all collinear),
+      the mesh is the path along the line (see `line_edges`).
+
+    In both cases the exact closest pair from `closest_pair_grid` is added
+    if it is not already an edge, so the shortest edge is always the closest
+    pair.
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates, N >= 2.
+
+    Returns:
+        tuple: (edges, degenerate) with the (E, 2) int array of edges and
+        True if one of the fallbacks was used.
+    """
+    from scipy.spatial import Delaunay, QhullError
+
+    points = np.asarray(points, dtype=np.float64)
+    try:
+        triangulation = Delaunay(points)
+    except QhullError:
+        edges = line_edges(points)
+    else:
+        edges = delaunay_edges(points, triangulation.simplices)
+        if not len(triangulation.coplanar):
+            return edges, False
+        edges = np.concatenate((edges, triangulation.coplanar[:, [0, 2]]))
+
+    i, j, _ = closest_pair_grid(points)
+    known = np.any(
+        ((edges[:, 0] == i) & (edges[:, 1] == j))
+        | ((edges[:, 0] == j) & (edges[:, 1] == i))
+    )
+    if not known:
+        edges = np.concatenate((edges, [[i, j]]))
+    return edges.astype(np.int64), True
+
+
+def closest_pair_delaunay(points):
+    """
+    Finds the closest pair of points using the edges of a Delaunay triangulation.
+    Degenerate inputs (duplicated or collinear points, or just two points)
+    fall back to the exact grid search (see `delaunay_mesh`).
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates, N >= 2.
+
+    Returns:
+        tuple: (edges, lengths, best) where `edges` is the (E, 2) array of unique
+        edges, `lengths` their lengths and `best` the index of the shortest edge
+        (the first one in case of ties).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    edges, _ = delaunay_mesh(points)
+    lengths = edge_lengths(points, edges)
+    return edges, lengths, int(np.argmin(lengths))
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+def nearest_neighbors(points, k=1):
+    """
+    Queries the k nearest neighbours of every point with a KD-tree.
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates.
+        k (int): Number of neighbours per point (the point itself is excluded).
+
+    Returns:
+        tuple: (tree, distances, indices) with the built cKDTree and two (N, k)
+        arrays sorted from nearest to farthest.
+
+    Raises:
+        ValueError: If k is smaller than 1.
+    """
+    from scipy.spatial import cKDTree
+
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}.")
+
+    points = np.asarray(points, dtype=np.float64)
+    k = min(k, len(points) - 1)
+    tree = cKDTree(points)
+
+    # k + 1 porque el vecino más cercano de cada punto es él mismo
+    distances, indices = tree.query(points, k=k + 1)
+    return tree, distances[:, 1:], indices[:, 1:]
+
+
+def clark_evans_ratio(nn_distances, area):
+    """
+    Clark–Evans aggregation index R = observed mean NN distance / expected one
+    for a Poisson process of the same density. R < 1 means clustering and
+    R > 1 means regular spacing.
+
+    Args:
+        nn_distances (ndarray): (N,) nearest-neighbour distances.
+        area (float): Area of the observation window, in the same units squared.
+
+    Returns:
+        float or None: The ratio, or None if it cannot be computed.
+    """
+    if len(nn_distances) == 0 or not area:
+        return None
+    density = len(nn_distances) / area
+    expected = 0.5 / np.sqrt(density)
+    return float(np.mean(nn_distances) / expected)
+
+
+def nearest_neighbor_stats(points, k=1, radius=None, area=None, bins=20):
+    """
+    Computes nearest-neighbour statistics of a point set in O(n log n).
+
+    Args:
+        points (ndarray): (N, 2) array of coordinates, N >= 2.
+        k (int): Number of nearest neighbours to query per point.
+        radius (float): If given, counts the pairs within this distance
+            (distance <= radius).
+        area (float): Area of the observation window. If None, the bounding box
+            of the points is used for the Clark–Evans ratio.
+        bins (int): Number of bins of the NN-distance histogram.
+
+    Returns:
+        tuple: (nn_distances, knn_distances, knn_indices, stats) where
+        `nn_distances` is the (N,) distance to the nearest neighbour, the knn
+        arrays are (N, k) and `stats` is a JSON-serializable summary.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    tree, knn_distances, knn_indices = nearest_neighbors(points, k)
+    nn_distances = knn_distances[:, 0]
+
+    if area is None:
+        width, height = np.ptp(points, axis=0)
+        area = float(width * height)
+
+    counts, edges = np.histogram(nn_distances, bins=bins)
+    stats = {
+        "k": int(knn_distances.shape[1]),
+        "mean": float(np.mean(nn_distances)),
+        "median": float(np.median(nn_distances)),
+        "std": float(np.std(nn_distances)),
+        "min": float(np.min(nn_distances)),
+        "max": float(np.max(nn_distances)),
+        "clark_evans": clark_evans_ratio(nn_distances, area),
+        "histogram": {"counts": counts.tolist(), "bin_edges": edges.tolist()},
+    }
+
+    if radius is not None:
+        stats["radius"] = float(radius)
+        stats["close_pairs"] = int(len(tree.query_pairs(radius, output_type="ndarray")))
+
+    return nn_distances, knn_distances, knn_indices, stats
@@ -0,0 +1,154 @@
+import numpy as np
+
+# Descriptores por partícula, en el orden en que se exportan
+DESCRIPTORS = (
+    "area",
+    "perimeter",
+    "equivalent_diameter",
+    "circularity",
+    "aspect_ratio",
+    "orientation",
+)
+
+
+def label_moments(labels, count, origins=None, foreground=None):
+    """
+    Area and second-order central moments of every label of a label image.
+
+    The foreground is split into horizontal runs of pixels, which belong to a
+    single label each (two labels are never horizontal neighbours). The sums
+    over the pixels of every run have a closed form, so np.bincount only
+    runs over the runs, not over every pixel.
+
+    Args:
+        labels (ndarray): Label image (0 is the background).
+        count (int): Number of labels, background included.
+        origins (ndarray): Optional (count - 1, 2) reference point (x, y) of
+            every label, e.g. the corner of its bounding box. Coordinates are
+            taken relative to it, which keeps the raw moments small and the
+            central moments precise on large images.
+        foreground (ndarray): Optional image the labels were computed from
+            (non-zero pixels are foreground), which is cheaper to scan than
+            the labels.
+
+    Returns:
+        tuple: (areas, mu20, mu02, mu11), each with one entry per label 1..count-1.
+    """
+    height, width = labels.shape
+    if foreground is None:
+        foreground = labels
+
+    # Cada fila con un borde de fondo a cada lado: los cambios alternan inicio y fin
+    padded = np.zeros((height, width + 2), dtype=bool)
+    np.not_equal(foreground, 0, out=padded[:, 1:-1])
+    changes = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    rows = changes[0::2] // (width + 1)
+    starts = changes[0::2] - rows * (width + 1)
+    ends = changes[1::2] - rows * (width + 1)
+    ids = labels[rows, starts]
+
+    if origins is not None:
+        origins = np.asarray(origins, dtype=np.int64)
+        starts = starts - origins[ids - 1, 0]
+        ends = ends - origins[ids - 1, 0]
+        rows = rows - origins[ids - 1, 1]
+    a = starts.astype(np.float64)
+    b = ends.astype(np.float64) - 1  # Último píxel de la racha
+    y = rows.astype(np.float64)
+
+    # Sumas de x y x^2 sobre a..b en forma cerrada
+    n = b - a + 1
+    sum_x = (a + b) * n / 2
+    sum_xx = (b * (b + 1) * (2 * b + 1) - (a - 1) * a * (2 * a - 1)) / 6
+
+    m00 = np.bincount(ids, weights=n, minlength=count)[1:]
+    m10 = np.bincount(ids, weights=sum_x, minlength=count)[1:]
+    m01 = np.bincount(ids, weights=n * y, minlength=count)[1:]
+    m20 = np.bincount(ids, weights=sum_xx, minlength=count)[1:]
+    m02 = np.bincount(ids, weights=n * y * y, minlength=count)[1:]
+    m11 = np.bincount(ids, weights=sum_x * y, minlength=count)[1:]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cx = m10 / m00
+        cy = m01 / m00
+    return m00, m20 - cx * m10, m02 - cy * m01, m11 - cx * m01
+
+
+def shape_descriptors(areas, perimeters, mu20, mu02, mu11, scale=1.0):
+    """
+    Size and shape descriptors of every particle, computed in batch.
+
+    The aspect ratio and the orientation come from the ellipse with the same
+    second-order moments as the particle: the aspect ratio is the ratio of
+    its axes and the orientation the angle of its major axis with the X axis,
+    in degrees in (-90, 90] (image coordinates, Y grows downwards).
+
+    Args:
+        areas (array-like): (N,) areas in pixels^2.
+        perimeters (array-like): (N,) perimeters in pixels, or None if the
+            detection backend does not provide them (perimeter and
+            circularity are NaN then).
+        mu20, mu02, mu11 (array-like): (N,) second-order central moments in pixels.
+        scale (float): Scale in um per pixel.
+
+    Returns:
+        dict: One (N,) float64 array per name in DESCRIPTORS. Area is in um^2,
+        perimeter and equivalent diameter in um; circularity (4*pi*A/P^2) and
+        aspect ratio are dimensionless (NaN when undefined).
+    """
+    areas = np.asarray(areas, dtype=np.float64)
+    if perimeters is None:
+        perimeters = np.full(len(areas), np.nan)
+    perimeters = np.asarray(perimeters, dtype=np.float64)
+    mu20 = np.asarray(mu20, dtype=np.float64)
+    mu02 = np.asarray(mu02, dtype=np.float64)
+    mu11 = np.asarray(mu11, dtype=np.float64)
+
+    # Autovalores del tensor de inercia: ejes mayor y menor de la elipse equivalente
+    half_trace = (mu20 + mu02) / 2
+    root = np.sqrt(((mu20 - mu02) / 2) ** 2 + mu11**2)
+    major = half_trace + root
+    minor = np.maximum(half_trace - root, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        circularity = 4 * np.pi * areas / perimeters**2
+        aspect_ratio = np.sqrt(major / minor)
+
+    return {
+        "area": areas * scale**2,
+        "perimeter": perimeters * scale,
+        "equivalent_diameter": np.sqrt(4 * areas / np.pi) * scale,
+        "circularity": np.where(perimeters > 0, circularity, np.nan),
+        # Indefinida para puntos y líneas de un píxel de ancho
+        "aspect_ratio": np.where(minor > 0, aspect_ratio, np.nan),
+        "orientation": np.degrees(0.5 * np.arctan2(2 * mu11, mu20 - mu02)),
+    }
+
+
+def summarize_descriptors(descriptors):
+    """
+    Mean, median, standard deviation, minimum and maximum of every descriptor,
+    ignoring NaN values.
+
+    Args:
+        descriptors (dict): {name: (N,) array}, as returned by shape_descriptors.
+
+    Returns:
+        dict: {name: {"mean", "median", "std", "min", "max"}}; the statistics
+        are None for descriptors without finite values.
+    """
+    summary = {}
+    for name, values in descriptors.items():
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            summary[name] = dict.fromkeys(("mean", "median", "std", "min", "max"))
+            continue
+        summary[name] = {
+            "mean": float(values.mean()),
+            "median": float(np.median(values)),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+    return summary
@@ -0,0 +1,4 @@
+# modules/plotting/__init__.py
+from .backend import pyplot, use_headless
+
+__all__ = ["pyplot", "use_headless"]
@@ -0,0 +1,36 @@
+import sys
+
+# Backend elegido para el proceso; None deja el de matplotlib por defecto
+_BACKEND = None
+
+
+def use_headless():
+    """
+    Renders every figure of this process to memory with the Agg backend.
+
+    Call it once, as early as possible: if pyplot has not been imported yet,
+    the backend is set before the import, so no GUI toolkit is ever loaded.
+    Otherwise the current backend is switched.
+    """
+    global _BACKEND
+    _BACKEND = "Agg"
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].switch_backend(_BACKEND)
+
+
+def pyplot():
+    """
+    Imports matplotlib.pyplot on first use, with the backend chosen by
+    `use_headless`, so modules that only plot on demand do not pay for the
+    matplotlib import at startup.
+
+    Returns:
+        module: matplotlib.pyplot.
+    """
+    if _BACKEND is not None and "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+
+        matplotlib.use(_BACKEND)
+    import matplotlib.pyplot as plt
+
+    return plt
@@ -0,0 +1,203 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.spatial import Delaunay
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.classes import Particle, ParticleCalculator  # noqa: E402
+from modules.geometry import (  # noqa: E402
+    closest_pair_delaunay,
+    closest_pairs_batch,
+    pack_samples,
+)
+
+
+class _Particles:
+    """
+    Minimal container with the `particle_list` attribute ParticleCalculator expects.
+    """
+
+    def __init__(self, particle_list):
+        self.particle_list = particle_list
+
+
+def legacy_closest_pair_delaunay(particle_list):
+    """
+    Per-simplex Python loop used before the NumPy engine. Kept as the reference.
+
+    :param particle_list: List of Particle objects.
+    :return: Tuple (closest_pair, min_distance, combinations, distances).
+    """
+    distances = []
+    combinations = 0
+    min_distance = float("inf")
+    closest_pair = None
+
+    points = [(p.x, p.y) for p in particle_list]
+    delaunay = Delaunay(points)
+    processed_edges = set()
+
+    for simplex in delaunay.simplices:
+        for i, j in [(0, 1), (1, 2), (2, 0)]:
+            p1, p2 = particle_list[simplex[i]], particle_list[simplex[j]]
+            edge = tuple(sorted([p1.id, p2.id]))
+            if edge in processed_edges:
+                continue
+            processed_edges.add(edge)
+
+            distance = math.sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
+            combinations += 1
+            distances.append(
+                {
+                    "pair": {p1.id: (p1.x, p1.y), p2.id: (p2.x, p2.y)},
+                    "distance": distance,
+                }
+            )
+            if distance < min_distance:
+                min_distance = distance
+                closest_pair = (p1, p2)
+
+    return closest_pair, min_distance, combinations, distances
+
+
+def run_benchmark(sizes, repeats, seed):
+    """
+    Times the legacy loop against the NumPy engine and checks they agree.
+
+    :param sizes: Iterable with the number of particles per case.
+    :param repeats: Number of timed runs per case (the best one is reported).
+    :param seed: Seed for the random coordinates.
+    """
+    rng = np.random.default_rng(seed)
+    print(
+        f"{'particles':>10} {'legacy (s)':>12} {'numpy (s)':>12} "
+        f"{'engine (s)':>12} {'speedup':>9}"
+    )
+
+    for size in sizes:
+        coords = rng.uniform(0, 2000, size=(size, 2))
+        particle_list = [Particle(i, x, y) for i, (x, y) in enumerate(coords.tolist())]
+        calculator = ParticleCalculator(_Particles(particle_list), None, None)
+
+        legacy_time = float("inf")
+        numpy_time = float("inf")
+        engine_time = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            expected = legacy_closest_pair_delaunay(particle_list)
+            legacy_time = min(legacy_time, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            calculator.find_closest_pair_Delaunay()
+            numpy_time = min(numpy_time, time.perf_counter() - start)
+
+            # Solo el motor NumPy, sin construir la lista de diccionarios
+            start = time.perf_counter()
+            closest_pair_delaunay(coords)
+            engine_time = min(engine_time, time.perf_counter() - start)
+
+        # Las longitudes pueden diferir en el último bit (x ** 2 frente a x * x)
+        closest_pair, min_distance, combinations, distances = expected
+        assert [p.id for p in calculator.closest_pair] == [p.id for p in closest_pair]
+        assert math.isclose(calculator.min_distance, min_distance, rel_tol=1e-12)
+        assert calculator.combinations == combinations
+        assert [d["pair"] for d in calculator.distances] == [
+            d["pair"] for d in distances
+        ]
+        assert np.allclose(
+            [d["distance"] for d in calculator.distances],
+            [d["distance"] for d in distances],
+            rtol=1e-12,
+            atol=0,
+        )
+
+        print(
+            f"{size:>10} {legacy_time:>12.4f} {numpy_time:>12.4f} "
+            f"{engine_time:>12.4f} {legacy_time / numpy_time:>8.1f}x"
+        )
+
+
+def run_batch_benchmark(samples, particles, repeats, seed):
+    """
+    Times many small samples processed one ParticleCalculator at a time, one
+    closest_pair_delaunay call at a time, and in a single batched call.
+
+    :param samples: Number of samples.
+    :param particles: Maximum number of particles per sample (sizes are random).
+    :param repeats: Number of timed runs per case (the best one is reported).
+    :param seed: Seed for the random coordinates.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(3, particles + 1, size=samples)
+    coords = [rng.uniform(0, 2000, size=(size, 2)) for size in sizes]
+    particle_lists = [
+        [Particle(i, x, y) for i, (x, y) in enumerate(sample.tolist())]
+        for sample in coords
+    ]
+    points, offsets = pack_samples(coords)
+
+    calculator_time = float("inf")
+    loop_time = float("inf")
+    batch_time = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        minima = []
+        for particle_list in particle_lists:
+            calculator = ParticleCalculator(_Particles(particle_list), None, None)
+            calculator.find_closest_pair_Delaunay()
+            minima.append(calculator.min_distance)
+        calculator_time = min(calculator_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for sample in coords:
+            closest_pair_delaunay(sample)
+        loop_time = min(loop_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = closest_pairs_batch(points, offsets)
+        batch_time = min(batch_time, time.perf_counter() - start)
+
+    assert np.allclose(result["min_distance"], minima, rtol=1e-12, atol=0)
+
+    print(f"{samples} samples of 3-{particles} particles ({len(points)} in total)")
+    print(f"{'ParticleCalculator':>20} {calculator_time:>10.4f} s")
+    print(f"{'per-sample engine':>20} {loop_time:>10.4f} s")
+    print(
+        f"{'batched':>20} {batch_time:>10.4f} s "
+        f"({calculator_time / batch_time:.1f}x, {loop_time / batch_time:.1f}x)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the Delaunay closest-pair search."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--batch",
+        type=int,
+        nargs=2,
+        metavar=("SAMPLES", "PARTICLES"),
+        default=None,
+        help="Benchmark the batched API on SAMPLES samples of up to PARTICLES "
+        "particles instead.",
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch_benchmark(*args.batch, args.repeats, args.seed)
+    else:
+        run_benchmark(args.sizes, args.repeats, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import cv2 as cv
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.classes.ImageProcessor import (  # noqa: E402
+    ImageProcessor,
+    component_properties,
+    contour_properties,
+)
+from generate_synthetic_images import generate_particle_image  # noqa: E402
+
+
+def detect_contours(binary):
+    """
+    Contour backend: cv.findContours plus cv.moments per contour.
+
+    :return: Tuple (centroids, areas) of the contours with a non-zero area.
+    """
+    contours, _ = cv.findContours(binary, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+    _, centroids, areas, _, _ = contour_properties(contours)
+    return np.array(centroids, dtype=np.int64).reshape(-1, 2), np.array(areas)
+
+
+def detect_components(binary):
+    """
+    Components backend: a single cv.connectedComponentsWithStats call.
+
+    :return: Tuple (centroids, areas) of the components that are not
+        discarded as specks (see ImageProcessor.MIN_COMPONENT_AREA).
+    """
+    centroids, areas, _, _ = component_properties(
+        binary, ImageProcessor.MIN_COMPONENT_AREA
+    )
+    return centroids, areas
+
+
+def best_time(func, binary, repeats):
+    """
+    Runs `func(binary)` `repeats` times.
+
+    :return: Tuple (best time in seconds, result of the last run).
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(binary)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(image_path, repeats):
+    """
+    Times both backends on one image and reports how their particles match.
+    """
+    gray = cv.cvtColor(cv.imread(image_path), cv.COLOR_BGR2GRAY)
+    binary = ImageProcessor.binarize(gray)
+
+    t_contours, (c_centroids, c_areas) = best_time(detect_contours, binary, repeats)
+    t_components, (k_centroids, k_areas) = best_time(detect_components, binary, repeats)
+
+    # Partículas del backend de contornos con un componente a <= 1 px
+    matched = 0
+    if len(c_centroids) and len(k_centroids):
+        distances, _ = cKDTree(k_centroids).query(c_centroids)
+        matched = int(np.count_nonzero(distances <= 1))
+
+    print(
+        f"{os.path.basename(image_path):<20} {len(c_centroids):>9} "
+        f"{len(k_centroids):>10} {matched:>8} "
+        f"{t_contours * 1e3:>13.3f} {t_components * 1e3:>15.3f} "
+        f"{t_contours / t_components:>8.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the contour and connected-component detection backends."
+    )
+    parser.add_argument(
+        "images",
+        nargs="*",
+        default=sorted(glob.glob("data/sample*.png")),
+        help="Images to benchmark (default: data/sample*.png).",
+    )
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        nargs="*",
+        default=[],
+        metavar="PARTICLES",
+        help="Also benchmark synthetic 4096x4096 images with these particle counts.",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'image':<20} {'contours':>9} {'components':>10} {'matched':>8} "
+        f"{'contours (ms)':>13} {'components (ms)':>15} "
+        f"{'speedup':>9}"
+    )
+    for image_path in args.images:
+        compare(image_path, args.repeats)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for particles in args.synthetic:
+            image, _ = generate_particle_image(
+                particles, resolution=(4096, 4096), seed=0
+            )
+            image_path = os.path.join(workdir, f"synthetic_{particles}.png")
+            cv.imwrite(image_path, image)
+            compare(image_path, max(1, args.repeats // 4))
+
+
+if __name__ == "__main__":
+    main()
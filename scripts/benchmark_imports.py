@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Dependencias pesadas que solo deberían cargarse al usar su funcionalidad
+HEAVY_MODULES = ("matplotlib", "pandas", "openpyxl", "scipy", "pyarrow", "cv2")
+
+# Punto de entrada -> código que se cronometra en un intérprete nuevo
+TARGETS = {
+    "main": "import main",
+    "modules.classes": "import modules.classes",
+    "BatchRunner": "from modules.classes import BatchRunner",
+    "ExcelExporter": "from modules.classes import ExcelExporter",
+    # Coste que paga solo quien dibuja, con el backend sin interfaz gráfica
+    "plot": "from modules.plotting import use_headless, pyplot\n"
+    "use_headless()\npyplot()",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<target>", "exec"))
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def measure(code, python=sys.executable):
+    """
+    Times `code` in a fresh interpreter, so nothing is already imported.
+
+    :param code: Python code to run (usually imports).
+    :param python: Interpreter to use.
+    :return: Dict with 'seconds' and 'loaded' (heavy modules imported by the code).
+    """
+    probe = PROBE.format(code=code, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [python, "-c", probe],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _import_times(code, python=sys.executable):
+    stderr = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        fields = line[len("import time:") :].split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1]) / 1e6
+    return times
+
+
+def top_imports(code, count, python=sys.executable):
+    """
+    Returns the packages whose import costs the most in `code`, according to
+    -X importtime (subpackages are included in their package).
+
+    :param code: Python code to run.
+    :param count: Number of packages to return.
+    :param python: Interpreter to use.
+    :return: List of (cumulative seconds, package name).
+    """
+    # Lo que importa el intérprete al arrancar no cuenta
+    startup = _import_times("pass", python)
+    packages = [
+        (seconds, name)
+        for name, seconds in _import_times(code, python).items()
+        if "." not in name and name not in startup
+    ]
+    return sorted(packages, reverse=True)[:count]
+
+
+def run_benchmark(targets, repeats, top):
+    """
+    Prints the median import time of every target and the heavy modules it loads.
+
+    :param targets: Names of the entries of TARGETS to time.
+    :param repeats: Number of fresh interpreters per target.
+    :param top: Number of slowest imports to list per target (0 disables it).
+    """
+    print(f"{'target':>16} {'median (s)':>11} {'min (s)':>9}  heavy modules loaded")
+    for name in targets:
+        runs = [measure(TARGETS[name]) for _ in range(repeats)]
+        seconds = [run["seconds"] for run in runs]
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(
+            f"{name:>16} {statistics.median(seconds):>11.3f} "
+            f"{min(seconds):>9.3f}  {loaded}"
+        )
+        for cumulative, module in top_imports(TARGETS[name], top):
+            print(f"{'':>16} {cumulative:>11.3f}  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the import time of the package entry points."
+    )
+    parser.add_argument(
+        "--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS)
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="List the N packages that cost the most to import per target.",
+    )
+    args = parser.parse_args()
+
+    run_benchmark(args.targets, args.repeats, args.top)
+
+
+if __name__ == "__main__":
+    main()
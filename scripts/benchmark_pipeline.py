@@ -0,0 +1,248 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.classes import (  # noqa: E402
+    ExcelExporter,
+    ImageProcessor,
+    LatexManager,
+    ParticleCalculator,
+    ResultsStore,
+)
+from modules.geometry import closest_pair_delaunay  # noqa: E402
+from generate_synthetic_images import generate_dataset  # noqa: E402
+
+STAGES = (
+    "decode",
+    "binarization",
+    "find_contours",
+    "centroids",
+    "delaunay",
+    "closest_pair",
+    "nearest_neighbors",
+    "plot",
+    "export_json",
+    "export_excel",
+)
+
+
+class StageTimer:
+    """
+    Accumulates wall time and, optionally, the tracemalloc peak of each stage.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.peak_bytes = {stage: 0 for stage in STAGES}
+
+    def measure(self, stage, func, *args, **kwargs):
+        """
+        Runs `func` and charges its duration to `stage`.
+
+        :return: The value returned by `func`.
+        """
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.seconds[stage] += time.perf_counter() - start
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.peak_bytes[stage] = max(self.peak_bytes[stage], peak)
+        return result
+
+
+def analyze_sample(timer, sample_path, figures_path, info_path, scale, renderer):
+    """
+    Runs the pipeline on one image, timing every stage separately.
+
+    :return: Tuple (sample_name, sample_data).
+    """
+    processor = ImageProcessor(
+        sample_path, figures_path, info_path, artifact_policy="none"
+    )
+    processor.scale = scale
+    # La imagen se decodifica al primer acceso, no en el constructor
+    timer.measure("decode", processor.prepare)
+
+    binary = timer.measure("binarization", processor.otsuS_Binarization)
+    contours = timer.measure("find_contours", processor.find_contours, binary)
+    timer.measure("centroids", processor.compute_centroids, contours)
+    processor.convert_centroids_to_particles()
+
+    # La triangulación de find_closest_pair_Delaunay, medida aparte: la
+    # búsqueda reutiliza sus bordes y solo calcula las longitudes
+    calculator = ParticleCalculator(processor.particles, figures_path, info_path)
+    points = calculator.table.coordinates
+    if len(points) >= 2:
+        edges, _, _ = timer.measure("delaunay", closest_pair_delaunay, points)
+        processor.particles.edges = edges
+    timer.measure("closest_pair", calculator.find_closest_pair_Delaunay)
+    timer.measure("nearest_neighbors", calculator.find_nearest_neighbors)
+    timer.measure(
+        "plot",
+        calculator.plot_particles,
+        show_plot=False,
+        show_closest=True,
+        show_mesh=True,
+        renderer=renderer,
+    )
+
+    sample_name = os.path.splitext(os.path.basename(sample_path))[0]
+    sample_data = {
+        "particles_detected": len(calculator.table),
+        "combinations": calculator.combinations,
+        "min_distance": calculator.min_distance,
+        "nearest_neighbors": calculator.nn_stats,
+        "distances": calculator.distances,
+        "image_path": sample_path,
+    }
+    return sample_name, sample_data
+
+
+def run_case(particles, radius, resolution, images, renderer, trace_memory, seed):
+    """
+    Generates a synthetic dataset and benchmarks the whole pipeline on it.
+
+    :return: Dictionary with the configuration, per-stage times, throughput and memory.
+    """
+    timer = StageTimer(trace_memory)
+
+    # scipy se importa al primer uso: fuera de las etapas medidas
+    import scipy.spatial  # noqa: F401
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = os.path.join(workdir, "data")
+        reference_path, sample_paths = generate_dataset(
+            data_dir, images, particles, radius, resolution, 200, seed
+        )
+
+        figures_path, info_path, base_path = LatexManager(
+            os.path.join(workdir, "output")
+        ).create_directory_structure()
+        store = ResultsStore(info_path)
+
+        processor_ref = ImageProcessor(
+            reference_path, figures_path, info_path, artifact_policy="none"
+        )
+        processor_ref.calculate_scale(
+            real_length=200,
+            show_original=False,
+            show_binary=False,
+            show_contours=False,
+            show_bar=False,
+        )
+
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+
+        detected = 0
+        for sample_path in sample_paths:
+            sample_name, sample_data = analyze_sample(
+                timer,
+                sample_path,
+                figures_path,
+                info_path,
+                processor_ref.scale,
+                renderer,
+            )
+            detected += sample_data["particles_detected"]
+            timer.measure("export_json", store.write_sample, sample_name, sample_data)
+
+        timer.measure("export_json", store.finalize, legacy_json=True)
+        timer.measure("export_excel", ExcelExporter(base_path).process_json_to_excel)
+
+        elapsed = time.perf_counter() - start
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "config": {
+            "particles": particles,
+            "radius": list(radius),
+            "resolution": list(resolution),
+            "images": images,
+            "renderer": renderer,
+        },
+        "particles_detected": detected,
+        "elapsed_s": elapsed,
+        "stages_s": timer.seconds,
+        "throughput": {
+            "images_per_s": images / elapsed,
+            "particles_per_s": detected / elapsed,
+        },
+        "peak_memory": {
+            "tracemalloc_bytes": timer.peak_bytes if trace_memory else None,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of every pipeline stage on synthetic images."
+    )
+    parser.add_argument("--particles", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--radius", type=int, nargs=2, default=[3, 6])
+    parser.add_argument(
+        "--resolutions", type=int, nargs="+", default=[1024], help="Square sizes."
+    )
+    parser.add_argument("--images", type=int, default=3)
+    parser.add_argument(
+        "--renderer", choices=["matplotlib", "opencv"], default="matplotlib"
+    )
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file for the results (default: stdout).")
+    args = parser.parse_args()
+
+    # Los mensajes de la biblioteca van a stderr: stdout solo lleva el JSON
+    cases = []
+    with contextlib.redirect_stdout(sys.stderr):
+        for resolution in args.resolutions:
+            for particles in args.particles:
+                case = run_case(
+                    particles,
+                    tuple(args.radius),
+                    (resolution, resolution),
+                    args.images,
+                    args.renderer,
+                    args.trace_memory,
+                    args.seed,
+                )
+                cases.append(case)
+                print(
+                    f"[*] {particles} particles @ {resolution}px: "
+                    f"{case['throughput']['images_per_s']:.2f} images/s, "
+                    f"{case['throughput']['particles_per_s']:.0f} particles/s"
+                )
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": cases,
+    }
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.geometry import (  # noqa: E402
+    closest_pair_delaunay,
+    closest_pair_grid,
+    closest_pairs_batch,
+    pack_samples,
+)
+
+
+def lattice(rng, n):
+    """
+    First n points of the smallest square lattice that holds them, with a random
+    spacing: every point has several neighbours at exactly the same distance.
+
+    :param rng: Random generator.
+    :param n: Number of points.
+    :return: (n, 2) array of coordinates.
+    """
+    side = int(np.ceil(np.sqrt(n)))
+    grid = np.stack(np.meshgrid(np.arange(side), np.arange(side)), axis=-1)
+    return grid.reshape(-1, 2)[:n].astype(np.float64) * rng.uniform(0.5, 50)
+
+
+# Generadores de nubes de puntos, incluidos los casos que hacen fallar a Qhull
+GENERATORS = {
+    "uniform": lambda rng, n: rng.uniform(0, 1000, size=(n, 2)),
+    "integer": lambda rng, n: rng.integers(0, 12, size=(n, 2)).astype(np.float64),
+    "duplicates": lambda rng, n: np.repeat(
+        rng.uniform(0, 1000, size=(max(n // 2, 1), 2)), 2, axis=0
+    )[:n],
+    "collinear": lambda rng, n: np.outer(rng.uniform(-50, 50, n), rng.normal(size=2))
+    + rng.uniform(0, 100, size=2),
+    "vertical": lambda rng, n: np.column_stack((np.full(n, 3.0), rng.uniform(0, 1, n))),
+    "clustered": lambda rng, n: np.concatenate(
+        (
+            rng.normal(0, 1e-6, size=(n // 2, 2)),
+            rng.uniform(0, 1e6, size=(n - n // 2, 2)),
+        )
+    ),
+    "lattice": lattice,
+}
+
+
+def brute_force(points):
+    """
+    Minimum distance over every pair of points, with the same arithmetic as the
+    searches so the results can be compared exactly.
+
+    :param points: (N, 2) array of coordinates.
+    :return: The minimum distance.
+    """
+    diff = points[:, None, :] - points[None, :, :]
+    distances = np.sqrt(diff[..., 0] * diff[..., 0] + diff[..., 1] * diff[..., 1])
+    np.fill_diagonal(distances, np.inf)
+    return distances.min()
+
+
+def _distance(points, i, j):
+    dx, dy = points[i] - points[j]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def run_checks(cases, max_points, seed):
+    """
+    Checks the grid search, the Delaunay search (with its fallbacks) and the
+    batched search against brute force on random point sets.
+
+    :param cases: Number of random point sets per generator.
+    :param max_points: Maximum number of points per set.
+    :param seed: Seed of the random generator.
+    :return: Number of failed checks.
+    """
+    rng = np.random.default_rng(seed)
+    failures = 0
+    for name, generator in GENERATORS.items():
+        samples = [
+            generator(rng, int(rng.integers(2, max_points + 1))) for _ in range(cases)
+        ]
+        batch = closest_pairs_batch(*pack_samples(samples))
+
+        failed = 0
+        for k, points in enumerate(samples):
+            expected = brute_force(points)
+
+            i, j, grid_distance = closest_pair_grid(points)
+            edges, lengths, best = closest_pair_delaunay(points)
+            p, q = batch["closest_pair"][k]
+            checks = (
+                i < j and grid_distance == _distance(points, i, j),
+                grid_distance == expected,
+                lengths[best] == expected,
+                batch["min_distance"][k] == expected,
+                _distance(points, p, q) == expected,
+            )
+            if not all(checks):
+                failed += 1
+                if failed == 1:
+                    print(f"[!] {name}: first failing set has {len(points)} points")
+
+        degenerate = int(batch["degenerate"].sum())
+        status = "ok" if not failed else f"{failed} FAILED"
+        print(f"{name:>12} {cases:>6} sets {degenerate:>6} degenerate  {status}")
+        failures += failed
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks the closest-pair searches against brute force."
+    )
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--max-points", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failures = run_checks(args.cases, args.max_points, args.seed)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+
+def generate_particle_image(
+    num_particles, radius_range=(3, 6), resolution=(1024, 1024), noise=2.0, seed=None
+):
+    """
+    Generate a synthetic SEM-like image: bright blurred disks on a dark noisy background.
+
+    :param num_particles: Number of particles (disks) to draw.
+    :param radius_range: Tuple (min, max) with the radius of the disks in pixels.
+    :param resolution: Tuple (width, height) of the image in pixels.
+    :param noise: Standard deviation of the background noise (grey levels).
+    :param seed: Seed for reproducibility.
+    :return: Tuple (image, centers) with the BGR image and the (N, 2) disk centers.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+
+    # Fondo casi negro con ruido gaussiano, como las muestras de data/
+    background = rng.normal(2, noise, size=(height, width))
+    canvas = np.zeros((height, width), dtype=np.float32)
+
+    margin = radius_range[1] + 1
+    centers = np.column_stack(
+        (
+            rng.integers(margin, width - margin, num_particles),
+            rng.integers(margin, height - margin, num_particles),
+        )
+    )
+    radii = rng.integers(radius_range[0], radius_range[1] + 1, num_particles)
+    intensities = rng.uniform(170, 235, num_particles)
+
+    for (x, y), radius, intensity in zip(
+        centers.tolist(), radii.tolist(), intensities.tolist()
+    ):
+        cv2.circle(canvas, (x, y), radius, intensity, -1, cv2.LINE_AA)
+
+    # Bordes suaves como en una micrografía
+    canvas = cv2.GaussianBlur(canvas, (5, 5), 1.0)
+    gray = np.clip(np.maximum(background, canvas), 0, 255).astype(np.uint8)
+
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), centers
+
+
+def generate_reference_image(resolution=(1024, 1024), bar_length=200, seed=None):
+    """
+    Generate a reference image with a white horizontal scale bar on a noisy background.
+
+    :param resolution: Tuple (width, height) of the image in pixels.
+    :param bar_length: Length of the scale bar in pixels.
+    :param seed: Seed for reproducibility.
+    :return: BGR image.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+    gray = np.clip(rng.normal(2, 2, size=(height, width)), 0, 255).astype(np.uint8)
+
+    # Barra con relación de aspecto mayor que 5 para que la detecte calculate_scale
+    bar_height = max(4, bar_length // 20)
+    x0 = width - bar_length - 20
+    y0 = height - bar_height - 20
+    gray[y0 : y0 + bar_height, x0 : x0 + bar_length] = 255
+
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def generate_dataset(
+    output_dir, num_images, num_particles, radius_range, resolution, bar_length, seed
+):
+    """
+    Write a reference image and a batch of sample images to a directory.
+
+    :param output_dir: Directory where the images will be saved.
+    :param num_images: Number of sample images.
+    :param num_particles: Number of particles per sample image.
+    :param radius_range: Tuple (min, max) with the radius of the particles in pixels.
+    :param resolution: Tuple (width, height) of the images in pixels.
+    :param bar_length: Length of the scale bar of the reference in pixels.
+    :param seed: Seed for reproducibility.
+    :return: Tuple (reference_path, sample_paths).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    reference_path = os.path.join(output_dir, "reference.png")
+    cv2.imwrite(
+        reference_path, generate_reference_image(resolution, bar_length, seed=seed)
+    )
+
+    sample_paths = []
+    for index in range(num_images):
+        image, _ = generate_particle_image(
+            num_particles, radius_range, resolution, seed=seed + index + 1
+        )
+        sample_path = os.path.join(output_dir, f"sample{index + 1}.png")
+        cv2.imwrite(sample_path, image)
+        sample_paths.append(sample_path)
+
+    print(
+        f"[*] Generated {num_images} images with {num_particles} particles "
+        f"at {resolution[0]}x{resolution[1]} in {output_dir}."
+    )
+    return reference_path, sample_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic SEM-like particle images."
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--particles", type=int, default=500)
+    parser.add_argument("--radius", type=int, nargs=2, default=[3, 6])
+    parser.add_argument("--resolution", type=int, nargs=2, default=[1024, 1024])
+    parser.add_argument("--bar-length", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate_dataset(
+        args.output_dir,
+        args.images,
+        args.particles,
+        tuple(args.radius),
+        tuple(args.resolution),
+        args.bar_length,
+        args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()